@@ -3,7 +3,7 @@
 Add a Google Calendar ICS feed as a source and fetch events.
 """
 import sys
-from app import create_app
+from app import get_app
 from models import db, Source
 from ingestion.ingest import ingest_all_sources
 
@@ -16,7 +16,7 @@ if len(sys.argv) < 2:
 
 ics_url = sys.argv[1]
 
-app = create_app()
+app = get_app()
 with app.app_context():
     # Check if source already exists
     source = Source.query.filter_by(name='Google Calendar').first()
@@ -3,12 +3,12 @@
 Add sample events to the Concierge database for testing
 """
 from datetime import datetime, timedelta
-from app import create_app
+from app import get_app
 from models import db, Event, Source
 
 def add_sample_events():
     """Add sample events to the database"""
-    app = create_app()
+    app = get_app()
     
     with app.app_context():
         # Get existing sources
@@ -3,13 +3,13 @@
 Manually add events from Telegram messages.
 Paste event text when prompted.
 """
-from app import create_app
+from app import get_app
 from models import db, Event, Source
 from ingestion.telegram_ingest import TelegramIngester
 from utils.deduplication import normalize_event_data
 from datetime import datetime
 
-app = create_app()
+app = get_app()
 
 with app.app_context():
     # Get or create a manual Telegram source
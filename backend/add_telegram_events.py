@@ -5,14 +5,14 @@ Run this script to add events discussed in the group chat.
 """
 import sys
 from datetime import datetime
-from app import create_app
+from app import get_app
 from models import db, Event, Source
 
 # Buenos Aires timezone offset from UTC (ART is UTC-3)
 BUENOS_AIRES_TZ = "America/Argentina/Buenos_Aires"
 
 def add_telegram_events():
-    app = create_app()
+    app = get_app()
     
     with app.app_context():
         # Get or create Telegram source
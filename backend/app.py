@@ -1,97 +1,53 @@
 """
 Flask application for Concierge event aggregation system.
 """
-from flask import Flask, jsonify, request
+from flask import Flask, abort, current_app, jsonify, request, stream_with_context
 from flask_cors import CORS
 from datetime import datetime, timedelta
 import os
+import threading
+import time
 from dotenv import load_dotenv
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from models import db, Event, Source, User, Subscription
+from utils.admin import admin_required
+from utils.cache import bucketed_now, response_cache
+from utils.calendar_view import (
+    calendar_payload, parse_calendar_range, InvalidCalendarRange, MAX_CALENDAR_TITLES
+)
+from utils.compression import compress_response, ResponseBody
+from utils.event_queries import (
+    events_window_query, fetch_event_rows, fetch_events_by_id,
+    parse_fields, parse_ids, select_events, serializer_for,
+    InvalidFields, InvalidIds, EVENT_FIELDS
+)
+from utils.generation import (
+    bump_generation, current_generation, track_generation_writes, LISTINGS_GENERATION
+)
+from utils.http_cache import conditional_get
+from utils.interval_index import fetch_window_rows
+from utils.jobs import job_stats, JOB_BUCKETS
+from utils.metrics import install_request_metrics, render_metrics, track_queries, CONTENT_TYPE
+from utils.pagination import (
+    clamp_page_size, decode_cursor, paginate_rows, InvalidCursor, DEFAULT_PAGE_SIZE
+)
+from utils.pool import engine_options, pool_stats
+from utils.recurrence import fetch_occurrence_rows, iter_window_batches, row_position
+from utils.search import (
+    build_match_query, search_available, search_events, InvalidSearch
+)
+from utils.slow_queries import install_slow_query_log, slow_query_log
+from utils.snapshots import db_breaker, snapshot_store, RETRY_INTERVAL
+from utils.sqlite_profile import configure_sqlite, install_sqlite_profile, read_only
+from utils.stats import read_stats, stats_payload, track_stat_writes
+from utils.tags import tag_registry
 
 # Load environment variables
 load_dotenv()
 
 
-def get_fallback_events():
-    """Return hardcoded events when database is unavailable"""
-    return [
-        {
-            'id': 1, 'title': 'AI Night in Candlelight w/ Pizza & Grape Juice',
-            'description': 'ASM + AIC event about AI at Minerva. Room 4105',
-            'start_time': '2025-12-09T20:00:00', 'end_time': None,
-            'location': 'Room 4105', 'tag': 'Social', 'is_virtual': False,
-            'timezone': 'America/Argentina/Buenos_Aires',
-            'source': {'id': 1, 'name': 'Telegram', 'type': 'telegram'}
-        },
-        {
-            'id': 2, 'title': 'Tokyo Spring 2026 - Pre-Departure Orientation',
-            'description': 'PDO for incoming Tokyo students. Zoom link available.',
-            'start_time': '2025-12-08T21:00:00', 'end_time': None,
-            'location': 'Zoom', 'tag': 'Required', 'is_virtual': True,
-            'timezone': 'America/Argentina/Buenos_Aires',
-            'source': {'id': 1, 'name': 'Email', 'type': 'email'}
-        },
-        {
-            'id': 3, 'title': 'Neurodivergency Discussion & Awareness',
-            'description': 'Discussion about neurodivergency. Quiet Room 708.',
-            'start_time': '2025-12-11T20:00:00', 'end_time': None,
-            'location': 'Quiet Room 708', 'tag': 'Social', 'is_virtual': False,
-            'timezone': 'America/Argentina/Buenos_Aires',
-            'source': {'id': 1, 'name': 'Telegram', 'type': 'telegram'}
-        },
-        {
-            'id': 4, 'title': 'Unit Condition Report - Check Out',
-            'description': 'SLT will send calendar invitations for check-out.',
-            'start_time': '2025-12-11T12:00:00', 'end_time': None,
-            'location': None, 'tag': 'Required', 'is_virtual': False,
-            'timezone': 'America/Argentina/Buenos_Aires',
-            'source': {'id': 1, 'name': 'Email', 'type': 'email'}
-        },
-        {
-            'id': 5, 'title': 'Making (Academic) Major Choices - Majors Fair',
-            'description': 'Created by Professor Terrana.',
-            'start_time': '2025-12-12T09:00:00', 'end_time': '2025-12-12T11:00:00',
-            'location': None, 'tag': 'Career', 'is_virtual': False,
-            'timezone': 'America/Argentina/Buenos_Aires',
-            'source': {'id': 1, 'name': 'Community Portal', 'type': 'portal'}
-        },
-        {
-            'id': 6, 'title': 'Indian Visa Pickup Deadline',
-            'description': 'Last day to pick up Indian visa.',
-            'start_time': '2025-12-13T17:00:00', 'end_time': None,
-            'location': None, 'tag': 'Deadline', 'is_virtual': False,
-            'timezone': 'America/Argentina/Buenos_Aires',
-            'source': {'id': 1, 'name': 'Manual', 'type': 'manual'}
-        },
-        {
-            'id': 7, 'title': 'Last Day of Fall Classes',
-            'description': 'Final day of Fall 2025 semester classes.',
-            'start_time': '2025-12-13T23:59:00', 'end_time': None,
-            'location': None, 'tag': 'Required', 'is_virtual': False,
-            'timezone': 'America/Argentina/Buenos_Aires',
-            'source': {'id': 1, 'name': 'Academic Calendar', 'type': 'calendar'}
-        },
-        {
-            'id': 8, 'title': 'CTD 10-Week Challenge - Weekly Deadline',
-            'description': 'Complete the weekly task by Saturday 11:59 PM.',
-            'start_time': '2025-12-13T23:59:00', 'end_time': None,
-            'location': None, 'tag': 'Deadline', 'is_virtual': False,
-            'meeting_link': 'https://minarashad.github.io/CTD-leaderboard/',
-            'timezone': 'America/Argentina/Buenos_Aires',
-            'source': {'id': 1, 'name': 'Telegram', 'type': 'telegram'}
-        },
-        {
-            'id': 9, 'title': 'December Dash for B.R.E.A.K.',
-            'description': 'Running/walking/biking event Dec 5-19. Submit via Google Form.',
-            'start_time': '2025-12-19T23:59:00', 'end_time': None,
-            'location': None, 'tag': 'Social', 'is_virtual': False,
-            'timezone': 'America/Argentina/Buenos_Aires',
-            'source': {'id': 1, 'name': 'Community Portal', 'type': 'portal'}
-        }
-    ]
-
-
 def create_app():
     """Application factory"""
     app = Flask(__name__)
@@ -100,34 +56,185 @@ def create_app():
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///concierge.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+    configure_sqlite(app)
     
     # Initialize extensions
     db.init_app(app)
     CORS(app)
     
+    # Creating engines does not connect; the pools open connections on use
+    with app.app_context():
+        install_sqlite_profile(db.engines)
+        for engine in db.engines.values():
+            pool_stats.track(engine)
+            track_queries(engine)
+            install_slow_query_log(engine)
+    
+    # Bump the events generation on every write (drives ETags) and keep
+    # the /api/stats counters in step with it
+    track_generation_writes()
+    track_stat_writes()
+    
+    # Per-route counts and latency; registered first so it runs last
+    # and sees the compressed size
+    install_request_metrics(app)
+    
+    # gzip / brotli for JSON responses not served from the response cache
+    app.after_request(compress_response)
+    
     return app
 
 
-app = create_app()
+_shared_app = None
+_shared_app_lock = threading.Lock()
+
+
+def get_app():
+    """
+    Return the process-wide application.
+    
+    Scheduler jobs, ingestion and CLI scripts use this instead of
+    create_app() so the process keeps one engine and connection pool.
+    """
+    global _shared_app
+    if _shared_app is None:
+        with _shared_app_lock:
+            if _shared_app is None:
+                _shared_app = create_app()
+    return _shared_app
+
+
+app = get_app()
+
+# ============================================================================
+# Cached loaders (see utils.cache)
+# ============================================================================
+
+@response_cache.loader('events')
+def load_events_page(tag, days, source_id, limit, after, fields):
+    """Serialize one page of upcoming events as a JSON body"""
+    now = bucketed_now()
+    end_date = now + timedelta(days=days)
+    
+    # Fetch one extra row to learn whether another page exists
+    rows = fetch_window_rows(
+        now, end_date, tag=tag, source_id=source_id,
+        after=after, limit=limit + 1, fields=fields
+    )
+    rows, next_cursor = paginate_rows(rows, limit, position=row_position)
+    
+    serialize = serializer_for(fields)
+    events = [serialize(row) for row in rows]
+    
+    return ResponseBody(current_app.json.dumps({
+        'events': events,
+        'count': len(events),
+        'next_cursor': next_cursor,
+        'filters': {
+            'tag': tag,
+            'days': days,
+            'source_id': source_id,
+            'limit': limit
+        }
+    }))
+
 
-# Initialize database tables on startup
-with app.app_context():
+@response_cache.loader('today')
+def load_today_events(fields):
+    """Serialize today's events as a JSON body"""
+    today_start = bucketed_now().replace(hour=0, minute=0, second=0, microsecond=0)
+    today_end = today_start + timedelta(days=1)
+    
+    rows = fetch_window_rows(today_start, today_end, end_inclusive=False, fields=fields)
+    serialize = serializer_for(fields)
+    events = [serialize(row) for row in rows]
+    
+    return ResponseBody(current_app.json.dumps({
+        'events': events,
+        'count': len(events),
+        'date': today_start.isoformat()
+    }))
+
+
+@response_cache.loader('calendar')
+def load_calendar(first, last, tz_name, titles, tag, source_id):
+    """Serialize per-day event counts as a JSON body"""
+    return ResponseBody(current_app.json.dumps(calendar_payload(
+        first, last, tz_name, titles=titles, tag=tag, source_id=source_id
+    )))
+
+
+@response_cache.loader('search')
+def load_search_results(match, tag, days, source_id, limit, fields):
+    """Serialize ranked search results over upcoming events as a JSON body"""
+    now = bucketed_now()
+    end_date = now + timedelta(days=days) if days else None
+    
+    rows, ranked_all = search_events(
+        match, now, end_date, tag=tag, source_id=source_id,
+        limit=limit, fields=fields
+    )
+    serialize = serializer_for(fields)
+    events = [serialize(row) for row in rows]
+    
+    return ResponseBody(current_app.json.dumps({
+        'events': events,
+        'count': len(events),
+        'ranked_all': ranked_all,
+        'filters': {
+            'tag': tag,
+            'days': days,
+            'source_id': source_id,
+            'limit': limit
+        }
+    }))
+
+
+# The frontend's default views, re-warmed after every ingest
+response_cache.warm_by_default('events', (None, 7, None, DEFAULT_PAGE_SIZE, None, EVENT_FIELDS))
+response_cache.warm_by_default('events', (None, 1, None, DEFAULT_PAGE_SIZE, None, EVENT_FIELDS))
+response_cache.warm_by_default('today', (EVENT_FIELDS,))
+
+
+def cached_json(name, *params):
+    """
+    Build a JSON response from the response cache.
+    
+    Falls back to the last good response for the same filters while the
+    database is failing (see utils.snapshots).
+    """
+    if db_breaker.is_open:
+        return snapshot_json(name, params)
+    
     try:
-        db.create_all()
-        event_count = Event.query.count()
-        print(f"✓ Database tables initialized - {event_count} events in database")
-        
-        # If database is empty, load from the committed database file or initialize with samples
-        if event_count == 0:
-            print("⚠ Database is empty - attempting to load events...")
-            # Just create the default sources so the database isn't completely empty
-            from init_db import init_db
-            init_db()
-            print(f"✓ Initialized database with {Event.query.count()} events")
-    except Exception as e:
-        print(f"✗ Database initialization failed: {e}")
-        import traceback
-        traceback.print_exc()
+        body = response_cache.get(name, params, current_generation(LISTINGS_GENERATION))
+    except SQLAlchemyError as e:
+        print(f"Database error: {e}")
+        db_breaker.record_failure(e)
+        return snapshot_json(name, params)
+    
+    db_breaker.record_success()
+    snapshot_store.save((name, params), body)
+    return body.to_response()
+
+
+def snapshot_json(name, params):
+    """Serve the stored snapshot for a cached endpoint, marked stale"""
+    snapshot = snapshot_store.load((name, params))
+    if snapshot is None:
+        response = jsonify({'error': 'Events are temporarily unavailable'})
+        response.status_code = 503
+        response.retry_after = int(RETRY_INTERVAL)
+        return response
+    
+    saved_at, body = snapshot
+    response = body.to_response()
+    response.age = max(0, int(time.time() - saved_at))
+    response.headers['X-Data-Stale'] = 'true'
+    # Never let clients revalidate against stale data
+    response.cache_control.no_store = True
+    return response
 
 
 # ============================================================================
@@ -143,7 +250,12 @@ def index():
         'endpoints': {
             'health': '/api/health',
             'events': '/api/events',
-            'sources': '/api/sources'
+            'search': '/api/events/search',
+            'export': '/api/events/export',
+            'batch': '/api/events/batch',
+            'calendar': '/api/events.ics',
+            'sources': '/api/sources',
+            'metrics': '/api/metrics'
         }
     })
 
@@ -156,7 +268,27 @@ def health_check():
     })
 
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Request, database and job metrics in the Prometheus text format"""
+    body = render_metrics(job_stats.snapshot(), JOB_BUCKETS, pool_stats.snapshot())
+    return current_app.response_class(body, content_type=CONTENT_TYPE)
+
+
+@app.route('/api/admin/slow-queries', methods=['GET'])
+@admin_required
+def get_slow_queries():
+    """Most recent slow SQL statements with their plans (see utils.slow_queries)"""
+    limit = request.args.get('limit', type=int)
+    entries = slow_query_log.entries(limit)
+    return jsonify({
+        'entries': entries,
+        'count': len(entries)
+    })
+
+
 @app.route('/api/events', methods=['GET'])
+@conditional_get(time_relative=True)
 def get_events():
     """
     Get upcoming events with optional filters.
@@ -165,76 +297,221 @@ def get_events():
     - tag: Filter by tag (Required, Career, Capstone, Social, Deadline)
     - days: Number of days ahead (default: 7)
     - source_id: Filter by source
+    - limit: Page size (default: 100, max: 500)
+    - cursor: Opaque cursor from a previous page's next_cursor
+    - fields: Comma-separated fields to return (id and start_time always are)
+    - view: Field preset instead of fields: full (default) or compact
     """
+    limit = clamp_page_size(request.args.get('limit', type=int))
+    cursor = request.args.get('cursor')
+    
     try:
-        # Parse query parameters
-        tag = request.args.get('tag')
-        days = int(request.args.get('days', 7))
-        source_id = request.args.get('source_id', type=int)
-        
-        # Build query
-        query = Event.query.filter(Event.start_time >= datetime.utcnow())
-        
-        if tag:
-            query = query.filter(Event.tag == tag)
-        
-        if source_id:
-            query = query.filter(Event.source_id == source_id)
-        
-        # Filter by date range
-        end_date = datetime.utcnow() + timedelta(days=days)
-        query = query.filter(Event.start_time <= end_date)
-        
-        # Order by start time
-        query = query.order_by(Event.start_time.asc())
-        
-        events = query.all()
-        
-        return jsonify({
-            'events': [event.to_dict() for event in events],
-            'count': len(events),
-            'filters': {
-                'tag': tag,
-                'days': days,
-                'source_id': source_id
-            }
-        })
-    except Exception as e:
-        # Return static fallback events if database fails
-        print(f"Database error: {e}")
-        return jsonify({
-            'events': get_fallback_events(),
-            'count': len(get_fallback_events()),
-            'filters': {}
-        })
+        after = decode_cursor(cursor) if cursor else None
+        fields = parse_fields(request.args.get('fields'), request.args.get('view'))
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    tag = request.args.get('tag')
+    days = request.args.get('days', 7, type=int)
+    source_id = request.args.get('source_id', type=int)
+    
+    return cached_json('events', tag, days, source_id, limit, after, fields)
 
 
 @app.route('/api/events/today', methods=['GET'])
+@conditional_get(time_relative=True)
 def get_today_events():
-    """Get events happening today"""
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_end = today_start + timedelta(days=1)
+    """Get events happening today (accepts fields and view like /api/events)"""
+    try:
+        fields = parse_fields(request.args.get('fields'), request.args.get('view'))
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return cached_json('today', fields)
+
+
+@app.route('/api/events/calendar', methods=['GET'])
+@conditional_get(daily=True)
+def get_calendar():
+    """
+    Get per-day event counts by tag for a calendar view.
+    
+    Query parameters:
+    - from: First day, YYYY-MM-DD (default: first day of the current month)
+    - to: Last day, inclusive (default: end of that month; at most 92 days)
+    - tz: Timezone the days are in (default: UTC)
+    - titles: First titles to include per day (default: 0, max: 10)
+    - tag: Filter by tag
+    - source_id: Filter by source
+    """
+    try:
+        first, last, tz_name = parse_calendar_range(
+            request.args.get('from'), request.args.get('to'),
+            request.args.get('tz'), bucketed_now()
+        )
+    except InvalidCalendarRange as e:
+        return jsonify({'error': str(e)}), 400
+    
+    titles = min(max(request.args.get('titles', 0, type=int), 0), MAX_CALENDAR_TITLES)
+    tag = request.args.get('tag')
+    source_id = request.args.get('source_id', type=int)
+    
+    return cached_json('calendar', first, last, tz_name, titles, tag, source_id)
+
+
+@app.route('/api/events/export', methods=['GET'])
+@conditional_get(time_relative=True)
+def export_events():
+    """
+    Stream upcoming events as newline-delimited JSON, one event per line.
+    
+    Takes the tag, days, source_id, fields and view parameters of
+    /api/events, without paging: rows are streamed from the database in
+    batches as they are sent.
+    """
+    try:
+        fields = parse_fields(request.args.get('fields'), request.args.get('view'))
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+    
+    now = bucketed_now()
+    end_date = now + timedelta(days=request.args.get('days', 7, type=int))
+    tag = request.args.get('tag')
+    tag_id = (tag_registry.id_for(tag, create=False) or 0) if tag else None
+    source_id = request.args.get('source_id', type=int)
+    
+    # Series are exported once per occurrence, like the listing shows them
+    query = events_window_query(
+        now, end_date, tag_id=tag_id, source_id=source_id, fields=fields, series=False
+    )
+    occurrences = [
+        row for row in fetch_occurrence_rows(
+            now, end_date, tag_id=tag_id, source_id=source_id, fields=fields
+        )
+        if row.start_time >= now
+    ]
+    
+    def generate():
+        dumps = current_app.json.dumps
+        for batch in iter_window_batches(query, occurrences, fields):
+            yield ''.join(dumps(event) + '\n' for event in batch)
+    
+    return current_app.response_class(
+        stream_with_context(generate()), mimetype='application/x-ndjson'
+    )
+
+
+@app.route('/api/events.ics', methods=['GET'])
+@conditional_get(daily=True)
+def get_events_feed():
+    """
+    Subscribable iCalendar feed of recent and upcoming events.
+    
+    Query parameters:
+    - tag: Filter by tag
+    - source_id: Filter by source
+    """
+    # icalendar is only needed here; keep it out of the API's startup
+    from utils.ics_feed import feed_query, feed_series
     
-    events = Event.query.filter(
-        Event.start_time >= today_start,
-        Event.start_time < today_end
-    ).order_by(Event.start_time.asc()).all()
+    filters = dict(tag=request.args.get('tag'), source_id=request.args.get('source_id', type=int))
+    return ics_response(feed_query(**filters), 'Concierge', feed_series(**filters))
+
+
+@app.route('/api/events/search', methods=['GET'])
+@conditional_get(time_relative=True)
+def get_search_results():
+    """
+    Full-text search over upcoming events, best match first.
+    
+    Query parameters:
+    - q: Search text, matched against title, description and location
+    - tag: Filter by tag
+    - days: Only events in the next N days (default: all upcoming)
+    - source_id: Filter by source
+    - limit: Maximum results (default: 100, max: 500)
+    - fields, view: As for /api/events
+    
+    `ranked_all` is false when the text matched so many events that only
+    the most recently added were ranked (see utils.search.search_events).
+    """
+    if not search_available():
+        return jsonify({'error': 'Search is not available on this database'}), 501
+    
+    try:
+        match = build_match_query(request.args.get('q'))
+        fields = parse_fields(request.args.get('fields'), request.args.get('view'))
+    except (InvalidSearch, InvalidFields) as e:
+        return jsonify({'error': str(e)}), 400
     
+    tag = request.args.get('tag')
+    days = request.args.get('days', type=int)
+    source_id = request.args.get('source_id', type=int)
+    limit = clamp_page_size(request.args.get('limit', type=int))
+    
+    return cached_json('search', match, tag, days, source_id, limit, fields)
+
+
+@app.route('/api/events/batch', methods=['GET'])
+@conditional_get()
+def get_events_batch():
+    """
+    Get many events by id in one request.
+    
+    Query parameters:
+    - ids: Comma-separated event ids, or occurrence ids of recurring
+      events as listed (at most 500)
+    - fields, view: As for /api/events
+    """
+    return events_batch(request.args.get('ids'), request.args.get('fields'),
+                        request.args.get('view'))
+
+
+@app.route('/api/events/batch', methods=['POST'])
+@read_only
+def post_events_batch():
+    """
+    Get many events by id, for id lists too long for a URL.
+    
+    JSON body: {"ids": [...], "fields": "...", "view": "..."}, as for
+    GET /api/events/batch
+    """
+    data = request.get_json(silent=True) or {}
+    return events_batch(data.get('ids'), data.get('fields'), data.get('view'))
+
+
+def events_batch(ids, fields, view):
+    """Resolve a batch lookup, keeping request order and listing missing ids"""
+    try:
+        ids = parse_ids(ids)
+        fields = parse_fields(fields, view)
+    except (InvalidIds, InvalidFields) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    events, missing = fetch_events_by_id(ids, fields)
     return jsonify({
-        'events': [event.to_dict() for event in events],
+        'events': events,
         'count': len(events),
-        'date': today_start.isoformat()
+        'missing': missing
     })
 
 
 @app.route('/api/events/<int:event_id>', methods=['GET'])
 def get_event(event_id):
-    """Get a single event by ID"""
-    event = Event.query.get_or_404(event_id)
-    return jsonify(event.to_dict())
+    """Get a single event by ID (accepts fields and view like /api/events)"""
+    try:
+        fields = parse_fields(request.args.get('fields'), request.args.get('view'))
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+    
+    rows = fetch_event_rows(select_events(fields).where(Event.id == event_id))
+    if not rows:
+        abort(404)
+    return jsonify(serializer_for(fields)(rows[0]))
 
 
 @app.route('/api/sources', methods=['GET'])
+@conditional_get()
 def get_sources():
     """Get all event sources"""
     sources = Source.query.filter_by(active=True).all()
@@ -250,12 +527,14 @@ def get_sources():
 
 
 @app.route('/api/tags', methods=['GET'])
+@conditional_get()
 def get_tags():
-    """Get all available tags"""
-    tags = db.session.query(Event.tag).distinct().filter(Event.tag.isnot(None)).all()
+    """Get all available tags with their display colors"""
+    tags = tag_registry.all()
     
     return jsonify({
-        'tags': [tag[0] for tag in tags]
+        'tags': [tag['name'] for tag in tags],
+        'colors': {tag['name']: tag['color'] for tag in tags}
     })
 
 
@@ -300,10 +579,14 @@ def add_subscription(user_id):
     if not data.get('tag'):
         return jsonify({'error': 'Tag is required'}), 400
     
+    tag_id = tag_registry.id_for(data['tag'], create=False)
+    if tag_id is None:
+        return jsonify({'error': f"Unknown tag: {data['tag']}"}), 400
+    
     # Check if subscription exists
     existing = Subscription.query.filter_by(
         user_id=user_id,
-        tag=data['tag']
+        tag_id=tag_id
     ).first()
     
     if existing:
@@ -311,7 +594,7 @@ def add_subscription(user_id):
     
     subscription = Subscription(
         user_id=user_id,
-        tag=data['tag']
+        tag_id=tag_id
     )
     
     db.session.add(subscription)
@@ -324,6 +607,72 @@ def add_subscription(user_id):
     }), 201
 
 
+@app.route('/api/users/<int:user_id>/subscriptions', methods=['PUT'])
+def replace_subscriptions(user_id):
+    """
+    Replace a user's tag subscriptions with the given set.
+    
+    Body: {"tags": ["Career", "Social"]}. Only the difference from the
+    current set is written, in one transaction.
+    """
+    User.query.get_or_404(user_id)
+    data = request.get_json(silent=True) or {}
+    tags = data.get('tags')
+    
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        return jsonify({'error': 'tags must be a list of tag names'}), 400
+    
+    wanted = set()
+    unknown = []
+    for tag in tags:
+        tag_id = tag_registry.id_for(tag, create=False)
+        if tag_id is None:
+            unknown.append(tag)
+        else:
+            wanted.add(tag_id)
+    if unknown:
+        return jsonify({'error': f"Unknown tags: {', '.join(unknown)}"}), 400
+    
+    existing = set(db.session.scalars(
+        select(Subscription.tag_id).where(Subscription.user_id == user_id)
+    ))
+    removed = existing - wanted
+    added = wanted - existing
+    
+    try:
+        if removed:
+            db.session.execute(
+                delete(Subscription)
+                .where(Subscription.user_id == user_id, Subscription.tag_id.in_(removed))
+            )
+        if added:
+            db.session.execute(insert(Subscription), [
+                {'user_id': user_id, 'tag_id': tag_id} for tag_id in added
+            ])
+        if removed or added:
+            # Core statements skip the session's flush hook; feeds follow subscriptions
+            bump_generation(db.session.connection())
+        subscriptions = db.session.execute(
+            select(Subscription.id, Subscription.tag_id)
+            .where(Subscription.user_id == user_id)
+            .order_by(Subscription.id)
+        ).all()
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent update added one of the same tags first
+        db.session.rollback()
+        return jsonify({'error': 'Subscriptions changed concurrently, retry'}), 409
+    
+    return jsonify({
+        'user_id': user_id,
+        'subscriptions': [
+            {'id': row.id, 'tag': tag_registry.name_for(row.tag_id)} for row in subscriptions
+        ],
+        'added': sorted(tag_registry.name_for(tag_id) for tag_id in added),
+        'removed': sorted(tag_registry.name_for(tag_id) for tag_id in removed)
+    })
+
+
 @app.route('/api/users/<int:user_id>/subscriptions', methods=['GET'])
 def get_user_subscriptions(user_id):
     """Get all subscriptions for a user"""
@@ -336,23 +685,43 @@ def get_user_subscriptions(user_id):
     })
 
 
+@app.route('/api/users/<int:user_id>/events.ics', methods=['GET'])
+@conditional_get(daily=True)
+def get_user_events_feed(user_id):
+    """iCalendar feed of the events matching a user's subscriptions (all if none)"""
+    from utils.ics_feed import feed_query, feed_series
+    
+    user = User.query.get_or_404(user_id)
+    
+    tag_ids = [sub.tag_id for sub in user.subscriptions]
+    return ics_response(feed_query(tag_ids=tag_ids), f"Concierge ({user.name or user.email})",
+                        feed_series(tag_ids=tag_ids))
+
+
+def ics_response(query, name, series=()):
+    """Stream a VCALENDAR for an event query and recurring series"""
+    from utils.ics_feed import generate_feed
+    
+    return current_app.response_class(
+        stream_with_context(generate_feed(query, name, series)),
+        mimetype='text/calendar'
+    )
+
+
 @app.route('/api/stats', methods=['GET'])
+@conditional_get(time_relative=True)
 def get_stats():
-    """Get system statistics"""
-    total_events = Event.query.count()
-    upcoming_events = Event.query.filter(Event.start_time >= datetime.utcnow()).count()
-    total_sources = Source.query.filter_by(active=True).count()
-    total_users = User.query.count()
-    
-    return jsonify({
-        'total_events': total_events,
-        'upcoming_events': upcoming_events,
-        'active_sources': total_sources,
-        'total_users': total_users
-    })
+    """Get system statistics from the maintained counters (see utils.stats)"""
+    return jsonify(stats_payload(read_stats(), tag_registry.name_for))
 
 
 if __name__ == '__main__':
+    # Development server: create / upgrade the schema first (deployments
+    # run `python init_db.py` as a separate step)
+    from init_db import prepare_database
+    with app.app_context():
+        prepare_database()
+    
     # Use debug=False when running in background, or use Ctrl+C to stop
     import sys
     debug_mode = sys.stdin.isatty()  # Only debug if running interactively
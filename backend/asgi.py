@@ -0,0 +1,408 @@
+"""
+ASGI entry point for high-concurrency read traffic.
+
+Serves the read endpoints of app.py (/api/events, /api/events/today,
+/api/tags, /api/sources and /api/stats) on an async database driver
+(aiosqlite, or asyncpg for PostgreSQL), so one process can hold thousands
+of keep-alive connections while queries wait on the database. Queries,
+serialization, cursors, ETags and the response compression are shared
+with the Flask app; writes, search, export and the feeds stay there.
+Window queries take the SQL overlap path (the interval index of
+utils.interval_index is built with the sync session); recurring series
+are loaded on the async engine into utils.recurrence's series cache and
+their occurrences merged in, so listings match the Flask app's.
+
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port 5002
+"""
+import asyncio
+import heapq
+import json
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Hashable, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from models import DataGeneration, Source, StatCounter, Tag
+from utils.cache import bucketed_now, now_bucket
+from utils.compression import ResponseBody, COMPRESS_MIN_SIZE, ENCODERS
+from utils.event_queries import events_window_query, parse_fields, serializer_for, InvalidFields
+from utils.generation import EVENTS_GENERATION
+from utils.http_cache import make_etag
+from utils.pagination import clamp_page_size, decode_cursor, paginate_rows, InvalidCursor
+from utils.pool import engine_options
+from utils.recurrence import (
+    build_series, fetch_occurrence_rows, row_position, series_cache, OVERRIDES_QUERY, SERIES_QUERY
+)
+from utils.sqlite_profile import install_sqlite_profile, READER_BIND
+from utils.stats import stats_payload
+from utils.tags import tag_registry
+
+# Load environment variables
+load_dotenv()
+
+# Where Flask-SQLAlchemy puts relative SQLite paths
+INSTANCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'postgres': 'postgresql+asyncpg',
+}
+
+TAG_ROWS = select(Tag.id, Tag.name, Tag.aliases, Tag.color)
+
+
+def async_database_url(database_uri: str):
+    """DATABASE_URL for the async driver, resolving SQLite paths like app.py."""
+    url = make_url(database_uri)
+    database = url.database
+    if url.drivername == 'sqlite' and database and database != ':memory:' \
+            and not os.path.isabs(database):
+        url = url.set(database=os.path.join(INSTANCE_PATH, database))
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+
+def async_engine_options(database_uri: str) -> dict:
+    """engine_options() for the async engine (aiosqlite defaults to no pool)."""
+    options = engine_options(database_uri)
+    if 'pool_size' in options:
+        options['poolclass'] = AsyncAdaptedQueuePool
+    return options
+
+
+DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///concierge.db')
+engine = create_async_engine(async_database_url(DATABASE_URI), **async_engine_options(DATABASE_URI))
+# Only reads are served here, so connections get the reader profile
+install_sqlite_profile({READER_BIND: engine.sync_engine})
+
+
+# ============================================================================
+# Caching (the asyncio counterpart of utils.cache)
+# ============================================================================
+
+class SingleFlight:
+    """Collapses concurrent loads of the same key into one"""
+
+    def __init__(self):
+        self._inflight = {}
+
+    async def run(self, key: Hashable, load: Callable[[], Awaitable]):
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            value = await load()
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Waiters re-raise it; don't warn when there are none
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
+
+
+class AsyncResponseCache:
+    """LRU + TTL cache of response bodies with single-flight loading"""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 120):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, body)
+        self._flights = SingleFlight()
+
+    async def get(self, key: Hashable, load: Callable[[], Awaitable[ResponseBody]]) -> ResponseBody:
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            return entry[1]
+
+        body = await self._flights.run(key, load)
+        self._entries[key] = (time.monotonic() + self.ttl, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return body
+
+
+response_cache = AsyncResponseCache(
+    maxsize=int(os.getenv('RESPONSE_CACHE_SIZE', 256)),
+    ttl=float(os.getenv('RESPONSE_CACHE_TTL', 120))
+)
+generation_flights = SingleFlight()
+
+
+async def fetch_all(query) -> list:
+    async with engine.connect() as connection:
+        return (await connection.execute(query)).all()
+
+
+async def current_generation() -> int:
+    """Events generation; concurrent requests share one lookup."""
+    async def load():
+        rows = await fetch_all(
+            select(DataGeneration.value).where(DataGeneration.name == EVENTS_GENERATION)
+        )
+        return (rows[0].value or 0) if rows else 0
+    return await generation_flights.run(EVENTS_GENERATION, load)
+
+
+async def fetch_window_rows(start: datetime, end: datetime, **filters) -> list:
+    """
+    utils.interval_index.fetch_window_rows on the async engine.
+
+    Takes the filters of events_window_query. One-off events come from
+    the SQL overlap query; series are loaded into the series cache once
+    per events generation and their occurrences merged in.
+    """
+    generation = await current_generation()
+    if not series_cache.holds(generation):
+        series_cache.store(generation, build_series(
+            await fetch_all(OVERRIDES_QUERY), await fetch_all(SERIES_QUERY)
+        ))
+    rows = await fetch_all(events_window_query(
+        start, end, overlapping=True, series=False, **filters
+    ))
+    occurrences = fetch_occurrence_rows(start, end, generation=generation, **filters)
+    if not occurrences:
+        return rows
+    merged = list(heapq.merge(rows, occurrences, key=row_position))
+    limit = filters.get('limit')
+    return merged[:limit] if limit else merged
+
+
+async def resolve_tag(tag: str) -> int:
+    """Id of a tag name or alias, reloading the tags on a miss (0 if unknown)."""
+    tag_id = tag_registry.cached_id(tag)
+    if tag_id is None:
+        tag_registry.load_rows(await fetch_all(TAG_ROWS))
+        tag_id = tag_registry.cached_id(tag)
+    return tag_id or 0
+
+
+# ============================================================================
+# Responses
+# ============================================================================
+
+def json_body(payload: dict) -> ResponseBody:
+    return ResponseBody(json.dumps(payload, sort_keys=True))
+
+
+def accepted_encoding(request, size: int) -> Optional[str]:
+    """Best encoding in ENCODERS the client accepts, like compression.negotiate_encoding."""
+    if size < COMPRESS_MIN_SIZE:
+        return None
+    weights = {}
+    for part in request.headers.get('accept-encoding', '').split(','):
+        name, _, params = part.partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    for encoding in ENCODERS:
+        quality = weights.get(encoding, weights.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def not_modified(request, etag: str) -> bool:
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    tags = {tag.strip().removeprefix('W/').strip('"') for tag in header.split(',')}
+    return etag in tags or '*' in tags
+
+
+async def cached_response(request, name: str, params: tuple, load, time_relative: bool = True):
+    """Answer from the ETag or the response cache, like app.cached_json + conditional_get."""
+    generation = await current_generation()
+    etag = make_etag(generation, time_relative)
+    headers = {'ETag': f'W/"{etag}"', 'Cache-Control': 'no-cache'}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    body = await response_cache.get(
+        (name, params, generation, now_bucket()), lambda: load(*params)
+    )
+    encoding = accepted_encoding(request, len(body.data))
+    if len(body.data) >= COMPRESS_MIN_SIZE:
+        headers['Vary'] = 'Accept-Encoding'
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return Response(
+        body.encoded(encoding) if encoding else body.data,
+        media_type=body.mimetype, headers=headers
+    )
+
+
+def error(message: str, status: int = 400):
+    return JSONResponse({'error': message}, status_code=status)
+
+
+def int_param(request, name: str, default: Optional[int] = None) -> Optional[int]:
+    """Integer query parameter; malformed values fall back like Flask's type=int."""
+    try:
+        return int(request.query_params[name])
+    except (KeyError, ValueError):
+        return default
+
+
+# ============================================================================
+# Loaders
+# ============================================================================
+
+async def load_events_page(tag, days, source_id, limit, after, fields):
+    now = bucketed_now()
+    rows = await fetch_window_rows(
+        now, now + timedelta(days=days), source_id=source_id,
+        tag_id=await resolve_tag(tag) if tag else None,
+        after=after, limit=limit + 1, fields=fields
+    )
+    rows, next_cursor = paginate_rows(rows, limit, position=row_position)
+    serialize = serializer_for(fields)
+    events = [serialize(row) for row in rows]
+    return json_body({
+        'events': events,
+        'count': len(events),
+        'next_cursor': next_cursor,
+        'filters': {
+            'tag': tag,
+            'days': days,
+            'source_id': source_id,
+            'limit': limit
+        }
+    })
+
+
+async def load_today_events(fields):
+    today_start = bucketed_now().replace(hour=0, minute=0, second=0, microsecond=0)
+    rows = await fetch_window_rows(
+        today_start, today_start + timedelta(days=1), end_inclusive=False, fields=fields
+    )
+    serialize = serializer_for(fields)
+    events = [serialize(row) for row in rows]
+    return json_body({
+        'events': events,
+        'count': len(events),
+        'date': today_start.isoformat()
+    })
+
+
+async def load_tags():
+    tag_registry.load_rows(await fetch_all(TAG_ROWS))
+    tags = tag_registry.all()
+    return json_body({
+        'tags': [tag['name'] for tag in tags],
+        'colors': {tag['name']: tag['color'] for tag in tags}
+    })
+
+
+async def load_sources():
+    rows = await fetch_all(
+        select(Source.id, Source.name, Source.type, Source.last_fetched)
+        .where(Source.active.is_(True))
+    )
+    return json_body({
+        'sources': [{
+            'id': row.id,
+            'name': row.name,
+            'type': row.type,
+            'last_fetched': row.last_fetched.isoformat() if row.last_fetched else None
+        } for row in rows]
+    })
+
+
+async def load_stats():
+    counters = dict(await fetch_all(select(StatCounter.name, StatCounter.value)))
+    tag_names = {row.id: row.name for row in await fetch_all(select(Tag.id, Tag.name))}
+    return json_body(stats_payload(counters, tag_names.get))
+
+
+# ============================================================================
+# Routes
+# ============================================================================
+
+async def health_check(request):
+    return JSONResponse({'status': 'healthy', 'timestamp': datetime.utcnow().isoformat()})
+
+
+async def get_events(request):
+    """Same parameters as GET /api/events in app.py"""
+    cursor = request.query_params.get('cursor')
+    try:
+        after = decode_cursor(cursor) if cursor else None
+        fields = parse_fields(request.query_params.get('fields'), request.query_params.get('view'))
+    except (InvalidCursor, InvalidFields) as e:
+        return error(str(e))
+
+    params = (
+        request.query_params.get('tag'),
+        int_param(request, 'days', 7),
+        int_param(request, 'source_id'),
+        clamp_page_size(int_param(request, 'limit')),
+        after,
+        fields,
+    )
+    return await cached_response(request, 'events', params, load_events_page)
+
+
+async def get_today_events(request):
+    try:
+        fields = parse_fields(request.query_params.get('fields'), request.query_params.get('view'))
+    except InvalidFields as e:
+        return error(str(e))
+    return await cached_response(request, 'today', (fields,), load_today_events)
+
+
+async def get_tags(request):
+    return await cached_response(request, 'tags', (), load_tags, time_relative=False)
+
+
+async def get_sources(request):
+    return await cached_response(request, 'sources', (), load_sources, time_relative=False)
+
+
+async def get_stats(request):
+    return await cached_response(request, 'stats', (), load_stats)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await engine.dispose()
+
+
+app = Starlette(
+    routes=[
+        Route('/api/health', health_check),
+        Route('/api/events', get_events),
+        Route('/api/events/today', get_today_events),
+        Route('/api/tags', get_tags),
+        Route('/api/sources', get_sources),
+        Route('/api/stats', get_stats),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'])],
+    lifespan=lifespan,
+)
@@ -0,0 +1,165 @@
+"""
+Benchmark concurrent read traffic: Flask under gunicorn vs asgi.py under uvicorn.
+
+Usage:
+    python -m benchmarks.bench_asgi [seconds] [connections,...]
+
+Seeds 20k events, starts both servers on local ports and, for each
+concurrency level (default 50, 500 and 2000 open client connections),
+sends /api/events, /api/events/today and /api/tags requests over
+keep-alive connections for `seconds` (default 5). Reports throughput,
+latency percentiles and failed requests. gunicorn runs sync workers
+(2 x cores + 1), which close the connection after every response, so its
+clients reconnect; uvicorn keeps every connection open.
+"""
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import get_app, reset_database, seed_events
+
+EVENTS = 20_000
+LEVELS = (50, 500, 2000)
+CONNECT_TIMEOUT = 5.0
+REQUEST_TIMEOUT = 10.0
+WORKERS = 2 * (os.cpu_count() or 1) + 1
+
+SERVERS = {
+    'flask + gunicorn': [
+        sys.executable, '-m', 'gunicorn', 'app:app', '--workers', str(WORKERS),
+        '--bind', '127.0.0.1:{port}', '--backlog', '4096', '--log-level', 'warning'
+    ],
+    'asgi + uvicorn': [
+        sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', '{port}',
+        '--backlog', '4096', '--log-level', 'warning', '--no-access-log'
+    ],
+}
+
+
+def request_paths(rng: random.Random):
+    while True:
+        roll = rng.random()
+        if roll < 0.6:
+            yield f'/api/events?days=7&limit=50&source_id={rng.randrange(1, 6)}'
+        elif roll < 0.9:
+            yield '/api/events/today'
+        else:
+            yield '/api/tags'
+
+
+async def read_response(reader) -> bool:
+    """Read one response; returns whether the server keeps the connection open."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    if not lines[0].split()[1].startswith(('2', '3')):
+        raise ConnectionError(lines[0])
+    headers = dict(line.lower().split(': ', 1) for line in lines[1:] if ': ' in line)
+    await reader.readexactly(int(headers.get('content-length', 0)))
+    return headers.get('connection') != 'close'
+
+
+async def client(port: int, deadline: float, seed: int, timings: list, errors: list):
+    paths = request_paths(random.Random(seed))
+    reader = writer = None
+    while time.monotonic() < deadline:
+        began = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection('127.0.0.1', port), CONNECT_TIMEOUT
+                )
+            writer.write(
+                f'GET {next(paths)} HTTP/1.1\r\nHost: localhost\r\n'
+                f'Accept-Encoding: gzip\r\n\r\n'.encode()
+            )
+            keep_alive = await asyncio.wait_for(read_response(reader), REQUEST_TIMEOUT)
+            timings.append((time.perf_counter() - began) * 1000)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            errors.append(1)
+            keep_alive = False
+            await asyncio.sleep(0.1)
+        if not keep_alive and writer is not None:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def load(port: int, connections: int, seconds: float) -> tuple:
+    timings, errors = [], []
+    deadline = time.monotonic() + seconds
+    began = time.monotonic()
+    await asyncio.gather(*(
+        client(port, deadline, seed, timings, errors) for seed in range(connections)
+    ))
+    return timings, len(errors), time.monotonic() - began
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_listening(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+def start_server(command: list) -> tuple:
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    port = free_port()
+    process = subprocess.Popen(
+        [part.format(port=port) for part in command], cwd=backend,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    wait_until_listening(port)
+    return process, port
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    levels = [int(level) for level in sys.argv[2].split(',')] if len(sys.argv) > 2 else LEVELS
+
+    app = get_app()
+    reset_database(app)
+    seed_events(app, EVENTS)
+    with app.app_context():
+        from init_db import prepare_database
+        prepare_database()
+
+    print(f"{EVENTS} events, {seconds:.0f} s per level, {os.cpu_count()} CPU(s)")
+    for label, command in SERVERS.items():
+        process, port = start_server(command)
+        try:
+            asyncio.run(load(port, 10, 1.0))  # Warm up caches and pools
+            for connections in levels:
+                timings, errors, elapsed = asyncio.run(load(port, connections, seconds))
+                timings.sort()
+                if not timings:
+                    print(f"  ✗ {label:<17} {connections:>5} conns | no successful requests")
+                    continue
+                p50 = statistics.median(timings)
+                p99 = timings[int(len(timings) * 0.99) - 1]
+                mark = '✓' if not errors else '✗'
+                print(f"  {mark} {label:<17} {connections:>5} conns | "
+                      f"{len(timings) / elapsed:7.0f} req/s | p50 {p50:7.1f} ms | "
+                      f"p99 {p99:7.1f} ms | errors {errors:>5}")
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
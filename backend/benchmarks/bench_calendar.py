@@ -0,0 +1,64 @@
+"""
+Benchmark the calendar endpoint against bucketing listings client-side.
+
+Usage:
+    python -m benchmarks.bench_calendar [events]
+
+Seeds `events` (default 50k) events over 30 days and, for a 31-day month
+view in America/New_York, compares:
+
+- listing: every event of the month as /api/events?days=31 serializes it
+  (the client then buckets them itself)
+- calendar: utils.calendar_view.calendar_payload, with no titles and
+  with the first 3 titles per day
+
+reporting time to build the JSON body and its size.
+"""
+import json
+import sys
+from datetime import timedelta
+
+from benchmarks.common import get_app, reset_database, seed_events, timed
+
+EVENTS = 50_000
+REPEAT = 5
+TZ = 'America/New_York'
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else EVENTS
+    app = get_app()
+    reset_database(app)
+    now = seed_events(app, count)
+
+    from utils.calendar_view import calendar_payload
+    from utils.event_queries import serializer_for, EVENT_FIELDS
+    from utils.interval_index import fetch_window_rows
+
+    first = now.date()
+    last = first + timedelta(days=30)
+
+    def listing():
+        rows = fetch_window_rows(now, now + timedelta(days=31))
+        serialize = serializer_for(EVENT_FIELDS)
+        return json.dumps({'events': [serialize(row) for row in rows]})
+
+    def calendar(titles):
+        return lambda: json.dumps(calendar_payload(first, last, TZ, titles=titles))
+
+    with app.test_request_context():
+        print(f"{count} events over 30 days, 31-day month view in {TZ}")
+        print(f"  {'response':<22} {'time':>9} {'size':>10}")
+        for label, build in (
+            ('listing (days=31)', listing),
+            ('calendar', calendar(0)),
+            ('calendar, 3 titles', calendar(3)),
+        ):
+            build()
+            size = len(build().encode())
+            elapsed = timed(build, repeat=REPEAT) * 1000
+            print(f"  {label:<22} {elapsed:>7.1f}ms {size / 1024:>8.1f}KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark response compression on event listings.
+
+Usage:
+    python -m benchmarks.bench_compression [row_counts...]
+
+Defaults to 20k rows. For a full page of /api/events (full and compact
+views) reports bytes on the wire and CPU time per request for:
+
+- identity: no compression (the previous behaviour)
+- per request: compressing the body on every request
+- cached: precompressed bytes served from the response cache
+"""
+import sys
+import time
+
+from benchmarks.common import get_app, reset_database, seed_events
+
+REQUESTS = 200
+URLS = {
+    'full': '/api/events?days=30&limit=500',
+    'compact': '/api/events?days=30&limit=500&view=compact',
+}
+
+
+def cpu_per_request(fn, repeat: int = REQUESTS) -> float:
+    """Average CPU time of fn in milliseconds."""
+    fn()
+    started = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - started) * 1000 / repeat
+
+
+def run(count: int):
+    from utils.compression import ENCODERS
+
+    app = get_app()
+    reset_database(app)
+    seed_events(app, count)
+    client = app.test_client()
+
+    print(f"{count} events, {REQUESTS} requests per measurement")
+    for view, url in URLS.items():
+        identity = client.get(url, headers={'Accept-Encoding': 'identity'})
+        body = identity.get_data()
+        identity_cpu = cpu_per_request(
+            lambda: client.get(url, headers={'Accept-Encoding': 'identity'})
+        )
+        print(f"  {view}: identity {len(body):>9,} B | {identity_cpu:6.2f} ms CPU")
+
+        for encoding, encode in ENCODERS.items():
+            headers = {'Accept-Encoding': encoding}
+            response = client.get(url, headers=headers)
+            assert response.content_encoding == encoding
+            wire = len(response.get_data())
+
+            per_request_cpu = identity_cpu + cpu_per_request(lambda: encode(body))
+            cached_cpu = cpu_per_request(lambda: client.get(url, headers=headers))
+            print(f"  {view}: {encoding:<8} {wire:>9,} B ({wire / len(body):6.1%}) | "
+                  f"per request {per_request_cpu:6.2f} ms CPU | "
+                  f"cached {cached_cpu:6.2f} ms CPU")
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [20_000]
+    for count in counts:
+        run(count)
+
+
+if __name__ == '__main__':
+    main()
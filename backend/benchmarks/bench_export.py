@@ -0,0 +1,72 @@
+"""
+Benchmark the NDJSON export against building the whole dump in memory.
+
+Usage:
+    python -m benchmarks.bench_export [row_counts...]
+
+Defaults to 10k and 100k rows. Dumps every event in a 30 day window two
+ways and reports time to first byte, total time and peak Python memory:
+
+- buffered: list of rows -> list of dicts -> one JSON string, which is
+  what /api/events?days=... did before it was paginated
+- export: /api/events/export streamed through the test client
+"""
+import sys
+import time
+import tracemalloc
+from datetime import timedelta
+
+from benchmarks.common import get_app, reset_database, seed_events
+
+
+def measure(fn):
+    """Run fn(on_first_byte) and return (first byte s, total s, peak bytes)."""
+    first = []
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn(lambda: first or first.append(time.perf_counter() - started))
+    total = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first[0], total, peak
+
+
+def run(count: int):
+    from flask import json
+    from utils.event_queries import events_window_query, fetch_event_dicts
+
+    app = get_app()
+    reset_database(app)
+    now = seed_events(app, count)
+    client = app.test_client()
+
+    def buffered(on_first_byte):
+        with app.app_context():
+            query = events_window_query(now, now + timedelta(days=30))
+            body = json.dumps({'events': fetch_event_dicts(query)})
+            on_first_byte()
+            return body
+
+    def export(on_first_byte):
+        response = client.get('/api/events/export?days=30', buffered=False)
+        lines = 0
+        for chunk in response.response:
+            on_first_byte()
+            lines += chunk.count(b'\n') if isinstance(chunk, bytes) else chunk.count('\n')
+        response.close()
+        assert lines == count, lines
+
+    for name, fn in (('buffered', buffered), ('export', export)):
+        first, total, peak = measure(fn)
+        print(f"{count:>8} rows | {name:<8} | first byte {first * 1000:8.1f} ms | "
+              f"total {total * 1000:8.1f} ms | peak memory {peak / 2 ** 20:7.1f} MiB")
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    for count in counts:
+        run(count)
+
+
+if __name__ == '__main__':
+    main()
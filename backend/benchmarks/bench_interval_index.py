@@ -0,0 +1,107 @@
+"""
+Benchmark window queries: interval index vs SQL.
+
+Usage:
+    python -m benchmarks.bench_interval_index [events]
+
+Seeds `events` (default 50k) events over 30 days, 5% of them lasting
+several days, and for each window query times:
+
+- SQL, start_time only: the old query (misses events already running)
+- SQL, overlapping: the same semantics as the index, on SQL
+- index: ids from utils.interval_index (O(log n + k))
+- index + rows: fetch_window_rows, i.e. ids plus the primary key lookup
+
+It also reports the index build time, memory per event and the time to
+patch it after an ingest of 100 events.
+"""
+import random
+import sys
+from datetime import timedelta
+
+from sqlalchemy import select, update
+
+from benchmarks.common import get_app, reset_database, seed_events, timed
+
+EVENTS = 50_000
+LONG_EVENT_SHARE = 0.05
+REPEAT = 20
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else EVENTS
+    app = get_app()
+    reset_database(app)
+    now = seed_events(app, count)
+
+    from models import db, Event, Source
+    from utils.event_queries import events_window_query, fetch_event_rows
+    from utils.generation import get_generation, EVENT_ROWS_GENERATION
+    from utils.interval_index import event_index, fetch_window_rows, IntervalIndex, INDEX_COLUMNS
+    from utils.tags import tag_registry
+
+    rng = random.Random(7)
+    with app.app_context():
+        long_ids = rng.sample(range(1, count + 1), int(count * LONG_EVENT_SHARE))
+        starts = dict(db.session.execute(
+            select(Event.id, Event.start_time).where(Event.id.in_(long_ids))
+        ).all())
+        db.session.execute(update(Event), [
+            {'id': event_id, 'end_time': start + timedelta(days=4)}
+            for event_id, start in starts.items()
+        ])
+        db.session.commit()
+
+        rows = fetch_event_rows(select(*INDEX_COLUMNS))
+        build = timed(lambda: IntervalIndex(rows), repeat=3)
+        index = event_index.current(get_generation(EVENT_ROWS_GENERATION))
+        print(f"{count} events ({LONG_EVENT_SHARE:.0%} multi-day)")
+        print(f"  index build {build * 1000:.0f} ms from loaded rows | "
+              f"{index.memory_bytes() / len(index):.1f} bytes/event | "
+              f"{index.memory_bytes() / 2 ** 20:.2f} MiB")
+
+        day_start = (now + timedelta(days=10)).replace(hour=0, minute=0, second=0, microsecond=0)
+        career = tag_registry.id_for('Career', create=False)
+        social = tag_registry.id_for('Social', create=False)
+        cases = [
+            ('7-day page (limit 51)', dict(start=now, end=now + timedelta(days=7), limit=51)),
+            ('7-day page, tag', dict(start=now, end=now + timedelta(days=7), tag='Career', limit=51)),
+            ('one day, full', dict(start=day_start, end=day_start + timedelta(days=1), end_inclusive=False)),
+            ('24 h digest, 2 tags', dict(start=now + timedelta(days=12), end=now + timedelta(days=13),
+                                         tag_ids=[career, social])),
+        ]
+
+        print(f"  {'query':<24} {'rows':>6} {'SQL start':>10} {'SQL overlap':>12} "
+              f"{'index':>9} {'index+rows':>11}")
+        for label, window in cases:
+            start, end = window['start'], window['end']
+            options = {key: value for key, value in window.items() if key not in ('start', 'end')}
+            start_only = lambda: fetch_event_rows(events_window_query(start, end, **options))
+            overlap = lambda: fetch_event_rows(events_window_query(start, end, overlapping=True, **options))
+            index_options = dict(options)
+            if 'tag' in index_options:
+                index_options['tag_id'] = tag_registry.id_for(index_options.pop('tag'), create=False)
+            ids_only = lambda: index.overlapping(start, end, **index_options)
+            with_rows = lambda: fetch_window_rows(start, end, **options)
+
+            rows = with_rows()
+            assert [row.id for row in rows] == [row.id for row in overlap()]
+            times = [timed(fn, repeat=REPEAT) * 1000 for fn in (start_only, overlap, ids_only, with_rows)]
+            print(f"  {label:<24} {len(rows):>6} {times[0]:>8.2f}ms {times[1]:>10.2f}ms "
+                  f"{times[2]:>7.3f}ms {times[3]:>9.2f}ms")
+
+        # Patch after an ingest
+        source_id = db.session.scalar(select(Source.id))
+        for i in range(100):
+            db.session.add(Event(
+                title=f'Ingested {i}', start_time=now + timedelta(hours=i), source_id=source_id,
+                fingerprint=f'patch-{i}'
+            ))
+        db.session.commit()
+        patch = timed(lambda: event_index.current(get_generation(EVENT_ROWS_GENERATION)), repeat=1)
+        print(f"  patch after 100 new events {patch * 1000:.0f} ms "
+              f"(index now {len(event_index.current(get_generation(EVENT_ROWS_GENERATION)))} events)")
+
+
+if __name__ == '__main__':
+    main()
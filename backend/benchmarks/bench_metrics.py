@@ -0,0 +1,113 @@
+"""
+Benchmark the cost of request and SQL metrics (utils.metrics).
+
+Usage:
+    python -m benchmarks.bench_metrics [requests]
+
+Seeds 20k events, then serves the same mix of requests (listing pages,
+today, tags, single events) through the Flask test client in fresh
+processes with METRICS_ENABLED off and on, alternating for ROUNDS rounds,
+and reports the median time per request and the overhead of collection.
+"""
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+EVENTS = 20_000
+ROUNDS = 3
+TARGET_OVERHEAD = 0.03
+
+
+def use_bench_database():
+    """Point the app at the database chosen by the parent process."""
+    import benchmarks.common  # noqa: F401 (sets its own scratch DATABASE_URL)
+    os.environ['DATABASE_URL'] = os.environ['BENCH_DATABASE_URL']
+
+
+def request_paths(count: int) -> list:
+    rng = random.Random(3)
+    paths = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.4:
+            paths.append(f'/api/events?days={rng.randrange(1, 15)}&limit=50&source_id={rng.randrange(1, 6)}')
+        elif roll < 0.8:
+            paths.append(f'/api/events/{rng.randrange(1, EVENTS)}')
+        elif roll < 0.9:
+            paths.append('/api/events/today')
+        else:
+            paths.append('/api/tags')
+    return paths
+
+
+def serve(count: int):
+    from app import get_app
+
+    client = get_app().test_client()
+    paths = request_paths(count)
+    for path in paths[:50]:  # Warm up
+        client.get(path)
+    began = time.perf_counter()
+    for path in paths:
+        client.get(path)
+    print(json.dumps({'seconds': time.perf_counter() - began}))
+
+
+def child(role: str, metrics: str, database_url: str, *args) -> dict:
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, METRICS_ENABLED=metrics, BENCH_DATABASE_URL=database_url)
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_metrics', role, *args],
+        cwd=backend, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        text=True, check=True
+    ).stdout
+    lines = output.strip().splitlines()
+    return json.loads(lines[-1]) if lines and lines[-1].startswith('{') else {}
+
+
+def seed():
+    from benchmarks.common import reset_database, seed_events
+    from app import get_app
+    from init_db import prepare_database
+
+    app = get_app()
+    reset_database(app)
+    seed_events(app, EVENTS)
+    with app.app_context():
+        prepare_database()
+
+
+def main():
+    count = sys.argv[1] if len(sys.argv) > 1 else '3000'
+    from benchmarks.common import _DB_DIR
+    database_url = f"sqlite:///{os.path.join(_DB_DIR, 'metrics.db')}"
+    child('seed', 'off', database_url)
+
+    timings = {'off': [], 'on': []}
+    for _ in range(ROUNDS):
+        for metrics in timings:
+            result = child('serve', metrics, database_url, count)
+            timings[metrics].append(result['seconds'] / int(count) * 1000)
+
+    off, on = statistics.median(timings['off']), statistics.median(timings['on'])
+    overhead = (on - off) / off
+    mark = '✓' if overhead < TARGET_OVERHEAD else '✗'
+    print(f"{EVENTS} events, {count} requests x {ROUNDS} rounds per mode")
+    print(f"  metrics off  {off:6.3f} ms/request")
+    print(f"  metrics on   {on:6.3f} ms/request")
+    print(f"  {mark} overhead    {overhead:+.1%} (target < {TARGET_OVERHEAD:.0%})")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] in ('seed', 'serve'):
+        use_bench_database()
+        if sys.argv[1] == 'seed':
+            seed()
+        else:
+            serve(int(sys.argv[2]))
+    else:
+        main()
@@ -0,0 +1,75 @@
+"""
+Benchmark the event listing read path against the ORM to_dict() path.
+
+Usage:
+    python -m benchmarks.bench_read_path [row_counts...]
+
+Defaults to 10k and 100k rows. Each path lists every event in the window,
+ordered by start time, and serializes it for the API.
+"""
+import sys
+from datetime import timedelta
+
+from sqlalchemy import event as sa_event
+
+from benchmarks.common import get_app, reset_database, seed_events, timed
+
+
+def count_statements(engine, fn):
+    """Run fn and return the number of SQL statements it executed."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    sa_event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        fn()
+    finally:
+        sa_event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return len(statements)
+
+
+def run(count: int):
+    from models import db, Event
+    from utils.event_queries import events_window_query, fetch_event_dicts
+
+    app = get_app()
+    reset_database(app)
+    now = seed_events(app, count)
+    start = now - timedelta(minutes=1)
+    end = now + timedelta(days=31)
+
+    with app.app_context():
+        def orm_path():
+            events = Event.query.filter(
+                Event.start_time >= start,
+                Event.start_time <= end
+            ).order_by(Event.start_time.asc()).all()
+            result = [event.to_dict() for event in events]
+            db.session.expunge_all()
+            return result
+
+        def read_path():
+            return fetch_event_dicts(events_window_query(start, end))
+
+        assert orm_path() == read_path()
+
+        orm_statements = count_statements(db.engine, orm_path)
+        read_statements = count_statements(db.engine, read_path)
+        orm_time = timed(orm_path)
+        read_time = timed(read_path)
+
+    print(f"{count:>8} rows | to_dict: {orm_time * 1000:9.1f} ms "
+          f"({orm_statements} stmts) | read path: {read_time * 1000:9.1f} ms "
+          f"({read_statements} stmts) | {orm_time / read_time:4.1f}x")
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    for count in counts:
+        run(count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark lazy expansion of recurring events (utils.recurrence).
+
+Usage:
+    python -m benchmarks.bench_recurrence [series]
+
+Seeds 20k one-off events plus an ICS feed of `series` (default 500)
+open-ended weekly series that started up to two years ago, some with
+EXDATEs and moved instances, ingested through the ICS parser. For each
+window query it times fetch_window_rows:
+
+- cold: series loaded and expanded from scratch (first request after a
+  write)
+- cached: the same window again, and a window starting a second later
+  (rolling "now" windows share the cache by whole days)
+- no series: the same query before the feed was ingested
+
+It also reports how many rows the series take, against materialising a
+year of their occurrences.
+"""
+import random
+import sys
+from datetime import timedelta
+
+from benchmarks.common import get_app, reset_database, seed_events, timed
+
+EVENTS = 20_000
+SERIES = 500
+REPEAT = 20
+
+
+def weekly_feed(count: int, now) -> bytes:
+    """ICS calendar of `count` weekly series, with exceptions."""
+    rng = random.Random(11)
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//concierge//bench//EN']
+    for i in range(count):
+        start = (now - timedelta(days=rng.randrange(0, 730))).replace(
+            hour=rng.randrange(8, 20), minute=0, second=0, microsecond=0
+        )
+        stamp = start.strftime('%Y%m%dT%H%M%S')
+        lines += [
+            'BEGIN:VEVENT',
+            f'UID:series-{i}@bench',
+            f'SUMMARY:Weekly meeting {i}',
+            f'DTSTART;TZID=America/New_York:{stamp}',
+            f'DTEND;TZID=America/New_York:{(start + timedelta(hours=1)).strftime("%Y%m%dT%H%M%S")}',
+            f'RRULE:FREQ=WEEKLY;BYDAY={"MO TU WE TH FR".split()[i % 5]}',
+        ]
+        if i % 4 == 0:
+            skipped = start + timedelta(weeks=rng.randrange(1, 80))
+            lines.append(f'EXDATE;TZID=America/New_York:{skipped.strftime("%Y%m%dT%H%M%S")}')
+        lines.append('END:VEVENT')
+        if i % 10 == 0:
+            # Next week's instance moved by two hours
+            occurrence = start + timedelta(weeks=((now - start).days // 7) + 1)
+            lines += [
+                'BEGIN:VEVENT',
+                f'UID:series-{i}@bench',
+                f'RECURRENCE-ID;TZID=America/New_York:{occurrence.strftime("%Y%m%dT%H%M%S")}',
+                f'SUMMARY:Weekly meeting {i} (moved)',
+                f'DTSTART;TZID=America/New_York:{(occurrence + timedelta(hours=2)).strftime("%Y%m%dT%H%M%S")}',
+                'END:VEVENT',
+            ]
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(lines).encode()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else SERIES
+    app = get_app()
+    reset_database(app)
+    now = seed_events(app, EVENTS)
+
+    from sqlalchemy import func, select
+    from models import db, Event, Source
+    from ingestion.ics_parser import parse_ics_content
+    from ingestion.ingest import store_events
+    from utils.interval_index import fetch_window_rows
+    from utils.recurrence import load_series, series_cache
+
+    day_start = (now + timedelta(days=2)).replace(hour=0, minute=0, second=0, microsecond=0)
+    cases = [
+        ('7-day page (limit 51)', dict(start=now, end=now + timedelta(days=7), limit=51)),
+        ('one day, full', dict(start=day_start, end=day_start + timedelta(days=1), end_inclusive=False)),
+        ('30 days, full', dict(start=now, end=now + timedelta(days=30))),
+    ]
+    with app.app_context():
+        fetch_window_rows(start=now, end=now)
+        baseline = {
+            label: timed(lambda: fetch_window_rows(**window), repeat=REPEAT) * 1000
+            for label, window in cases
+        }
+
+    feed = weekly_feed(count, now)
+    parse = timed(lambda: parse_ics_content(feed), repeat=3)
+    events = parse_ics_content(feed)
+
+    with app.app_context():
+        source = Source(name='Bench calendar', type='ics', url='bench')
+        db.session.add(source)
+        db.session.commit()
+        store_events(events, source.id)
+        stored = db.session.scalar(select(func.count(Event.id)).where(Event.source_id == source.id))
+        series = load_series()
+        yearly = sum(len(item.rules.between(now, now + timedelta(days=365))) for item in series)
+        load = timed(load_series, repeat=3)
+
+        print(f"{EVENTS} one-off events + {count} open-ended weekly series")
+        print(f"  feed parsed in {parse * 1000:.0f} ms | {stored} rows stored "
+              f"(a year of occurrences materialised would be {yearly} rows)")
+        print(f"  series load {load * 1000:.1f} ms")
+
+        def cold(window):
+            series_cache.invalidate()
+            return fetch_window_rows(**window)
+
+        print(f"  {'query':<24} {'rows':>6} {'occurr.':>8} {'cold':>9} {'cached':>9} "
+              f"{'+1 s':>9} {'no series':>10}")
+        for label, window in cases:
+            rows = fetch_window_rows(**window)
+            occurrences = sum(1 for row in rows if row.title.startswith('Weekly meeting'))
+            later = dict(window, start=window['start'] + timedelta(seconds=1),
+                         end=window['end'] + timedelta(seconds=1))
+            cold_ms = timed(lambda: cold(window), repeat=3) * 1000
+            fetch_window_rows(**window)
+            cached_ms = timed(lambda: fetch_window_rows(**window), repeat=REPEAT) * 1000
+            later_ms = timed(lambda: fetch_window_rows(**later), repeat=REPEAT) * 1000
+            print(f"  {label:<24} {len(rows):>6} {occurrences:>8} {cold_ms:>7.1f}ms "
+                  f"{cached_ms:>7.2f}ms {later_ms:>7.2f}ms {baseline[label]:>8.2f}ms")
+
+        stats = series_cache.stats()
+        print(f"  cache: {stats['windows']} windows, {stats['hits']} hits, {stats['misses']} misses")
+
+
+if __name__ == '__main__':
+    main()
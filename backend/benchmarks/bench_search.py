@@ -0,0 +1,102 @@
+"""
+Benchmark full-text search over events.
+
+Usage:
+    python -m benchmarks.bench_search [row_counts...]
+
+Defaults to 100k rows. Runs a mixed workload of search queries through
+the same code as /api/events/search (response cache bypassed)
+and reports latency percentiles per kind of query against a 10 ms p95
+target. Exits with status 1 if any kind of query misses it.
+"""
+import random
+import statistics
+import sys
+import time
+from datetime import timedelta
+
+from benchmarks.common import (
+    get_app, reset_database, seed_events, vocabulary, FILLER, TAGS, WORDS
+)
+
+TARGET_MS = 10.0
+
+
+def workload(rng: random.Random, size: int = 50) -> dict:
+    """Search texts by kind, drawn from the seeded vocabulary."""
+    words, _ = vocabulary()
+    tail = words[len(FILLER) + len(WORDS):]
+    return {
+        # Long-tail word, e.g. a speaker or building name
+        'rare word': [rng.choice(tail[1000:]) for _ in range(size)],
+        # Topic word plus a long-tail word, like a remembered title
+        'title words': [
+            f'{rng.choice(WORDS)} {rng.choice(tail[100:])}' for _ in range(size)
+        ],
+        # Still typing: first letters of a word
+        'prefix': [rng.choice(tail[200:])[:4] for _ in range(size)],
+        # Topic words matching a large share of all events
+        'broad topic': [f'{rng.choice(WORDS)} {rng.choice(WORDS)}' for _ in range(size)],
+        'single topic': [rng.choice(WORDS) for _ in range(size)],
+    }
+
+
+def run(count: int) -> int:
+    """Benchmark `count` events; returns how many kinds of query missed the target."""
+    from models import db
+    from sqlalchemy import text
+    from utils.search import build_match_query, ensure_search_index, search_events, FTS_TABLE
+
+    app = get_app()
+    reset_database(app)
+    now = seed_events(app, count)
+    rng = random.Random(7)
+
+    with app.app_context():
+        started = time.perf_counter()
+        ensure_search_index()
+        print(f"{count} events indexed in {time.perf_counter() - started:.1f} s")
+
+        start = now - timedelta(minutes=1)
+        missed = 0
+        for kind, texts in workload(rng).items():
+            for filtered in (False, True):
+                timings, matches = [], []
+                for q in texts:
+                    match = build_match_query(q)
+                    options = {'tag': rng.choice(TAGS), 'end': start + timedelta(days=7)} \
+                        if filtered else {}
+                    search_events(match, start, limit=50, **options)  # Warm the page cache
+                    # A request reads the generation counters once
+                    with app.test_request_context():
+                        began = time.perf_counter()
+                        search_events(match, start, limit=50, **options)
+                        timings.append((time.perf_counter() - began) * 1000)
+                    matches.append(db.session.execute(
+                        text(f'SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :q'),
+                        {'q': match}
+                    ).scalar())
+
+                timings.sort()
+                p50 = statistics.median(timings)
+                p95 = timings[int(len(timings) * 0.95) - 1]
+                mark = '✓' if p95 < TARGET_MS else '✗'
+                missed += p95 >= TARGET_MS
+                label = f"{kind}{' +tag,7d' if filtered else ''}"
+                print(f"  {mark} {label:<22} p50 {p50:6.2f} ms | p95 {p95:6.2f} ms | "
+                      f"max {timings[-1]:6.2f} ms | median matches "
+                      f"{int(statistics.median(matches)):>6}")
+    return missed
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [100_000]
+    missed = sum(run(count) for count in counts)
+    if missed:
+        print(f"\n✗ {missed} kind(s) of query missed the {TARGET_MS:g} ms p95 target")
+        sys.exit(1)
+    print(f"\n✓ Every kind of query within the {TARGET_MS:g} ms p95 target")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark API read latency while ingestion writes to the same SQLite file.
+
+Usage:
+    python -m benchmarks.bench_sqlite_concurrency [seconds]
+
+For SQLite's defaults (rollback journal, SQLITE_PROFILE=off) and for the
+WAL profile with separate reader / writer connections (utils.sqlite_profile),
+seeds 20k events, then for `seconds` (default 10) runs, in two processes:
+
+- a writer storing new events through ingestion.ingest.store_events,
+  which commits per row like a real ingest run
+- a reader requesting /api/events pages and single events, 20 per
+  second, with the response cache disabled so every request reads the
+  database
+
+and reports the reader's latency percentiles, failed or stale responses
+and how many rows the writer committed meanwhile.
+"""
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+EVENTS = 20_000
+MODES = {'rollback journal': 'off', 'WAL profile': 'on'}
+TARGET_P99_MS = 50.0
+READ_INTERVAL = 0.05  # s between reader requests
+
+
+def use_bench_database():
+    """Point the app at the database chosen by the parent process."""
+    import benchmarks.common  # noqa: F401 (sets its own scratch DATABASE_URL)
+    os.environ['DATABASE_URL'] = os.environ['BENCH_DATABASE_URL']
+
+
+def seed():
+    from benchmarks.common import reset_database, seed_events
+    from app import get_app
+    from init_db import prepare_database
+
+    app = get_app()
+    reset_database(app)
+    seed_events(app, EVENTS)
+    with app.app_context():
+        prepare_database()
+
+
+def write(seconds: float):
+    from app import get_app
+    from ingestion.ingest import store_events
+    from models import Source
+
+    app = get_app()
+    rng = random.Random(1)
+    deadline = time.monotonic() + seconds
+    written = 0
+    with app.app_context():
+        source_id = Source.query.first().id
+        while time.monotonic() < deadline:
+            start = datetime.utcnow() + timedelta(minutes=rng.randrange(7 * 24 * 60))
+            events = [{
+                'title': f'Ingested event {written + i}',
+                'description': 'Written during the benchmark',
+                'start_time': start,
+                'end_time': start + timedelta(hours=1),
+                'location': f'Room {rng.randrange(100, 999)}',
+                'tag': 'Social',
+            } for i in range(20)]
+            written += store_events(events, source_id)[0]
+    print(json.dumps({'written': written}))
+
+
+def read(seconds: float):
+    from app import get_app
+
+    client = get_app().test_client()
+    rng = random.Random(2)
+    timings, bad = [], 0
+    deadline = time.monotonic() + seconds
+    next_request = time.monotonic()
+    while time.monotonic() < deadline:
+        # Paced like real traffic rather than saturating the CPU
+        next_request += READ_INTERVAL
+        time.sleep(max(0.0, next_request - time.monotonic()))
+        if rng.random() < 0.5:
+            url = f'/api/events?days=7&limit=100&source_id={rng.randrange(1, 6)}'
+        else:
+            url = f'/api/events/{rng.randrange(1, EVENTS)}'
+        began = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - began) * 1000)
+        if response.status_code != 200 or response.headers.get('X-Data-Stale'):
+            bad += 1
+    print(json.dumps({'timings': timings, 'bad': bad}))
+
+
+def child(role: str, profile: str, database_url: str, *args) -> subprocess.Popen:
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(
+        os.environ, SQLITE_PROFILE=profile, BENCH_DATABASE_URL=database_url,
+        RESPONSE_CACHE_SIZE='0'
+    )
+    return subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.bench_sqlite_concurrency', role, *args],
+        cwd=backend, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+
+
+def result(process: subprocess.Popen) -> dict:
+    output, _ = process.communicate()
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    seconds = sys.argv[1] if len(sys.argv) > 1 else '10'
+    directory = tempfile.mkdtemp(prefix='concierge-bench-')
+
+    print(f"{EVENTS} events, reader and writer running for {seconds} s")
+    for label, profile in MODES.items():
+        database_url = f"sqlite:///{os.path.join(directory, f'{profile}.db')}"
+        child('seed', profile, database_url).communicate()
+
+        writer = child('write', profile, database_url, seconds)
+        reader = child('read', profile, database_url, seconds)
+        reads, writes = result(reader), result(writer)
+
+        timings = sorted(reads['timings'])
+        p50 = statistics.median(timings)
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        mark = '✓' if p99 < TARGET_P99_MS and not reads['bad'] else '✗'
+        print(f"  {mark} {label:<17} {len(timings):>6} reads | p50 {p50:6.2f} ms | "
+              f"p99 {p99:7.2f} ms | max {timings[-1]:7.1f} ms | "
+              f"failed/stale {reads['bad']:>4} | {writes['written']:>6} rows written")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] in ('seed', 'write', 'read'):
+        use_bench_database()
+        role = sys.argv[1]
+        if role == 'seed':
+            seed()
+        elif role == 'write':
+            write(float(sys.argv[2]))
+        else:
+            read(float(sys.argv[2]))
+    else:
+        main()
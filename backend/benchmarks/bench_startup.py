@@ -0,0 +1,79 @@
+"""
+Benchmark process cold start: import time and first-request latency.
+
+Usage:
+    python -m benchmarks.bench_startup [runs]
+
+Starts a fresh interpreter per run (default 5) against a prepared 10k
+event database and reports medians for:
+
+- importing each entry point (the API, the scheduler and ingestion), and
+  how many database connections the import opened, which should be none
+- the API's first and second GET /api/events in that process
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.common import get_app, reset_database, seed_events
+
+EVENTS = 10_000
+ENTRY_POINTS = ('app', 'scheduler', 'ingestion.ingest')
+URL = '/api/events'
+
+# Runs in the child interpreter. The audit hook sees every sqlite3.connect
+# without importing anything before the module under test.
+CHILD = '''
+import importlib, json, sys, time
+connects = []
+sys.addaudithook(lambda event, args: event == 'sqlite3.connect' and connects.append(1))
+started = time.perf_counter()
+module = importlib.import_module(sys.argv[1])
+result = {'import': time.perf_counter() - started, 'connects': len(connects)}
+if sys.argv[1] == 'app':
+    client = module.app.test_client()
+    for name in ('first', 'second'):
+        began = time.perf_counter()
+        assert client.get(sys.argv[2]).status_code == 200
+        result[name] = time.perf_counter() - began
+print(json.dumps(result))
+'''
+
+
+def run_child(entry_point: str) -> dict:
+    """Import `entry_point` in a new interpreter and return its timings."""
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, entry_point, URL],
+        cwd=backend, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    from init_db import prepare_database
+
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    app = get_app()
+    reset_database(app)
+    seed_events(app, EVENTS)
+    with app.app_context():
+        prepare_database()
+
+    print(f"{runs} cold starts per entry point, {EVENTS} events")
+    for entry_point in ENTRY_POINTS:
+        results = [run_child(entry_point) for _ in range(runs)]
+        line = (f"  {entry_point:<17} import {statistics.median(r['import'] for r in results) * 1000:7.1f} ms"
+                f" | DB connections {max(r['connects'] for r in results)}")
+        if entry_point == 'app':
+            first = statistics.median(r['first'] for r in results) * 1000
+            second = statistics.median(r['second'] for r in results) * 1000
+            line += f" | first request {first:6.1f} ms | second {second:5.1f} ms"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
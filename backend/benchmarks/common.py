@@ -0,0 +1,137 @@
+"""
+Shared setup for benchmarks.
+
+Each benchmark runs against a throwaway SQLite database so it never
+touches the development database. Run benchmarks from the backend
+directory, e.g. ``python -m benchmarks.bench_read_path``.
+"""
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Point the app at a scratch database before anything imports it
+_DB_DIR = tempfile.mkdtemp(prefix='concierge-bench-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_DB_DIR, 'bench.db')}"
+
+TAGS = ['Required', 'Career', 'Capstone', 'Social', 'Deadline', 'General']
+WORDS = (
+    'career fair capstone review social mixer deadline submission advising '
+    'orientation workshop seminar hackathon office hours panel networking '
+    'resume clinic city tour museum visit guest lecture research'
+).split()
+FILLER = (
+    'the and to of a in for on with at is be this will you your our from by '
+    'are all please join us an as or it we can more about'
+).split()
+SYLLABLES = 'ba ce di fo gu ka le mi no pu ra se ti vo zu an el in or un'.split()
+
+
+def vocabulary(size: int = 20_000, seed: int = 0) -> tuple:
+    """
+    Description vocabulary with Zipf-distributed word frequencies.
+
+    Filler words come first (present in almost every description), then
+    WORDS as topical terms, then synthetic words down the long tail.
+
+    Returns:
+        (words, cumulative weights) for random.choices()
+    """
+    rng = random.Random(seed)
+    words = list(dict.fromkeys(FILLER + WORDS))
+    seen = set(words)
+    while len(words) < size:
+        word = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+
+    cum_weights, total = [], 0.0
+    for rank in range(1, size + 1):
+        total += 1 / rank ** 1.07
+        cum_weights.append(total)
+    return words, cum_weights
+
+
+def get_app():
+    """Import the application configured for the scratch database."""
+    from app import app
+    return app
+
+
+def reset_database(app):
+    """Drop and recreate all tables."""
+    from models import db
+    from utils.interval_index import event_index
+    from utils.recurrence import series_cache
+    from utils.tags import tag_registry
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    tag_registry.invalidate()
+    event_index.invalidate()
+    series_cache.invalidate()
+
+
+def seed_events(app, count: int, sources: int = 5, days: int = 30, seed: int = 42):
+    """
+    Bulk insert `count` synthetic events spread over the next `days` days.
+
+    Returns:
+        The time the window was anchored on
+    """
+    from models import db, Event, Source
+    from utils.tags import tag_registry
+
+    rng = random.Random(seed)
+    words, cum_weights = vocabulary()
+    now = datetime.utcnow()
+    span = days * 24 * 3600
+
+    with app.app_context():
+        source_ids = []
+        for i in range(sources):
+            source = Source(name=f'Bench Source {i}', type='ics', active=True)
+            db.session.add(source)
+            db.session.flush()
+            source_ids.append(source.id)
+
+        tag_ids = [tag_registry.id_for(tag) for tag in TAGS]
+
+        rows = []
+        for i in range(count):
+            start = now + timedelta(seconds=rng.randrange(span))
+            title = ' '.join(
+                [rng.choice(WORDS)] + rng.choices(words[len(FILLER):], k=2)
+            ).title()
+            rows.append({
+                'title': title,
+                'description': ' '.join(rng.choices(words, cum_weights=cum_weights, k=40)),
+                'start_time': start,
+                'end_time': start + timedelta(hours=1),
+                'timezone': 'UTC',
+                'location': f'Room {rng.randrange(100, 999)}',
+                'is_virtual': False,
+                'tag_id': rng.choice(tag_ids),
+                'source_id': rng.choice(source_ids),
+                'source_event_id': f'bench-{i}',
+                'fingerprint': f'{i:064x}',
+                'created_at': now,
+                'updated_at': now,
+            })
+        db.session.execute(Event.__table__.insert(), rows)
+        db.session.commit()
+
+    return now
+
+
+def timed(fn, repeat: int = 3):
+    """Return the best wall time in seconds over `repeat` runs."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Query plan regression check.
+
+Runs EXPLAIN QUERY PLAN for the query behind every hot endpoint and job
+against a scratch SQLite database built from the models, and fails if any
+plan falls back to a full scan or a temp B-tree sort. Run it after any
+change to models.py or utils/event_queries.py:
+
+    python check_query_plans.py
+
+tests/test_query_plans.py runs the same check inside the pytest suite.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+if __name__ == '__main__':
+    # Build the schema in a scratch database, never the real one (under
+    # pytest the suite's own scratch database is already configured)
+    _DB_DIR = tempfile.mkdtemp(prefix='concierge-plans-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_DB_DIR, 'plans.db')}"
+
+from sqlalchemy import func, select
+
+from app import get_app
+from init_db import prepare_database
+from models import db, Event
+from utils.calendar_view import count_query, titles_query
+from utils.event_queries import events_window_query, select_events, EVENT_FIELDS
+from utils.interval_index import INDEX_COLUMNS, INDEXED, MAX_PATCH_ROWS
+from utils.recurrence import SERIES_COLUMNS
+
+# Plan details that mean the query no longer seeks on an index
+FORBIDDEN = ('SCAN ', 'USE TEMP B-TREE')
+
+# Grouping by local day cannot come off an index; the rows still must
+GROUP_BY_DAY = ('USE TEMP B-TREE FOR GROUP BY',)
+
+# Reading back the few rows of a LIMIT subquery
+SUBQUERY_ROWS = ('SCAN anon_',)
+
+# Walking a partial index that holds only the recurring series / overrides
+SERIES_ROWS = ('SCAN events USING INDEX ix_events_series',)
+OVERRIDE_ROWS = ('SCAN events USING COVERING INDEX ix_events_overrides',)
+
+
+def query_shapes(now: datetime):
+    """Return (name, query[, allowed plan details]) for each query shape the API and jobs run."""
+    week = now + timedelta(days=7)
+    day = now + timedelta(hours=24)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    return [
+        ('GET /api/events',
+         events_window_query(now, week, limit=101)),
+        ('GET /api/events?cursor',
+         events_window_query(now, week, after=(now, 1), limit=101)),
+        ('GET /api/events?tag',
+         events_window_query(now, week, tag='Career', limit=101)),
+        ('GET /api/events?tag&cursor',
+         events_window_query(now, week, tag='Career', after=(now, 1), limit=101)),
+        ('GET /api/events?source_id',
+         events_window_query(now, week, source_id=1, limit=101)),
+        ('GET /api/events?tag&source_id',
+         events_window_query(now, week, tag='Career', source_id=1, limit=101)),
+        ('GET /api/events/today',
+         events_window_query(today, today + timedelta(days=1), end_inclusive=False)),
+        ('GET /api/events (INTERVAL_INDEX=off)',
+         events_window_query(now, week, limit=101, overlapping=True, series=False)),
+        ('GET /api/events?tag (INTERVAL_INDEX=off)',
+         events_window_query(now, week, tag='Career', limit=101, overlapping=True, series=False)),
+        ('interval index: rows by id',
+         select_events(EVENT_FIELDS).where(Event.id.in_(list(range(1, 101))))),
+        ('interval index: patch',
+         select(*INDEX_COLUMNS).where(INDEXED, Event.updated_at >= now).limit(MAX_PATCH_ROWS + 1)),
+        ('GET /api/events/calendar (counts)',
+         count_query(today, today + timedelta(days=31), -240), GROUP_BY_DAY),
+        ('GET /api/events/calendar?tag (counts)',
+         count_query(today, today + timedelta(days=31), -240, tag_id=1), GROUP_BY_DAY),
+        ('GET /api/events/calendar (titles)',
+         titles_query([(today, today + timedelta(days=1)),
+                       (today + timedelta(days=1), today + timedelta(days=2))], 3),
+         SUBQUERY_ROWS),
+        ('GET /api/stats (upcoming)',
+         select(func.count()).select_from(Event).where(Event.start_time >= now)),
+        ('digest: get_user_events (no subscriptions)',
+         events_window_query(now, day)),
+        ('digest: get_user_events (one tag)',
+         events_window_query(now, day, tag_ids=[1])),
+        ('digest: get_user_events (many tags)',
+         events_window_query(now, day, tag_ids=[1, 2, 3])),
+        ('recurrence: load series',
+         select_events(EVENT_FIELDS).add_columns(*SERIES_COLUMNS)
+         .where(Event.recurrence.isnot(None)), SERIES_ROWS),
+        ('recurrence: load overrides',
+         select(Event.source_id, Event.source_event_id, Event.recurrence_id)
+         .where(Event.recurrence_id.isnot(None)), OVERRIDE_ROWS),
+        ('ingest: fingerprint dedup',
+         select(Event.id).where(Event.fingerprint == 'f' * 64)),
+        ('ingest: UID lookup',
+         select(Event.id).where(Event.source_event_id == 'uid@example.com')),
+    ]
+
+
+def explain(query) -> list:
+    """Return the EXPLAIN QUERY PLAN detail lines for a query."""
+    compiled = query.compile(db.engine, compile_kwargs={'render_postcompile': True})
+    params = compiled.construct_params()
+    processors = compiled._bind_processors
+    args = []
+    for key in compiled.positiontup:
+        value = params[key]
+        if key in processors:
+            value = processors[key](value)
+        args.append(value)
+
+    rows = db.session.connection().exec_driver_sql(
+        f'EXPLAIN QUERY PLAN {compiled}', tuple(args)
+    ).all()
+    return [row[-1] for row in rows]
+
+
+def check() -> list:
+    """Return (name, plan) for every query whose plan regressed."""
+    failures = []
+    for name, query, *allowed in query_shapes(datetime.utcnow()):
+        plan = explain(query)
+        allowed = allowed[0] if allowed else ()
+        ok = not any(
+            bad in line and not line.startswith(allowed)
+            for line in plan for bad in FORBIDDEN
+        )
+        print(f"{'✓' if ok else '✗'} {name}")
+        for line in plan:
+            print(f"    {line}")
+        if not ok:
+            failures.append((name, plan))
+    return failures
+
+
+def main():
+    app = get_app()
+    with app.app_context():
+        # Schema and seed data (the tag filters resolve the default tags)
+        prepare_database()
+        failures = check()
+
+    if failures:
+        print(f"\n✗ {len(failures)} query plan(s) regressed")
+        sys.exit(1)
+    print("\n✓ All query plans use index seeks")
+
+
+if __name__ == '__main__':
+    main()
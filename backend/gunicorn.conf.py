@@ -0,0 +1,107 @@
+"""
+gunicorn settings for the Flask API.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The app is preloaded in the master, so workers share its imported code
+copy-on-write and start without re-importing. The schema / seed work of
+init_db.prepare_database() runs once, in the master, before any worker
+is forked; the master then closes its connections and every worker
+discards whatever pool state it inherited, so no database connection is
+ever shared across processes.
+
+Sizing follows the cores this process may run on and can be overridden:
+
+- WEB_CONCURRENCY: worker processes (default 2 x cores + 1)
+- GUNICORN_THREADS: threads per worker (default 4)
+- GUNICORN_INIT_DB: run prepare_database() in the master (default true)
+- PORT: port to bind (default 5000)
+
+Each worker logs its boot time and memory (RSS, and PSS / USS where
+/proc/self/smaps_rollup exists: with preload most of RSS is shared).
+"""
+import os
+import time
+
+STARTED = time.monotonic()
+
+
+def available_cores() -> int:
+    """CPUs this process may run on (respects affinity / cpusets)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def memory_usage() -> dict:
+    """Resident memory of this process in MiB: rss, and pss / uss on Linux."""
+    try:
+        with open('/proc/self/smaps_rollup') as smaps:
+            fields = {
+                name: int(value.split()[0]) / 1024
+                for name, value in (line.split(':', 1) for line in smaps if ':' in line)
+                if value.strip().endswith('kB')
+            }
+        return {
+            'rss': fields['Rss'],
+            'pss': fields['Pss'],
+            'uss': fields['Private_Clean'] + fields['Private_Dirty'],
+        }
+    except (OSError, KeyError, ValueError):
+        import resource
+        return {'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+
+def format_memory(memory: dict) -> str:
+    return ', '.join(f'{name} {value:.1f} MiB' for name, value in memory.items())
+
+
+def app_engines():
+    from app import get_app
+    from models import db
+
+    app = get_app()
+    with app.app_context():
+        return app, list(db.engines.values())
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2 * available_cores() + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+preload_app = True
+INIT_DB = os.getenv('GUNICORN_INIT_DB', 'true').lower() in ('1', 'true', 'yes')
+
+
+def on_starting(server):
+    """Master, once: schema upgrade and seeding before workers exist."""
+    from utils.pool import dispose_engines
+
+    app, engines = app_engines()
+    if INIT_DB:
+        from init_db import prepare_database
+
+        with app.app_context():
+            prepare_database()
+    # Close the master's connections so none are inherited by workers
+    dispose_engines(engines)
+    server.log.info(
+        "Master ready in %.0f ms (%s); %d workers x %d threads on %d cores",
+        (time.monotonic() - STARTED) * 1000, format_memory(memory_usage()),
+        workers, threads, available_cores()
+    )
+
+
+def post_fork(server, worker):
+    """Worker, first thing after fork: forget any inherited pooled connections."""
+    from utils.pool import dispose_engines
+
+    worker.forked_at = time.monotonic()
+    dispose_engines(app_engines()[1], close=False)
+
+
+def post_worker_init(worker):
+    worker.log.info(
+        "Worker %s booted in %.0f ms (%s)",
+        worker.pid, (time.monotonic() - worker.forked_at) * 1000, format_memory(memory_usage())
+    )
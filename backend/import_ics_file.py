@@ -3,7 +3,7 @@
 Import events from an exported .ics calendar file.
 """
 import sys
-from app import create_app
+from app import get_app
 from models import db, Source, Event
 from ingestion.ics_parser import parse_ics_from_file
 from utils.deduplication import normalize_event_data
@@ -17,7 +17,7 @@ if len(sys.argv) < 2:
 
 ics_file_path = sys.argv[1]
 
-app = create_app()
+app = get_app()
 with app.app_context():
     # Create a source for this file
     source = Source.query.filter_by(name='Imported Calendar').first()
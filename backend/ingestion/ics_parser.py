@@ -1,11 +1,21 @@
 """
 ICS (iCalendar) feed ingestion.
+
+Recurring events are not expanded here: a series is stored once, with its
+RRULE / RDATE / EXDATE lines in `recurrence`, and its occurrences are
+generated per query window (see utils.recurrence). Overridden instances
+(RECURRENCE-ID) are stored as events of their own; cancelled ones become
+EXDATEs of their series.
 """
-from icalendar import Calendar
-from datetime import datetime
+from collections import defaultdict
+from icalendar import Calendar, Event as VEvent, vRecur
+from datetime import datetime, tzinfo
 import requests
 import pytz
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+# Wall time format of RDATE / EXDATE / UNTIL values in `recurrence`
+RECURRENCE_TIME_FORMAT = '%Y%m%dT%H%M%S'
 
 
 def parse_ics_url(url: str) -> List[Dict]:
@@ -57,12 +67,18 @@ def parse_ics_content(content: bytes) -> List[Dict]:
         List of event dictionaries
     """
     events = []
+    cancelled = defaultdict(list)  # UID -> RECURRENCE-IDs of cancelled instances
     
     try:
         calendar = Calendar.from_ical(content)
         
         for component in calendar.walk():
             if component.name == "VEVENT":
+                if is_cancelled_instance(component):
+                    cancelled[str(component.get('UID', ''))].append(
+                        component['RECURRENCE-ID'].dt
+                    )
+                    continue
                 event = parse_vevent(component)
                 if event:
                     events.append(event)
@@ -70,9 +86,24 @@ def parse_ics_content(content: bytes) -> List[Dict]:
     except Exception as e:
         print(f"Error parsing ICS content: {e}")
     
+    for event in events:
+        if event.get('recurrence') and event['source_event_id'] in cancelled:
+            event['recurrence'] += '\nEXDATE:' + ','.join(
+                wall_time(value, event['start_time'].tzinfo).strftime(RECURRENCE_TIME_FORMAT)
+                for value in cancelled[event['source_event_id']]
+            )
+    
     return events
 
 
+def is_cancelled_instance(vevent) -> bool:
+    """Whether a VEVENT cancels one occurrence of a recurring series"""
+    return (
+        vevent.get('RECURRENCE-ID') is not None
+        and str(vevent.get('STATUS', '')).upper() == 'CANCELLED'
+    )
+
+
 def parse_vevent(vevent) -> Dict:
     """
     Parse a VEVENT component into event dictionary.
@@ -127,6 +158,13 @@ def parse_vevent(vevent) -> Dict:
         # Get UID for deduplication
         uid = str(vevent.get('UID', ''))
         
+        # Recurring series keep their rules; overrides name the occurrence
+        # they replace. Both as wall times in the event's timezone, like
+        # start_time is stored
+        start_tz = getattr(dtstart.dt, 'tzinfo', None)
+        recurrence = parse_recurrence(vevent, start_tz)
+        recurrence_id = vevent.get('RECURRENCE-ID')
+        
         return {
             'title': title,
             'description': description,
@@ -138,6 +176,8 @@ def parse_vevent(vevent) -> Dict:
             'meeting_link': meeting_link,
             'source_event_id': uid,
             'tag': infer_tag_from_event(title, description),
+            'recurrence': recurrence,
+            'recurrence_id': wall_time(recurrence_id.dt, start_tz) if recurrence_id else None,
         }
         
     except Exception as e:
@@ -145,6 +185,135 @@ def parse_vevent(vevent) -> Dict:
         return None
 
 
+def parse_recurrence(vevent, start_tz: Optional[tzinfo] = None) -> Optional[str]:
+    """
+    Collect the RRULE, RDATE and EXDATE properties of a VEVENT.
+    
+    Times (including RRULE's UNTIL) are converted to naive wall times in
+    `start_tz`, the timezone of DTSTART, so the rules can be expanded
+    against the stored start_time.
+    
+    Args:
+        vevent: iCalendar VEVENT component
+        start_tz: Timezone of DTSTART (None for floating times and dates)
+        
+    Returns:
+        One property per line, or None if the event does not recur
+    """
+    lines = []
+    
+    for rule in as_list(vevent.get('RRULE')):
+        rule = rule.copy()
+        if 'UNTIL' in rule:
+            rule['UNTIL'] = [wall_time(value, start_tz) for value in rule['UNTIL']]
+        lines.append('RRULE:' + rule.to_ical().decode())
+    
+    for name in ('RDATE', 'EXDATE'):
+        values = [
+            wall_time(value.dt, start_tz)
+            for prop in as_list(vevent.get(name))
+            for value in prop.dts
+            if not isinstance(value.dt, tuple)  # RDATE periods are not supported
+        ]
+        if values:
+            lines.append(f'{name}:' + ','.join(
+                value.strftime(RECURRENCE_TIME_FORMAT) for value in values
+            ))
+    
+    # A lone EXDATE recurs no more than the event itself
+    if not any(line.startswith(('RRULE:', 'RDATE:')) for line in lines):
+        return None
+    return '\n'.join(lines)
+
+
+def as_list(value) -> list:
+    """iCalendar properties that may repeat come back as one value or a list"""
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def wall_time(dt, tz: Optional[tzinfo] = None) -> datetime:
+    """Convert a date or datetime to a naive datetime, as wall time in `tz`"""
+    dt = ensure_datetime(dt)
+    if dt.tzinfo is not None:
+        if tz is not None:
+            dt = dt.astimezone(tz)
+        dt = dt.replace(tzinfo=None)
+    return dt
+
+
+def build_vevent(event: Dict, uid: str, stamp: Optional[datetime] = None) -> VEvent:
+    """
+    Build a VEVENT component from an event dictionary.
+    
+    The inverse of parse_vevent(): takes the same normalized fields
+    (title, description, start_time, end_time, timezone, location,
+    meeting_link, tag, recurrence) plus an optional rsvp_link. Naive times
+    are wall times in the event's timezone, as stored by ingestion.
+    
+    Args:
+        event: Event dictionary
+        uid: Globally unique identifier for the VEVENT
+        stamp: Last modification time (UTC), used for DTSTAMP
+        
+    Returns:
+        iCalendar VEVENT component
+    """
+    try:
+        tz = pytz.timezone(event.get('timezone') or 'UTC')
+    except pytz.UnknownTimeZoneError:
+        tz = pytz.utc
+    
+    def localize(dt):
+        return tz.localize(dt) if dt.tzinfo is None else dt
+    
+    vevent = VEvent()
+    vevent.add('UID', uid)
+    vevent.add('DTSTAMP', pytz.utc.localize(stamp or datetime.utcnow()))
+    vevent.add('SUMMARY', event['title'])
+    vevent.add('DTSTART', localize(event['start_time']))
+    if event.get('end_time'):
+        vevent.add('DTEND', localize(event['end_time']))
+    if event.get('description'):
+        vevent.add('DESCRIPTION', event['description'])
+    if event.get('location'):
+        vevent.add('LOCATION', event['location'])
+    link = event.get('meeting_link') or event.get('rsvp_link')
+    if link:
+        vevent.add('URL', link)
+    if event.get('tag'):
+        vevent.add('CATEGORIES', [event['tag']])
+    if event.get('recurrence'):
+        add_recurrence(vevent, event['recurrence'], localize)
+    
+    return vevent
+
+
+def add_recurrence(vevent: VEvent, recurrence: str, localize):
+    """
+    Add `recurrence` lines (see parse_recurrence) to a VEVENT.
+    
+    Wall times are localized like DTSTART; UNTIL is given in UTC, as
+    RFC 5545 requires alongside a DTSTART with a timezone.
+    """
+    for line in recurrence.splitlines():
+        name, _, value = line.partition(':')
+        if name == 'RRULE':
+            rule = vRecur.from_ical(value)
+            if 'UNTIL' in rule:
+                rule['UNTIL'] = [
+                    localize(until).astimezone(pytz.utc) if isinstance(until, datetime) else until
+                    for until in rule['UNTIL']
+                ]
+            vevent.add('RRULE', rule)
+        elif name in ('RDATE', 'EXDATE'):
+            vevent.add(name, [
+                localize(datetime.strptime(stamp, RECURRENCE_TIME_FORMAT))
+                for stamp in value.split(',')
+            ])
+
+
 def ensure_datetime(dt) -> datetime:
     """Convert date or datetime to datetime object"""
     if isinstance(dt, datetime):
@@ -3,21 +3,26 @@ Ingest events from all active sources and store in database.
 """
 import os
 from datetime import datetime
-from app import create_app
+from app import get_app
 from models import db, Source, Event
 from ingestion.ics_parser import parse_ics_url
 from ingestion.telegram_ingest import ingest_telegram_events
 from utils.deduplication import normalize_event_data
+from utils.jobs import job_timer
 
 
 def ingest_all_sources():
     """
     Fetch events from all active sources and store in database.
     """
-    app = create_app()
+    app = get_app()
     
     with app.app_context():
         sources = Source.query.filter_by(active=True).all()
+        # Detach the sources, keeping their loaded attributes, so the
+        # single writer connection (see utils.sqlite_profile) is free
+        # while sources are fetched over the network
+        db.session.close()
         
         total_ingested = 0
         total_duplicates = 0
@@ -26,20 +31,24 @@ def ingest_all_sources():
             print(f"\nIngesting from: {source.name} ({source.type})")
             
             try:
-                events = fetch_events_from_source(source)
-                ingested, duplicates = store_events(events, source.id)
+                with job_timer(f'ingest_{source.type}'):
+                    events = fetch_events_from_source(source)
+                    ingested, duplicates = store_events(events, source.id)
+                    
+                    # Update last fetched time
+                    db.session.add(source)
+                    source.last_fetched = datetime.utcnow()
+                    db.session.commit()
+                    db.session.close()
                 
                 total_ingested += ingested
                 total_duplicates += duplicates
                 
-                # Update last fetched time
-                source.last_fetched = datetime.utcnow()
-                db.session.commit()
-                
                 print(f"  ✓ Ingested: {ingested}, Duplicates: {duplicates}")
                 
             except Exception as e:
                 print(f"  ✗ Error: {e}")
+                db.session.close()
                 continue
         
         print(f"\n{'='*50}")
@@ -72,6 +81,8 @@ def store_events(events: list, source_id: int) -> tuple:
     """
     Store events in database, skipping duplicates.
     
+    A duplicate of a recurring series still updates its stored rules.
+    
     Returns:
         Tuple of (ingested_count, duplicate_count)
     """
@@ -91,6 +102,10 @@ def store_events(events: list, source_id: int) -> tuple:
                 ).first()
                 
                 if existing:
+                    if existing.recurrence != normalized.get('recurrence'):
+                        # New EXDATEs, cancelled instances or rule edits of a stored series
+                        existing.recurrence = normalized.get('recurrence')
+                        db.session.commit()
                     duplicates += 1
                     continue
             
@@ -1,55 +1,83 @@
 """
 Initialize the database with schema and seed data.
+
+Run this once per deploy, before starting the API (importing the app does
+no database work):
+
+    python init_db.py           # create / upgrade the schema, keep data
+    python init_db.py --reset   # drop everything and start over (development)
 """
-from app import create_app
-from models import db, Source
-from datetime import datetime
-
-def init_database():
-    """Create tables and add initial sources"""
-    app = create_app()
-    
-    with app.app_context():
-        # Drop all tables and recreate (for development)
-        db.drop_all()
-        db.create_all()
-        
-        # Seed with example sources
-        sources = [
-            Source(
-                name='Campus Events Calendar',
-                type='ics',
-                url='https://example.com/calendar.ics',
-                active=True
-            ),
-            Source(
-                name='Academic Announcements',
-                type='slack',
-                url='#announcements',
-                active=True
-            ),
-            Source(
-                name='Career Services',
-                type='slack',
-                url='#career',
-                active=True
-            ),
-            Source(
-                name='Community Portal',
-                type='forum',
-                url='https://forum.example.com',
-                active=True
-            ),
-        ]
-        
-        for source in sources:
-            db.session.add(source)
-        
+import sys
+
+from app import get_app
+from models import db, Event, Source
+from utils.schema import upgrade_schema
+from utils.search import ensure_search_index
+from utils.stats import ensure_stats
+
+
+def default_sources():
+    """Example sources for a new database"""
+    return [
+        Source(
+            name='Campus Events Calendar',
+            type='ics',
+            url='https://example.com/calendar.ics',
+            active=True
+        ),
+        Source(
+            name='Academic Announcements',
+            type='slack',
+            url='#announcements',
+            active=True
+        ),
+        Source(
+            name='Career Services',
+            type='slack',
+            url='#career',
+            active=True
+        ),
+        Source(
+            name='Community Portal',
+            type='forum',
+            url='https://forum.example.com',
+            active=True
+        ),
+    ]
+
+
+def prepare_database():
+    """
+    Bring the schema up to date and seed a new database.
+
+    Safe to run on every deploy: existing tables and data are kept.
+    """
+    db.create_all()
+    upgrade_schema()
+    ensure_search_index()
+    ensure_stats()
+
+    if Source.query.count() == 0:
+        sources = default_sources()
+        db.session.add_all(sources)
         db.session.commit()
-        
-        print("✓ Database initialized successfully")
         print(f"✓ Created {len(sources)} default sources")
 
+    print(f"✓ Database ready - {Event.query.count()} events in database")
+
+
+def init_database(reset: bool = False):
+    """Create (or with reset, recreate) tables and add initial sources"""
+    app = get_app()
+
+    with app.app_context():
+        if reset:
+            # Drop all tables and recreate (for development)
+            db.drop_all()
+            print("✓ Dropped all tables")
+
+        prepare_database()
+
 
 if __name__ == '__main__':
-    init_database()
+    init_database(reset='--reset' in sys.argv[1:])
@@ -5,7 +5,9 @@ from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import func
 
-db = SQLAlchemy()
+from utils.sqlite_profile import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 
 class Source(db.Model):
@@ -27,6 +29,19 @@ class Source(db.Model):
         return f'<Source {self.name} ({self.type})>'
 
 
+class Tag(db.Model):
+    """Canonical event tags (Required, Career, Capstone, Social, Deadline, ...)"""
+    __tablename__ = 'tags'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False, unique=True)
+    aliases = db.Column(db.String(500))  # Comma-separated lowercase aliases
+    color = db.Column(db.String(7), default='#6c757d')  # Display color
+    
+    def __repr__(self):
+        return f'<Tag {self.name}>'
+
+
 class Event(db.Model):
     """Normalized event schema"""
     __tablename__ = 'events'
@@ -46,24 +61,57 @@ class Event(db.Model):
     meeting_link = db.Column(db.String(500))
     
     # Metadata
-    tag = db.Column(db.String(50), index=True)  # Required, Career, Capstone, Social, Deadline
+    tag_id = db.Column(db.Integer, db.ForeignKey('tags.id'))  # See Event.tag
     rsvp_link = db.Column(db.String(500))
     why_matters = db.Column(db.Text)  # One-line explanation
     
     # Source tracking
     source_id = db.Column(db.Integer, db.ForeignKey('sources.id'), nullable=False)
-    source_event_id = db.Column(db.String(200))  # Original ID from source (for dedup)
+    source_event_id = db.Column(db.String(200), index=True)  # Original ID from source (for dedup)
     
     # Deduplication
     fingerprint = db.Column(db.String(64), unique=True, index=True)  # Hash for dedup
     
-    # Timestamps
+    # Recurring series (see utils.recurrence): the series is one row whose
+    # start_time is DTSTART; overridden instances are rows of their own
+    recurrence = db.Column(db.Text)  # RRULE / RDATE / EXDATE lines
+    recurrence_id = db.Column(db.DateTime)  # Occurrence an override replaces
+    
+    # Timestamps (updated_at is indexed for patching utils.interval_index)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationships
     source = db.relationship('Source', back_populates='events')
     
+    # Composite indexes matching the listing queries: equality column first,
+    # then start_time so range + ORDER BY start_time come straight off the index.
+    # (start_time, tag_id) covers the per-day tag counts of the calendar view.
+    # The few recurring series and their overrides are read on their own
+    # (see utils.recurrence), through partial indexes holding only them
+    __table_args__ = (
+        db.Index('ix_events_start_time_tag_id', 'start_time', 'tag_id'),
+        db.Index('ix_events_tag_id_start_time', 'tag_id', 'start_time'),
+        db.Index('ix_events_source_id_start_time', 'source_id', 'start_time'),
+        db.Index('ix_events_series', 'source_id', 'source_event_id',
+                 sqlite_where=recurrence.isnot(None),
+                 postgresql_where=recurrence.isnot(None)),
+        db.Index('ix_events_overrides', 'source_id', 'source_event_id', 'recurrence_id',
+                 sqlite_where=recurrence_id.isnot(None),
+                 postgresql_where=recurrence_id.isnot(None)),
+    )
+    
+    @property
+    def tag(self):
+        """Tag name, resolved through the in-process tag registry"""
+        from utils.tags import tag_registry
+        return tag_registry.name_for(self.tag_id)
+    
+    @tag.setter
+    def tag(self, name):
+        from utils.tags import tag_registry
+        self.tag_id = tag_registry.id_for(name) if name else None
+    
     def __repr__(self):
         return f'<Event {self.title} at {self.start_time}>'
     
@@ -122,15 +170,26 @@ class Subscription(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    tag = db.Column(db.String(50), nullable=False)
+    tag_id = db.Column(db.Integer, db.ForeignKey('tags.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     user = db.relationship('User', back_populates='subscriptions')
     
     __table_args__ = (
-        db.UniqueConstraint('user_id', 'tag', name='unique_user_tag'),
+        db.UniqueConstraint('user_id', 'tag_id', name='unique_user_tag'),
     )
     
+    @property
+    def tag(self):
+        """Tag name, resolved through the in-process tag registry"""
+        from utils.tags import tag_registry
+        return tag_registry.name_for(self.tag_id)
+    
+    @tag.setter
+    def tag(self, name):
+        from utils.tags import tag_registry
+        self.tag_id = tag_registry.id_for(name)
+    
     def __repr__(self):
         return f'<Subscription user={self.user_id} tag={self.tag}>'
 
@@ -149,3 +208,28 @@ class DigestLog(db.Model):
     
     def __repr__(self):
         return f'<DigestLog {self.digest_type} sent={self.sent_at}>'
+
+
+class DataGeneration(db.Model):
+    """Monotonic counters bumped whenever the data behind the API changes"""
+    __tablename__ = 'data_generations'
+    
+    name = db.Column(db.String(50), primary_key=True)  # 'events'
+    value = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<DataGeneration {self.name}={self.value}>'
+
+
+class StatCounter(db.Model):
+    """Incrementally maintained counters behind /api/stats"""
+    __tablename__ = 'stat_counters'
+    
+    # 'events', 'events.upcoming', 'events.tag:<tag id>', 'events.source:<id>',
+    # 'sources.active', 'users', 'upcoming_boundary' (epoch seconds)
+    name = db.Column(db.String(100), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<StatCounter {self.name}={self.value}>'
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Recompute the /api/stats counters from scratch and report any drift.
+
+Usage:
+    python reconcile_stats.py           # report drift and fix it
+    python reconcile_stats.py --check   # report only, exit 1 on drift
+"""
+import sys
+from app import get_app
+from utils.stats import reconcile
+
+
+def main():
+    check_only = '--check' in sys.argv[1:]
+    app = get_app()
+    
+    with app.app_context():
+        drift = reconcile(fix=not check_only)
+    
+    if not drift:
+        print("✓ Statistics counters match the database")
+        return
+    
+    print(f"{'Drift' if check_only else 'Fixed drift'} in {len(drift)} counter(s):")
+    for name in sorted(drift):
+        stored, expected = drift[name]
+        print(f"  {name}: stored={stored} expected={expected}")
+    
+    if check_only:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
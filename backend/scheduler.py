@@ -3,20 +3,25 @@ Scheduler for daily digests and event ingestion.
 
 Runs:
 - Event ingestion every 6 hours
+- Stats upcoming-boundary roll every 5 minutes
 - 08:00 digest daily
 - 15:00 same-day reminder daily
 """
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
 from datetime import datetime, timedelta
+from functools import wraps
 import pytz
 import os
 from dotenv import load_dotenv
 
-from app import create_app
-from models import db, User, Event, DigestLog
+from app import get_app
+from models import db, User, DigestLog
 from ingestion.ingest import ingest_all_sources
 from utils.digest import send_digest_to_user
+from utils.interval_index import fetch_window_rows
+from utils.jobs import job_timer
+from utils.stats import roll_upcoming_boundary
 
 # Load environment
 load_dotenv()
@@ -25,6 +30,23 @@ load_dotenv()
 TZ = pytz.timezone(os.getenv('TIMEZONE', 'America/Los_Angeles'))
 
 
+def scheduled_job(fn):
+    """
+    Run a job in the shared app context, reporting its time and connections.
+    
+    Jobs re-raise their errors after logging them, so job_timer counts the
+    failed run (concierge_job_failures_total at /api/metrics).
+    """
+    name = fn.__name__[len('job_'):]
+    
+    @wraps(fn)
+    def wrapper():
+        with get_app().app_context(), job_timer(name):
+            fn()
+    return wrapper
+
+
+@scheduled_job
 def job_ingest_events():
     """Job: Ingest events from all sources"""
     print(f"\n[{datetime.now()}] Running event ingestion...")
@@ -33,86 +55,94 @@ def job_ingest_events():
         print("✓ Event ingestion completed")
     except Exception as e:
         print(f"✗ Event ingestion failed: {e}")
+        raise
 
 
+@scheduled_job
+def job_roll_stats():
+    """Job: Roll the /api/stats upcoming-events boundary forward"""
+    try:
+        passed = roll_upcoming_boundary()
+        print(f"[{datetime.now()}] Rolled stats boundary ({passed} events started)")
+    except Exception as e:
+        print(f"✗ Stats roll failed: {e}")
+        raise
+
+
+@scheduled_job
 def job_send_morning_digest():
     """Job: Send 08:00 morning digest to all users"""
     print(f"\n[{datetime.now()}] Sending 08:00 morning digest...")
-    app = create_app()
+    users = User.query.filter_by(digest_08_enabled=True).all()
     
-    with app.app_context():
-        users = User.query.filter_by(digest_08_enabled=True).all()
-        
-        for user in users:
-            try:
-                # Get events for the next 24 hours
-                events = get_user_events(user, hours=24)
-                
-                success = send_digest_to_user(
-                    user,
-                    events,
-                    digest_type='08:00'
-                )
+    for user in users:
+        try:
+            # Get events for the next 24 hours
+            events = get_user_events(user, hours=24)
+            
+            success = send_digest_to_user(
+                user,
+                events,
+                digest_type='08:00'
+            )
+            
+            # Log the digest
+            log = DigestLog(
+                digest_type='08:00',
+                user_id=user.id,
+                event_count=len(events),
+                success=success
+            )
+            db.session.add(log)
+            db.session.commit()
+            
+            if success:
+                print(f"  ✓ Sent to {user.email} ({len(events)} events)")
+            else:
+                print(f"  ✗ Failed to send to {user.email}")
                 
-                # Log the digest
-                log = DigestLog(
-                    digest_type='08:00',
-                    user_id=user.id,
-                    event_count=len(events),
-                    success=success
-                )
-                db.session.add(log)
-                db.session.commit()
-                
-                if success:
-                    print(f"  ✓ Sent to {user.email} ({len(events)} events)")
-                else:
-                    print(f"  ✗ Failed to send to {user.email}")
-                    
-            except Exception as e:
-                print(f"  ✗ Error for {user.email}: {e}")
-                continue
+        except Exception as e:
+            print(f"  ✗ Error for {user.email}: {e}")
+            continue
 
 
+@scheduled_job
 def job_send_afternoon_reminder():
     """Job: Send 15:00 same-day reminder"""
     print(f"\n[{datetime.now()}] Sending 15:00 same-day reminder...")
-    app = create_app()
+    users = User.query.filter_by(digest_15_enabled=True).all()
     
-    with app.app_context():
-        users = User.query.filter_by(digest_15_enabled=True).all()
-        
-        for user in users:
-            try:
-                # Get events for the rest of today only
-                events = get_user_events(user, hours=9)  # ~9 hours left
-                
-                # Only send if there are upcoming events
-                if not events:
-                    continue
-                
-                success = send_digest_to_user(
-                    user,
-                    events,
-                    digest_type='15:00'
-                )
-                
-                # Log the digest
-                log = DigestLog(
-                    digest_type='15:00',
-                    user_id=user.id,
-                    event_count=len(events),
-                    success=success
-                )
-                db.session.add(log)
-                db.session.commit()
-                
-                if success:
-                    print(f"  ✓ Sent to {user.email} ({len(events)} events)")
-                    
-            except Exception as e:
-                print(f"  ✗ Error for {user.email}: {e}")
+    for user in users:
+        try:
+            # Get events for the rest of today only
+            events = get_user_events(user, hours=9)  # ~9 hours left
+            
+            # Only send if there are upcoming events
+            if not events:
                 continue
+            
+            success = send_digest_to_user(
+                user,
+                events,
+                digest_type='15:00'
+            )
+            
+            # Log the digest
+            log = DigestLog(
+                digest_type='15:00',
+                user_id=user.id,
+                event_count=len(events),
+                success=success
+            )
+            db.session.add(log)
+            db.session.commit()
+            
+            if success:
+                print(f"  ✓ Sent to {user.email} ({len(events)} events)")
+                
+        except Exception as e:
+            print(f"  ✗ Error for {user.email}: {e}")
+            continue
 
 
 def get_user_events(user: User, hours: int = 24):
@@ -124,28 +154,15 @@ def get_user_events(user: User, hours: int = 24):
         hours: How many hours ahead to look
         
     Returns:
-        List of Event objects
+        List of event rows (see utils.event_queries.EVENT_COLUMNS)
     """
     now = datetime.utcnow()
     end_time = now + timedelta(hours=hours)
     
-    # Get user's subscribed tags
-    subscribed_tags = [sub.tag for sub in user.subscriptions]
-    
-    # If no subscriptions, get all events
-    if not subscribed_tags:
-        events = Event.query.filter(
-            Event.start_time >= now,
-            Event.start_time <= end_time
-        ).order_by(Event.start_time.asc()).all()
-    else:
-        events = Event.query.filter(
-            Event.start_time >= now,
-            Event.start_time <= end_time,
-            Event.tag.in_(subscribed_tags)
-        ).order_by(Event.start_time.asc()).all()
+    # Get user's subscribed tags (no subscriptions means all events)
+    subscribed_tag_ids = [sub.tag_id for sub in user.subscriptions]
     
-    return events
+    return fetch_window_rows(now, end_time, tag_ids=subscribed_tag_ids)
 
 
 def main():
@@ -160,6 +177,14 @@ def main():
         name='Ingest events from all sources'
     )
     
+    # Keep /api/stats upcoming count current
+    scheduler.add_job(
+        job_roll_stats,
+        CronTrigger(minute='*/5'),
+        id='roll_stats',
+        name='Roll stats upcoming boundary'
+    )
+    
     # Morning digest at 08:00
     scheduler.add_job(
         job_send_morning_digest,
@@ -182,6 +207,7 @@ def main():
     print(f"{'='*60}")
     print("\nScheduled jobs:")
     print("  - Event ingestion: Every 6 hours")
+    print("  - Stats boundary roll: Every 5 minutes")
     print("  - Morning digest: Daily at 08:00")
     print("  - Afternoon reminder: Daily at 15:00")
     print(f"\n{'='*60}\n")
@@ -0,0 +1,94 @@
+"""
+Shared fixtures for the backend tests.
+
+Every test runs on a freshly created schema in a throwaway SQLite
+database, so the tests never touch the development database. Run them
+from the backend directory: ``python -m pytest``.
+
+The fixtures are not named ``app``: pytest-flask would then keep one
+request context pushed for the whole test, and every request made with
+the client would share its ``g`` (and so its events generation).
+"""
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# Point the app at scratch files before anything imports it
+_TMP_DIR = tempfile.mkdtemp(prefix='concierge-test-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_TMP_DIR, 'test.db')}"
+os.environ['JOB_STATS_FILE'] = os.path.join(_TMP_DIR, 'job_stats.json')
+os.environ['SNAPSHOT_DIR'] = os.path.join(_TMP_DIR, 'snapshots')
+
+import pytest
+from sqlalchemy import text
+
+from app import get_app
+from init_db import prepare_database
+from models import db, Event, Source
+from utils.cache import response_cache
+from utils.ics_feed import vevent_cache
+from utils.interval_index import event_index
+from utils.recurrence import series_cache
+from utils.search import FTS_TABLE
+from utils.snapshots import db_breaker
+from utils.tags import tag_registry
+
+
+def reset_caches():
+    """Forget everything the process cached about the previous database."""
+    response_cache.clear()
+    response_cache.generation = None
+    vevent_cache.clear()
+    tag_registry.invalidate()
+    event_index.invalidate()
+    series_cache.invalidate()
+    db_breaker.failures = 0
+    db_breaker.opened_at = None
+
+
+@pytest.fixture
+def application():
+    """The app on an empty, fully prepared database (default sources only)."""
+    app = get_app()
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.session.execute(text(f'DROP TABLE IF EXISTS {FTS_TABLE}'))
+        db.session.commit()
+        reset_caches()
+        prepare_database()
+        db.session.remove()
+    yield app
+    reset_caches()
+
+
+@pytest.fixture
+def client(application):
+    return application.test_client()
+
+
+@pytest.fixture
+def now():
+    """A time safely inside the current minute's listing windows."""
+    return datetime.utcnow().replace(second=0, microsecond=0) + timedelta(minutes=5)
+
+
+@pytest.fixture
+def source_id(application):
+    with application.app_context():
+        return db.session.query(Source.id).order_by(Source.id).first()[0]
+
+
+@pytest.fixture
+def add_event(application, source_id):
+    """Insert one event through the ORM and return its id."""
+    def add(title, start, end=None, tag=None, **fields):
+        fields.setdefault('source_id', source_id)
+        with application.app_context():
+            event = Event(title=title, start_time=start, end_time=end, **fields)
+            if tag:
+                event.tag = tag
+            db.session.add(event)
+            db.session.commit()
+            return event.id
+    return add
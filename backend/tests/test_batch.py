@@ -0,0 +1,20 @@
+"""Batch lookups by id"""
+from datetime import timedelta
+
+
+def test_batch_keeps_request_order_and_lists_missing(client, add_event, now):
+    a = add_event('A', now + timedelta(days=1))
+    b = add_event('B', now - timedelta(days=1))
+
+    data = client.get(f'/api/events/batch?ids={b},999,{a},{b}&fields=title').get_json()
+    assert [event['id'] for event in data['events']] == [b, a]
+    assert data['missing'] == [999]
+
+    data = client.post('/api/events/batch', json={'ids': [a, b]}).get_json()
+    assert [event['title'] for event in data['events']] == ['A', 'B']
+
+
+def test_batch_rejects_bad_ids(client):
+    assert client.get('/api/events/batch?ids=1,x').status_code == 400
+    assert client.post('/api/events/batch', json={'ids': []}).status_code == 400
+    assert client.post('/api/events/batch', json={'ids': list(range(501))}).status_code == 400
@@ -0,0 +1,63 @@
+"""Per-day counts for calendar views"""
+from datetime import date, datetime
+
+import pytest
+import pytz
+
+from utils.calendar_view import InvalidCalendarRange, offset_spans, parse_calendar_range
+
+NOW = datetime(2024, 3, 15, 12)
+
+
+def test_range_defaults_to_the_current_month():
+    assert parse_calendar_range(None, None, None, NOW) == (date(2024, 3, 1), date(2024, 3, 31), 'UTC')
+    assert parse_calendar_range('2024-02-10', None, 'Europe/Berlin', NOW) == \
+        (date(2024, 2, 10), date(2024, 2, 29), 'Europe/Berlin')
+
+
+@pytest.mark.parametrize('start, end, tz', [
+    ('2024-03-10', '2024-03-01', None),
+    ('2024-01-01', '2024-06-30', None),
+    ('March', None, None),
+    (None, None, 'Mars/Olympus'),
+])
+def test_range_rejects_bad_parameters(start, end, tz):
+    with pytest.raises(InvalidCalendarRange):
+        parse_calendar_range(start, end, tz, NOW)
+
+
+def test_offset_spans_split_at_dst_change():
+    tz = pytz.timezone('America/New_York')
+    # DST began on 2024-03-10 at 07:00 UTC
+    spans = offset_spans(tz, datetime(2024, 3, 1, 5), datetime(2024, 4, 1, 4))
+
+    assert spans == [
+        (datetime(2024, 3, 1, 5), datetime(2024, 3, 10, 7), -300),
+        (datetime(2024, 3, 10, 7), datetime(2024, 4, 1, 4), -240),
+    ]
+
+
+def test_counts_by_local_day_and_tag(client, add_event):
+    # 23:30 UTC is already the next day in Berlin
+    add_event('Late', datetime(2024, 5, 1, 23, 30), tag='Social')
+    add_event('Morning', datetime(2024, 5, 2, 8), tag='Career')
+    add_event('Noon', datetime(2024, 5, 2, 12), tag='Career')
+
+    utc = client.get('/api/events/calendar?from=2024-05-01&to=2024-05-31').get_json()
+    assert [(day['date'], day['tags']) for day in utc['days']] == [
+        ('2024-05-01', {'Social': 1}),
+        ('2024-05-02', {'Career': 2}),
+    ]
+
+    berlin = client.get(
+        '/api/events/calendar?from=2024-05-01&to=2024-05-31&tz=Europe/Berlin&titles=2&tag=Career'
+    ).get_json()
+    assert berlin['count'] == 2
+    assert [title['title'] for title in berlin['days'][0]['titles']] == ['Morning', 'Noon']
+
+    berlin = client.get('/api/events/calendar?from=2024-05-01&to=2024-05-31&tz=Europe/Berlin').get_json()
+    assert [(day['date'], day['count']) for day in berlin['days']] == [('2024-05-02', 3)]
+
+
+def test_rejects_bad_range(client):
+    assert client.get('/api/events/calendar?from=2024-05-10&to=2024-05-01').status_code == 400
@@ -0,0 +1,55 @@
+"""Negotiated gzip / brotli compression of JSON responses"""
+import gzip
+from datetime import timedelta
+
+import pytest
+
+from utils.compression import ENCODERS
+
+
+@pytest.fixture
+def listing(add_event, now):
+    """Events enough for a listing well above COMPRESS_MIN_SIZE."""
+    for i in range(10):
+        add_event(f'Talk {i}', now + timedelta(days=1), description='Long text ' * 20)
+    return '/api/events'
+
+
+def test_gzip_when_accepted(client, listing):
+    plain = client.get(listing)
+    response = client.get(listing, headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.get_data()) == plain.get_data()
+    # The cached listing keeps its compressed variant
+    assert client.get(listing, headers={'Accept-Encoding': 'gzip'}).get_data() == response.get_data()
+
+
+def test_uncompressed_responses_still_vary(client, listing):
+    response = client.get(listing, headers={'Accept-Encoding': 'identity'})
+
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+
+@pytest.mark.skipif('br' not in ENCODERS, reason='brotli is not installed')
+def test_brotli_is_preferred(client, listing):
+    response = client.get(listing, headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+
+
+def test_responses_built_per_request_are_compressed(client, add_event, now):
+    event_id = add_event('Talk', now + timedelta(days=1), description='Long text ' * 200)
+
+    response = client.get(f'/api/events/{event_id}', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert b'Long text' in gzip.decompress(response.get_data())
+
+
+def test_small_bodies_are_sent_as_is(client):
+    response = client.get('/api/tags', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' not in response.headers.get('Vary', '')
@@ -0,0 +1,24 @@
+"""Event listings and single events"""
+from datetime import timedelta
+
+
+def test_lists_upcoming_events_in_start_order(client, add_event, now):
+    later = add_event('Later', now + timedelta(days=2), tag='Career')
+    sooner = add_event('Sooner', now + timedelta(days=1), tag='Social')
+    add_event('Past', now - timedelta(days=2))
+    add_event('Too far', now + timedelta(days=30))
+
+    response = client.get('/api/events?days=7')
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [event['id'] for event in data['events']] == [sooner, later]
+    assert data['events'][0]['tag'] == 'Social'
+    assert data['next_cursor'] is None
+
+
+def test_single_event(client, add_event, now):
+    event_id = add_event('Talk', now + timedelta(days=1))
+
+    assert client.get(f'/api/events/{event_id}').get_json()['title'] == 'Talk'
+    assert client.get('/api/events/999').status_code == 404
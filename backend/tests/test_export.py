@@ -0,0 +1,14 @@
+"""Streaming NDJSON export"""
+import json
+from datetime import timedelta
+
+
+def test_export_streams_ndjson(client, add_event, now):
+    for i in range(3):
+        add_event(f'Event {i}', now + timedelta(days=i + 1))
+
+    response = client.get('/api/events/export?fields=title')
+
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line)['title'] for line in lines] == ['Event 0', 'Event 1', 'Event 2']
@@ -0,0 +1,18 @@
+"""Sparse fieldsets: fields= and view=compact"""
+from datetime import timedelta
+
+
+def test_fields_limit_the_payload(client, add_event, now):
+    add_event('Talk', now + timedelta(days=1), description='Long text', tag='General')
+
+    event = client.get('/api/events?fields=title').get_json()['events'][0]
+    assert set(event) == {'id', 'title', 'start_time'}
+
+    compact = client.get('/api/events?view=compact').get_json()['events'][0]
+    assert 'description' not in compact
+    assert compact['source']['name'] == 'Campus Events Calendar'
+
+
+def test_rejects_unknown_fields_and_views(client):
+    assert client.get('/api/events?fields=title,password').status_code == 400
+    assert client.get('/api/events?view=tiny').status_code == 400
@@ -0,0 +1,25 @@
+"""Generation ETags and conditional GET"""
+from datetime import timedelta
+
+
+def test_revalidation_answers_304_until_a_write(client, add_event, now):
+    add_event('Talk', now + timedelta(days=1))
+
+    first = client.get('/api/events')
+    etag = first.headers['ETag']
+    assert client.get('/api/events', headers={'If-None-Match': etag}).status_code == 304
+
+    add_event('Another talk', now + timedelta(days=2))
+
+    response = client.get('/api/events', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.get_json()['count'] == 2
+
+
+def test_untimed_endpoints_use_generation_etag(client):
+    response = client.get('/api/tags')
+    etag = response.headers['ETag']
+
+    assert client.get('/api/tags', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/sources', headers={'If-None-Match': etag}).status_code == 304
@@ -0,0 +1,69 @@
+"""iCalendar feeds: conditional GET and per-event serialization"""
+from datetime import timedelta
+
+import utils.ics_feed
+from models import db, Event
+from utils.ics_feed import vevent_cache
+
+
+def get_feed(client, **headers):
+    """GET the feed, reading the streamed body so the request ends."""
+    response = client.get('/api/events.ics', headers=headers)
+    response.get_data()
+    return response
+
+
+def test_feed_lists_events_in_the_window(client, add_event, now):
+    event_id = add_event('Talk', now + timedelta(days=1))
+    add_event('Long ago', now - timedelta(days=90))
+
+    response = get_feed(client)
+
+    assert response.mimetype == 'text/calendar'
+    body = response.get_data(as_text=True)
+    assert f'UID:event-{event_id}@concierge' in body
+    assert 'Long ago' not in body
+    assert body.endswith('END:VCALENDAR\r\n')
+
+
+def test_revalidation_by_etag_and_last_modified(client, add_event, now):
+    add_event('Talk', now + timedelta(days=1))
+
+    first = get_feed(client)
+    etag, modified = first.headers['ETag'], first.headers['Last-Modified']
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+    assert get_feed(client, **{'If-None-Match': etag}).status_code == 304
+    assert get_feed(client, **{'If-Modified-Since': modified}).status_code == 304
+
+    add_event('Another talk', now + timedelta(days=2))
+
+    response = get_feed(client, **{'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert 'Another talk' in response.get_data(as_text=True)
+
+
+def test_events_are_serialized_once_per_version(client, application, add_event, now, monkeypatch):
+    first = add_event('Talk', now + timedelta(days=1))
+    get_feed(client)
+
+    built = []
+    build_vevent = utils.ics_feed.build_vevent
+    monkeypatch.setattr('utils.ics_feed.build_vevent',
+                        lambda values, **kwargs: built.append(values['id']) or build_vevent(values, **kwargs))
+
+    second = add_event('Another talk', now + timedelta(days=2))
+    get_feed(client)
+    assert built == [second]
+
+    with application.app_context():
+        db.session.get(Event, first).title = 'Talk (moved)'
+        db.session.commit()
+
+    assert 'Talk (moved)' in get_feed(client).get_data(as_text=True)
+    assert built == [second, first]
+
+    vevent_cache.clear()
+    get_feed(client)
+    assert sorted(built[2:]) == [first, second]
@@ -0,0 +1,171 @@
+"""The interval tree behind the listing windows"""
+import random
+from datetime import datetime, timedelta
+
+from models import db, Event, User
+from utils.generation import current_generation, EVENT_ROWS_GENERATION
+from utils.interval_index import IntervalIndex, PatchedIndex, event_index, fetch_window_rows
+
+BASE = datetime(2024, 1, 1)
+
+
+def random_rows(count, seed=7):
+    rng = random.Random(seed)
+    rows = []
+    for event_id in range(1, count + 1):
+        start = BASE + timedelta(minutes=rng.randrange(0, 60 * 24 * 20))
+        end = start + timedelta(minutes=rng.choice([0, 30, 90, 60 * 24 * 3])) if rng.random() < 0.8 else None
+        rows.append((event_id, start, end, rng.choice([None, 1, 2, 3]), rng.choice([1, 2])))
+    return rows
+
+
+def brute_force(rows, start, end, end_inclusive=True, tag_id=None, source_id=None, after=None):
+    found = []
+    for event_id, row_start, row_end, row_tag_id, row_source_id in rows:
+        row_end = row_end or row_start
+        if row_end < start or row_start > end or (row_start == end and not end_inclusive):
+            continue
+        if tag_id is not None and row_tag_id != tag_id:
+            continue
+        if source_id and row_source_id != source_id:
+            continue
+        if after and (row_start, event_id) <= after:
+            continue
+        found.append((row_start, event_id))
+    return [event_id for _, event_id in sorted(found)]
+
+
+def test_overlapping_matches_brute_force():
+    rows = random_rows(2000)
+    index = IntervalIndex(rows)
+    rng = random.Random(3)
+
+    for _ in range(200):
+        start = BASE + timedelta(minutes=rng.randrange(-600, 60 * 24 * 21))
+        end = start + timedelta(minutes=rng.choice([0, 60, 60 * 24, 60 * 24 * 7]))
+        options = {
+            'end_inclusive': rng.random() < 0.5,
+            'tag_id': rng.choice([None, None, 1, 3]),
+            'source_id': rng.choice([None, 2]),
+        }
+        assert index.overlapping(start, end, **options) == brute_force(rows, start, end, **options)
+
+
+def test_keyset_pages_join_up():
+    rows = random_rows(500)
+    index = IntervalIndex(rows)
+    start, end = BASE + timedelta(days=3), BASE + timedelta(days=9)
+    expected = brute_force(rows, start, end)
+    by_id = {row[0]: row for row in rows}
+
+    pages, after = [], None
+    while True:
+        page = index.overlapping(start, end, after=after, limit=25)
+        pages.extend(page)
+        if len(page) < 25:
+            break
+        after = (by_id[page[-1]][1], page[-1])
+
+    assert pages == expected
+
+
+def test_rows_round_trip():
+    rows = random_rows(50)
+    index = IntervalIndex(rows)
+
+    assert len(index) == 50
+    assert IntervalIndex(index.rows()).overlapping(BASE, BASE + timedelta(days=30)) == \
+        index.overlapping(BASE, BASE + timedelta(days=30))
+
+
+def test_patched_index_matches_brute_force():
+    rows = random_rows(1000)
+    rng = random.Random(5)
+    # Moved, retagged and new events
+    changed = []
+    for event_id, start, end, _, source_id in rng.sample(rows, 50):
+        shift = timedelta(days=rng.choice([-2, 1]))
+        changed.append((event_id, start + shift, end and end + shift, 3, source_id))
+    changed += random_rows(1050, seed=9)[1000:]
+    by_id = {row[0]: row for row in rows}
+    by_id.update((row[0], row) for row in changed)
+    current = list(by_id.values())
+
+    index = PatchedIndex(IntervalIndex(rows), changed)
+
+    assert len(index) == 1050
+    for _ in range(100):
+        start = BASE + timedelta(minutes=rng.randrange(-600, 60 * 24 * 21))
+        end = start + timedelta(minutes=rng.choice([0, 60, 60 * 24, 60 * 24 * 7]))
+        options = {'tag_id': rng.choice([None, 3]), 'source_id': rng.choice([None, 2]),
+                   'after': rng.choice([None, (start + timedelta(hours=12), 500)])}
+        expected = brute_force(current, start, end, **options)
+        assert index.overlapping(start, end, **options) == expected
+        assert index.overlapping(start, end, limit=10, **options) == expected[:10]
+
+
+def test_index_follows_writes(application, add_event, now):
+    first = add_event('First', now + timedelta(hours=1))
+    with application.app_context():
+        rows = fetch_window_rows(now, now + timedelta(days=1))
+        assert [row.id for row in rows] == [first]
+
+    # Patched in on the next generation, without rebuilding the index
+    second = add_event('Second', now + timedelta(hours=2), end=now + timedelta(hours=3))
+    with application.app_context():
+        rows = fetch_window_rows(now, now + timedelta(days=1))
+        assert [row.id for row in rows] == [first, second]
+        index = event_index.current(current_generation(EVENT_ROWS_GENERATION))
+        assert isinstance(index, PatchedIndex)
+        assert len(index) == 2
+
+        # An edit replaces its earlier entry
+        db.session.get(Event, first).start_time = now + timedelta(hours=4)
+        db.session.commit()
+        rows = fetch_window_rows(now, now + timedelta(days=1))
+        assert [row.id for row in rows] == [second, first]
+
+    # A long event that started before the window is still running in it
+    running = add_event('Conference', now - timedelta(days=1), end=now + timedelta(days=1))
+    with application.app_context():
+        rows = fetch_window_rows(now, now + timedelta(days=1))
+        assert [row.id for row in rows] == [running, second, first]
+
+
+def test_index_ignores_writes_to_other_tables(application, add_event, now):
+    add_event('Talk', now + timedelta(hours=1))
+    with application.app_context():
+        fetch_window_rows(now, now + timedelta(days=1))
+        index = event_index.current(current_generation(EVENT_ROWS_GENERATION))
+        events_generation = current_generation()
+
+        db.session.add(User(email='student@example.com'))
+        db.session.commit()
+
+        assert current_generation() > events_generation
+        assert event_index.current(current_generation(EVENT_ROWS_GENERATION)) is index
+
+
+def test_index_drops_deleted_events(application, add_event, now):
+    kept = add_event('Kept', now + timedelta(hours=1))
+    deleted = add_event('Deleted', now + timedelta(hours=2))
+    with application.app_context():
+        assert len(fetch_window_rows(now, now + timedelta(days=1))) == 2
+
+        db.session.delete(db.session.get(Event, deleted))
+        db.session.commit()
+
+        assert [row.id for row in fetch_window_rows(now, now + timedelta(days=1))] == [kept]
+
+
+def test_patches_are_folded_in_past_the_threshold(application, add_event, now, monkeypatch):
+    monkeypatch.setattr('utils.interval_index.MAX_OVERLAY_ROWS', 0)
+    first = add_event('First', now + timedelta(hours=1))
+    with application.app_context():
+        fetch_window_rows(now, now + timedelta(days=1))
+
+    second = add_event('Second', now + timedelta(hours=2))
+    with application.app_context():
+        index = event_index.current(current_generation(EVENT_ROWS_GENERATION))
+        assert isinstance(index, IntervalIndex)
+        assert index.overlapping(now, now + timedelta(days=1)) == [first, second]
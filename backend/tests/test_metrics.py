@@ -0,0 +1,41 @@
+"""Prometheus metrics at /api/metrics"""
+import pytest
+
+import scheduler
+from utils.jobs import job_stats
+from utils.metrics import CONTENT_TYPE
+
+
+def metric(client, line_start):
+    """Value of the first /api/metrics sample starting with `line_start`, or 0."""
+    for line in client.get('/api/metrics').get_data(as_text=True).splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(' ', 1)[1])
+    return 0
+
+
+def test_requests_are_counted_by_route(client):
+    sample = 'concierge_http_requests_total{route="/api/events/<int:event_id>",method="GET",status="404"}'
+    before = metric(client, sample)
+
+    client.get('/api/events/999')
+    client.get('/api/events/998')
+
+    response = client.get('/api/metrics')
+    assert response.headers['Content-Type'] == CONTENT_TYPE
+    assert metric(client, sample) == before + 2
+    assert 'concierge_db_statements_per_request_count{route="/api/events/<int:event_id>"}' \
+        in response.get_data(as_text=True)
+
+
+def test_failed_jobs_are_counted(client, monkeypatch):
+    def fail():
+        raise RuntimeError('database is locked')
+    monkeypatch.setattr(scheduler, 'roll_upcoming_boundary', fail)
+    failures = job_stats.snapshot().get('roll_stats', {}).get('failures', 0)
+
+    with pytest.raises(RuntimeError):
+        scheduler.job_roll_stats()
+
+    assert job_stats.snapshot()['roll_stats']['failures'] == failures + 1
+    assert metric(client, 'concierge_job_failures_total{job="roll_stats"}') == failures + 1
@@ -0,0 +1,35 @@
+"""Keyset (cursor) pagination of /api/events"""
+from datetime import timedelta
+
+from utils.pagination import encode_cursor
+
+
+def test_cursor_pages_cover_every_event_once(client, add_event, now):
+    start = now + timedelta(hours=1)
+    # Equal start times are ordered by id
+    ids = [add_event(f'Event {i}', start + timedelta(hours=i // 3)) for i in range(10)]
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        url = '/api/events?limit=4' + (f'&cursor={cursor}' if cursor else '')
+        data = client.get(url).get_json()
+        seen.extend(event['id'] for event in data['events'])
+        pages += 1
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+
+    assert seen == ids
+    assert pages == 3
+
+
+def test_cursor_encodes_last_row_position(client, add_event, now):
+    first = add_event('First', now + timedelta(hours=1))
+    add_event('Second', now + timedelta(hours=2))
+
+    data = client.get('/api/events?limit=1').get_json()
+    assert data['next_cursor'] == encode_cursor(now + timedelta(hours=1), first)
+
+
+def test_rejects_malformed_cursor(client):
+    assert client.get('/api/events?cursor=not-a-cursor').status_code == 400
@@ -0,0 +1,7 @@
+"""Query plans of the hot query shapes (see check_query_plans.py)"""
+from check_query_plans import check
+
+
+def test_hot_queries_seek_on_indexes(application):
+    with application.app_context():
+        assert check() == []
@@ -0,0 +1,262 @@
+"""RRULE expansion of recurring ICS events"""
+from datetime import timedelta
+
+import pytest
+
+from ingestion.ics_parser import parse_ics_content
+from ingestion.ingest import store_events
+from utils.interval_index import fetch_window_rows
+
+STAMP = '%Y%m%dT%H%M%SZ'
+
+
+def weekly_feed(start, exdates=(), moved=None):
+    """ICS calendar with one weekly series from `start` (UTC)."""
+    lines = [
+        'BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//concierge//tests//EN',
+        'BEGIN:VEVENT',
+        'UID:weekly@tests',
+        'SUMMARY:Weekly sync',
+        f'DTSTART:{start:{STAMP}}',
+        f'DTEND:{start + timedelta(hours=1):{STAMP}}',
+        'RRULE:FREQ=WEEKLY',
+    ]
+    lines += [f'EXDATE:{exdate:{STAMP}}' for exdate in exdates]
+    lines.append('END:VEVENT')
+    if moved:
+        lines += [
+            'BEGIN:VEVENT',
+            'UID:weekly@tests',
+            f'RECURRENCE-ID:{moved:{STAMP}}',
+            'SUMMARY:Weekly sync (moved)',
+            f'DTSTART:{moved + timedelta(hours=2):{STAMP}}',
+            'END:VEVENT',
+        ]
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(lines).encode()
+
+
+@pytest.fixture
+def first_day(now):
+    """Midnight after `now`, so every occurrence in the tests is upcoming."""
+    return now.replace(hour=0, minute=0) + timedelta(days=1)
+
+
+def ingest(application, source_id, feed):
+    with application.app_context():
+        return store_events(parse_ics_content(feed), source_id)
+
+
+def window(application, start, end, **filters):
+    with application.app_context():
+        return fetch_window_rows(start, end, end_inclusive=False, **filters)
+
+
+def test_series_is_stored_once(application, source_id, first_day):
+    ingested, _ = ingest(application, source_id,
+                         weekly_feed(first_day - timedelta(weeks=52) + timedelta(hours=10)))
+
+    assert ingested == 1
+
+
+def test_occurrences_fill_the_window(application, source_id, first_day):
+    start = first_day - timedelta(weeks=2) + timedelta(hours=10)
+    ingest(application, source_id, weekly_feed(start))
+
+    rows = window(application, first_day, first_day + timedelta(weeks=4))
+
+    assert [row.start_time for row in rows] == [
+        first_day + timedelta(hours=10, weeks=week) for week in range(4)
+    ]
+    assert all(row.end_time - row.start_time == timedelta(hours=1) for row in rows)
+    assert {row.title for row in rows} == {'Weekly sync'}
+
+
+def test_exdates_and_overrides_replace_occurrences(application, source_id, first_day):
+    start = first_day - timedelta(weeks=2) + timedelta(hours=10)
+    skipped = first_day + timedelta(hours=10, weeks=1)
+    moved = first_day + timedelta(hours=10, weeks=2)
+    ingest(application, source_id, weekly_feed(start, exdates=[skipped], moved=moved))
+
+    rows = window(application, first_day, first_day + timedelta(weeks=4))
+
+    assert [(row.start_time, row.title) for row in rows] == [
+        (first_day + timedelta(hours=10), 'Weekly sync'),
+        (moved + timedelta(hours=2), 'Weekly sync (moved)'),
+        (first_day + timedelta(hours=10, weeks=3), 'Weekly sync'),
+    ]
+
+
+def test_occurrences_page_with_one_off_events(application, source_id, add_event, first_day):
+    ingest(application, source_id, weekly_feed(first_day + timedelta(hours=10)))
+    one_off = add_event('One-off', first_day + timedelta(days=1))
+
+    rows = window(application, first_day, first_day + timedelta(weeks=2), limit=2)
+    assert [row.title for row in rows] == ['Weekly sync', 'One-off']
+    assert rows[1].id == one_off
+
+    after = (rows[-1].start_time, rows[-1].id)
+    rows = window(application, first_day, first_day + timedelta(weeks=2), after=after)
+    assert [row.start_time for row in rows] == [first_day + timedelta(hours=10, weeks=1)]
+
+
+def test_series_follow_filters(application, source_id, first_day):
+    ingest(application, source_id, weekly_feed(first_day + timedelta(hours=10)))
+
+    assert window(application, first_day, first_day + timedelta(weeks=1), source_id=source_id)
+    assert not window(application, first_day, first_day + timedelta(weeks=1), source_id=source_id + 1)
+    assert not window(application, first_day, first_day + timedelta(weeks=1), tag='Career')
+
+
+def test_calendar_counts_each_occurrence(client, application, source_id, first_day):
+    start = first_day - timedelta(weeks=2) + timedelta(hours=10)
+    ingest(application, source_id, weekly_feed(start, exdates=[first_day + timedelta(hours=10)]))
+
+    last_day = first_day + timedelta(weeks=3) - timedelta(days=1)
+    data = client.get(
+        f'/api/events/calendar?from={first_day:%Y-%m-%d}&to={last_day:%Y-%m-%d}&titles=1'
+    ).get_json()
+
+    assert [day['date'] for day in data['days']] == [
+        (first_day + timedelta(weeks=week)).date().isoformat() for week in (1, 2)
+    ]
+    assert data['count'] == 2
+    assert data['days'][0]['titles'][0]['title'] == 'Weekly sync'
+
+
+def test_reingest_updates_the_stored_rules(application, source_id, first_day):
+    start = first_day + timedelta(hours=10)
+    ingest(application, source_id, weekly_feed(start))
+    assert len(window(application, first_day, first_day + timedelta(weeks=3))) == 3
+
+    ingested, duplicates = ingest(application, source_id,
+                                  weekly_feed(start, exdates=[start + timedelta(weeks=1)]))
+
+    assert (ingested, duplicates) == (0, 1)
+    rows = window(application, first_day, first_day + timedelta(weeks=3))
+    assert [row.start_time for row in rows] == [start, start + timedelta(weeks=2)]
+
+
+def test_occurrences_have_ids_of_their_own(client, application, source_id, add_event, now):
+    start = now + timedelta(hours=1)
+    ingest(application, source_id, weekly_feed(start))
+    add_event('One-off', start)
+
+    seen, cursor = [], None
+    while True:
+        url = '/api/events?days=21&limit=2' + (f'&cursor={cursor}' if cursor else '')
+        data = client.get(url).get_json()
+        seen.extend(data['events'])
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+
+    ids = [event['id'] for event in seen]
+    assert len(ids) == len(set(ids)) == 4
+    assert [event['title'] for event in seen] == ['Weekly sync', 'One-off', 'Weekly sync', 'Weekly sync']
+    series_id = int(ids[0].split('@')[0])
+    assert ids[2] == f'{series_id}@{start + timedelta(weeks=1):%Y%m%dT%H%M%S}'
+
+
+def test_batch_resolves_occurrence_ids(client, application, source_id, now):
+    start = now + timedelta(hours=1)
+    ingest(application, source_id, weekly_feed(start))
+    listed = client.get('/api/events?days=14').get_json()['events']
+    second = listed[1]['id']
+    series_id = int(second.split('@')[0])
+    not_an_occurrence = f'{series_id}@{start + timedelta(days=1):%Y%m%dT%H%M%S}'
+
+    data = client.get(f'/api/events/batch?ids={second},{not_an_occurrence},{series_id}').get_json()
+
+    assert [event['id'] for event in data['events']] == [second, series_id]
+    assert data['events'][0]['start_time'] == (start + timedelta(weeks=1)).isoformat()
+    assert data['missing'] == [not_an_occurrence]
+    assert client.get('/api/events/batch?ids=1@tomorrow').status_code == 400
+
+
+def test_feed_carries_the_rules_of_old_series(client, application, source_id, first_day):
+    start = first_day - timedelta(weeks=20) + timedelta(hours=10)
+    moved = first_day + timedelta(hours=10, weeks=1)
+    ingest(application, source_id, weekly_feed(start, moved=moved))
+
+    feed = client.get('/api/events.ics').get_data(as_text=True)
+    events = parse_ics_content(feed.encode())
+
+    series = [event for event in events if event['recurrence']]
+    assert len(series) == 1
+    assert 'RRULE:FREQ=WEEKLY' in series[0]['recurrence']
+    assert f'EXDATE:{moved:%Y%m%dT%H%M%S}' in series[0]['recurrence']
+    assert [event['title'] for event in events if not event['recurrence']] == ['Weekly sync (moved)']
+
+
+def test_export_lists_each_occurrence(client, application, source_id, now):
+    start = now - timedelta(weeks=3) + timedelta(hours=1)
+    ingest(application, source_id, weekly_feed(start))
+
+    lines = client.get('/api/events/export?days=14&fields=title').get_data(as_text=True).splitlines()
+
+    assert len(lines) == 2
+    assert all('Weekly sync' in line for line in lines)
+
+
+def test_search_finds_the_next_occurrence(client, application, source_id, now):
+    start = now - timedelta(weeks=3) + timedelta(hours=1)
+    ingest(application, source_id, weekly_feed(start))
+
+    events = client.get('/api/events/search?q=weekly').get_json()['events']
+
+    assert [event['start_time'] for event in events] == [(start + timedelta(weeks=3)).isoformat()]
+    assert client.get('/api/events/search?q=weekly&days=1').get_json()['count'] == 1
+    assert client.get('/api/events/search?q=weekly&tag=Career').get_json()['count'] == 0
+
+
+@pytest.fixture
+def asgi_client(application):
+    """Client of the ASGI app, on the same database, with an empty response cache."""
+    from starlette.testclient import TestClient
+    import asgi
+
+    asgi.response_cache._entries.clear()
+    with TestClient(asgi.app) as client:
+        yield client
+
+
+@pytest.mark.parametrize('url', [
+    '/api/events?days=21',
+    '/api/events?days=21&limit=2',
+    '/api/events?days=21&source_id={source_id}&fields=title,start_time',
+    '/api/events/today',
+])
+def test_asgi_lists_occurrences_like_flask(client, asgi_client, application, source_id, add_event,
+                                           now, url):
+    start = now - timedelta(weeks=2) + timedelta(minutes=30)
+    ingest(application, source_id, weekly_feed(start, exdates=[start + timedelta(weeks=3)]))
+    add_event('One-off', now + timedelta(days=1))
+    url = url.format(source_id=source_id)
+
+    flask_response = client.get(url)
+    asgi_response = asgi_client.get(url)
+
+    assert asgi_response.json() == flask_response.get_json()
+    assert asgi_response.headers['ETag'] == flask_response.headers['ETag']
+    if url.startswith('/api/events?'):
+        assert 'Weekly sync' in {event['title'] for event in asgi_response.json()['events']}
+
+
+def test_asgi_pages_through_occurrences(client, asgi_client, application, source_id, add_event, now):
+    start = now + timedelta(hours=1)
+    ingest(application, source_id, weekly_feed(start))
+    add_event('One-off', start)
+
+    def walk(get):
+        seen, cursor = [], None
+        while True:
+            data = get('/api/events?days=21&limit=2' + (f'&cursor={cursor}' if cursor else ''))
+            seen.extend(event['id'] for event in data['events'])
+            cursor = data['next_cursor']
+            if not cursor:
+                return seen
+
+    flask_ids = walk(lambda url: client.get(url).get_json())
+    assert walk(lambda url: asgi_client.get(url).json()) == flask_ids
+    assert len(flask_ids) == 4
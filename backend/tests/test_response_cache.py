@@ -0,0 +1,48 @@
+"""The in-process response cache"""
+from datetime import timedelta
+
+from models import db, User
+from utils.cache import ResponseCache, response_cache
+
+
+def test_repeated_requests_are_served_from_cache(client, add_event, now):
+    add_event('Talk', now + timedelta(days=1))
+
+    client.get('/api/events?days=3')
+    hits = response_cache.hits
+    body = client.get('/api/events?days=3').get_data()
+
+    assert response_cache.hits == hits + 1
+    assert b'Talk' in body
+
+
+def test_cache_sees_writes(client, add_event, now):
+    add_event('Talk', now + timedelta(days=1))
+    assert client.get('/api/events').get_json()['count'] == 1
+
+    add_event('Another talk', now + timedelta(days=1))
+    assert client.get('/api/events').get_json()['count'] == 2
+
+
+def test_user_writes_keep_the_cache(client, application, add_event, now):
+    add_event('Talk', now + timedelta(days=1))
+    client.get('/api/events?days=3')
+
+    with application.app_context():
+        db.session.add(User(email='new@example.com'))
+        db.session.commit()
+
+    hits = response_cache.hits
+    client.get('/api/events?days=3')
+    assert response_cache.hits == hits + 1
+
+
+def test_older_generations_do_not_invalidate():
+    cache = ResponseCache()
+    loads = []
+    cache.loader('page')(lambda: loads.append(1) or len(loads))
+
+    assert cache.get('page', (), 2) == 1
+    assert cache.get('page', (), 1) == 2  # a request that read the counter early
+    assert cache.get('page', (), 2) == 1
+    assert len(loads) == 2
@@ -0,0 +1,54 @@
+"""Full-text search over upcoming events"""
+from datetime import timedelta
+
+import pytest
+
+from utils.search import InvalidSearch, build_match_query
+
+
+def test_match_query_quotes_words_and_prefixes_the_last():
+    assert build_match_query('Career fair') == '"career" "fair"*'
+    with pytest.raises(InvalidSearch):
+        build_match_query('  ?! ')
+
+
+def test_ranks_title_matches_first(client, add_event, now):
+    body = add_event('Workshop', now + timedelta(days=1), description='Bring your resume')
+    title = add_event('Resume clinic', now + timedelta(days=2))
+    add_event('Resume review (past)', now - timedelta(days=1))
+    add_event('Hackathon', now + timedelta(days=1))
+
+    data = client.get('/api/events/search?q=resume').get_json()
+
+    assert [event['id'] for event in data['events']] == [title, body]
+
+
+def test_matches_prefix_and_filters(client, add_event, now):
+    career = add_event('Networking night', now + timedelta(days=1), tag='Career')
+    add_event('Networking lunch', now + timedelta(days=20), tag='Social')
+
+    assert client.get('/api/events/search?q=netw').get_json()['count'] == 2
+    data = client.get('/api/events/search?q=networking&tag=Career').get_json()
+    assert [event['id'] for event in data['events']] == [career]
+    assert client.get('/api/events/search?q=networking&days=7').get_json()['count'] == 1
+
+
+def test_rejects_empty_query(client):
+    assert client.get('/api/events/search?q=').status_code == 400
+
+
+def test_broad_queries_rank_the_newest_matches(client, add_event, now, monkeypatch):
+    monkeypatch.setattr('utils.search.SEARCH_CANDIDATES', 2)
+    older = add_event('Resume review', now + timedelta(days=2))
+    add_event('Workshop', now + timedelta(days=1), description='Bring your resume')
+    add_event('Resume clinic (past)', now - timedelta(days=1))
+    newest = add_event('Resume lab', now + timedelta(days=3))
+
+    data = client.get('/api/events/search?q=resume&limit=1').get_json()
+    assert [event['id'] for event in data['events']] == [newest]
+    assert data['ranked_all'] is False
+
+    # The past clinic leaves less than a page: widened to every match
+    data = client.get('/api/events/search?q=resume&limit=2').get_json()
+    assert sorted(event['id'] for event in data['events']) == [older, newest]
+    assert data['ranked_all'] is True
@@ -0,0 +1,54 @@
+"""Slow query log and /api/admin/slow-queries"""
+import json
+
+import pytest
+from sqlalchemy import event
+
+import utils.slow_queries
+from models import db
+from utils.slow_queries import install_slow_query_log, SlowQueryLog
+
+
+@pytest.fixture
+def slow_log(application, tmp_path, monkeypatch):
+    """Log every statement of every engine to a scratch log."""
+    log = SlowQueryLog(50, str(tmp_path / 'slow_queries.log'))
+    monkeypatch.setattr(utils.slow_queries, 'slow_query_log', log)
+    monkeypatch.setattr('app.slow_query_log', log)
+    monkeypatch.setattr(utils.slow_queries, 'SLOW_QUERY_MS', 1e-6)
+    with application.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        install_slow_query_log(engine)
+    yield log
+    for engine in engines:
+        event.remove(engine, 'before_cursor_execute', utils.slow_queries._before_cursor_execute)
+        event.remove(engine, 'after_cursor_execute', utils.slow_queries._after_cursor_execute)
+
+
+def test_statements_are_logged_with_origin_and_plan(client, slow_log):
+    client.get('/api/events/999?fields=title')
+
+    entry = next(entry for entry in slow_log.entries() if 'FROM events' in entry['statement'])
+    assert entry['origin'] == '/api/events/<int:event_id>'
+    assert entry['request'] == 'GET /api/events/999?fields=title'
+    assert any('events' in line for line in entry['plan'])
+
+    with open(slow_log.path) as f:
+        logged = [json.loads(line) for line in f]
+    assert logged[-1]['statement'] == slow_log.entries()[0]['statement']
+
+
+def test_admin_endpoint_needs_the_token(client, slow_log, monkeypatch):
+    assert client.get('/api/admin/slow-queries').status_code == 404
+
+    monkeypatch.setattr('utils.admin.ADMIN_TOKEN', 'secret')
+    assert client.get('/api/admin/slow-queries').status_code == 401
+    assert client.get('/api/admin/slow-queries',
+                      headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+    client.get('/api/tags')
+    response = client.get('/api/admin/slow-queries?limit=1',
+                          headers={'Authorization': 'Bearer secret'})
+    assert response.status_code == 200
+    assert response.get_json()['count'] == 1
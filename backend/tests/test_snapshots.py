@@ -0,0 +1,85 @@
+"""Stale snapshots and the database circuit breaker"""
+from datetime import timedelta
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from utils.compression import ResponseBody
+from utils.snapshots import db_breaker, SnapshotStore, FAILURE_THRESHOLD
+
+
+@pytest.fixture
+def snapshots(tmp_path, monkeypatch):
+    """An empty snapshot store in place of the one shared by the tests."""
+    store = SnapshotStore(str(tmp_path))
+    monkeypatch.setattr('app.snapshot_store', store)
+    return store
+
+
+@pytest.fixture
+def database_down(monkeypatch):
+    """Make every generation lookup fail as if SQLite stayed locked."""
+    def unavailable(name):
+        raise OperationalError('SELECT', {}, Exception('database is locked'))
+
+    def go_down():
+        monkeypatch.setattr('utils.generation.get_generation_state', unavailable)
+    return go_down
+
+
+def test_failing_queries_serve_the_last_good_response(client, add_event, now, snapshots, database_down):
+    add_event('Talk', now + timedelta(days=1))
+    good = client.get('/api/events')
+
+    database_down()
+    response = client.get('/api/events')
+
+    assert response.status_code == 200
+    assert response.headers['X-Data-Stale'] == 'true'
+    assert response.cache_control.no_store
+    assert 'ETag' not in response.headers
+    assert response.get_json() == good.get_json()
+    assert db_breaker.failures == 1
+
+
+def test_no_snapshot_answers_503(client, snapshots, database_down):
+    database_down()
+    response = client.get('/api/events')
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After']
+
+
+def test_breaker_opens_and_serves_snapshots_without_queries(client, add_event, now, snapshots,
+                                                            database_down, monkeypatch):
+    # Keep the recovery probe asleep for the rest of the run
+    monkeypatch.setattr(db_breaker, 'retry_interval', 3600)
+    add_event('Talk', now + timedelta(days=1))
+    client.get('/api/events')
+    database_down()
+    for _ in range(FAILURE_THRESHOLD):
+        client.get('/api/events')
+    assert db_breaker.is_open
+
+    def unexpected(*args):
+        raise AssertionError('queried while the breaker is open')
+    monkeypatch.setattr('app.response_cache.get', unexpected)
+
+    response = client.get('/api/events')
+    assert response.headers['X-Data-Stale'] == 'true'
+    assert response.get_json()['count'] == 1
+
+
+def test_database_errors_count_once_per_request(client, snapshots, database_down):
+    database_down()
+    client.get('/api/events')
+    assert db_breaker.failures == 1
+
+
+def test_snapshots_survive_a_restart(tmp_path):
+    SnapshotStore(str(tmp_path)).save(('events', (7,)), ResponseBody('{"count": 1}'))
+
+    saved_at, body = SnapshotStore(str(tmp_path)).load(('events', (7,)))
+
+    assert body.data == b'{"count": 1}'
+    assert SnapshotStore(str(tmp_path)).load(('events', (1,))) is None
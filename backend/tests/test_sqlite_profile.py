@@ -0,0 +1,43 @@
+"""Reader / writer routing of the SQLite connections"""
+from datetime import timedelta
+
+from sqlalchemy import select
+
+import ingestion.ingest
+from models import db, Event, Source
+from utils.sqlite_profile import READER_BIND
+
+
+def bind_for(application, path, method):
+    with application.test_request_context(path, method=method):
+        return db.session.get_bind(clause=select(Event.id))
+
+
+def test_read_only_posts_use_the_reader(application):
+    with application.app_context():
+        reader, writer = db.engines[READER_BIND], db.engine
+
+    assert bind_for(application, '/api/events/batch', 'GET') is reader
+    assert bind_for(application, '/api/events/batch', 'POST') is reader
+    assert bind_for(application, '/api/users', 'POST') is writer
+
+
+def test_ingest_frees_the_writer_while_fetching(application, now, monkeypatch):
+    with application.app_context():
+        writer = db.engine
+        active = db.session.query(Source).filter_by(active=True).count()
+
+    fetched = []
+
+    def fetch(source):
+        # Nothing may hold the single writer connection across the network
+        fetched.append(writer.pool.checkedout())
+        return [{'title': f'From {source.name}', 'start_time': now + timedelta(days=1)}]
+    monkeypatch.setattr(ingestion.ingest, 'fetch_events_from_source', fetch)
+
+    ingestion.ingest.ingest_all_sources()
+
+    assert fetched == [0] * active
+    with application.app_context():
+        assert db.session.query(Event).count() == active
+        assert db.session.query(Source).filter(Source.last_fetched.isnot(None)).count() == active
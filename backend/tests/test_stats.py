@@ -0,0 +1,75 @@
+"""Incrementally maintained /api/stats counters"""
+from datetime import timedelta
+
+from models import db, Event, User
+from utils.stats import reconcile, read_stats, roll_upcoming_boundary, TAG_PREFIX
+from utils.tags import tag_registry
+
+
+def stats(client):
+    return client.get('/api/stats').get_json()
+
+
+def test_counts_follow_inserts(client, application, add_event, now):
+    add_event('Talk', now + timedelta(days=1), tag='Career')
+    add_event('Past', now - timedelta(days=1), tag='Career')
+    with application.app_context():
+        db.session.add(User(email='new@example.com'))
+        db.session.commit()
+
+    data = stats(client)
+
+    assert data['total_events'] == 2
+    assert data['upcoming_events'] == 1
+    assert data['events_by_tag'] == {'Career': 2}
+    assert data['total_users'] == 1
+
+
+def test_updates_of_loaded_events_move_their_counts(application, add_event, now):
+    event_id = add_event('Talk', now + timedelta(days=1), tag='Career')
+
+    with application.app_context():
+        event = db.session.get(Event, event_id)
+        db.session.commit()  # expires the loaded values
+        event.start_time = now - timedelta(days=1)
+        db.session.commit()
+
+        assert read_stats().get('events.upcoming') == 0
+        assert reconcile(fix=False) == {}
+
+
+def test_deletes_count_the_committed_values(application, add_event, now):
+    event_id = add_event('Talk', now + timedelta(days=1), tag='Career')
+
+    with application.app_context():
+        event = db.session.get(Event, event_id)
+        db.session.commit()
+        event.tag = 'Social'
+        db.session.commit()
+        db.session.delete(event)
+        db.session.commit()
+
+        counters = read_stats()
+        assert counters.get(f"{TAG_PREFIX}{tag_registry.cached_id('Career')}") == 0
+        assert counters.get(f"{TAG_PREFIX}{tag_registry.cached_id('Social')}") == 0
+        assert counters.get('events') == 0
+        assert reconcile(fix=False) == {}
+
+
+def test_reconcile_reports_and_fixes_drift(application, add_event, now):
+    add_event('Talk', now + timedelta(days=1))
+
+    with application.app_context():
+        db.session.execute(db.delete(Event))  # Core: bypasses the hook
+        db.session.commit()
+
+        assert reconcile(fix=True)['events'] == (1, 0)
+        assert reconcile(fix=False) == {}
+
+
+def test_rolling_the_boundary_expires_upcoming(application, add_event, now):
+    add_event('Soon', now + timedelta(minutes=1))
+
+    with application.app_context():
+        assert roll_upcoming_boundary(now + timedelta(minutes=2)) == 1
+        assert read_stats()['events.upcoming'] == 0
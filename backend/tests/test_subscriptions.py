@@ -0,0 +1,83 @@
+"""Users and their tag subscriptions"""
+import pytest
+
+
+@pytest.fixture
+def user_id(client):
+    response = client.post('/api/users', json={'email': 'student@example.com', 'name': 'Student'})
+    assert response.status_code == 201
+    return response.get_json()['id']
+
+
+def subscribed(client, user_id):
+    data = client.get(f'/api/users/{user_id}/subscriptions').get_json()
+    return sorted(sub['tag'] for sub in data['subscriptions'])
+
+
+def test_put_replaces_the_whole_set(client, user_id):
+    client.post(f'/api/users/{user_id}/subscriptions', json={'tag': 'Career'})
+    client.post(f'/api/users/{user_id}/subscriptions', json={'tag': 'Social'})
+
+    response = client.put(f'/api/users/{user_id}/subscriptions',
+                          json={'tags': ['social', 'Deadline']})
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['added'] == ['Deadline']
+    assert data['removed'] == ['Career']
+    assert subscribed(client, user_id) == ['Deadline', 'Social']
+
+
+def test_put_is_idempotent(client, user_id):
+    client.put(f'/api/users/{user_id}/subscriptions', json={'tags': ['Career']})
+    data = client.put(f'/api/users/{user_id}/subscriptions', json={'tags': ['Career']}).get_json()
+
+    assert data['added'] == data['removed'] == []
+    assert subscribed(client, user_id) == ['Career']
+
+
+def test_put_rejects_unknown_tags_without_writing(client, user_id):
+    client.put(f'/api/users/{user_id}/subscriptions', json={'tags': ['Career']})
+
+    response = client.put(f'/api/users/{user_id}/subscriptions', json={'tags': ['Social', 'Nope']})
+
+    assert response.status_code == 400
+    assert 'Nope' in response.get_json()['error']
+    assert subscribed(client, user_id) == ['Career']
+
+
+def test_put_validates_body_and_user(client, user_id):
+    assert client.put(f'/api/users/{user_id}/subscriptions', json={'tags': 'Career'}).status_code == 400
+    assert client.put('/api/users/999/subscriptions', json={'tags': []}).status_code == 404
+
+
+def test_duplicate_subscription_and_user(client, user_id):
+    client.post(f'/api/users/{user_id}/subscriptions', json={'tag': 'Career'})
+
+    assert client.post(f'/api/users/{user_id}/subscriptions', json={'tag': 'Career'}).status_code == 400
+    assert client.post('/api/users', json={'email': 'student@example.com'}).status_code == 400
+
+
+def get_feed(client, user_id, etag=None):
+    """GET the user's feed, reading the streamed body so the request ends."""
+    headers = {'If-None-Match': etag} if etag else {}
+    response = client.get(f'/api/users/{user_id}/events.ics', headers=headers)
+    response.get_data()
+    return response
+
+
+def test_put_changes_the_feed_etag(client, user_id):
+    client.put(f'/api/users/{user_id}/subscriptions', json={'tags': ['Social']})
+    etag = get_feed(client, user_id).headers['ETag']
+    assert get_feed(client, user_id, etag).status_code == 304
+
+    client.put(f'/api/users/{user_id}/subscriptions', json={'tags': ['Career']})
+
+    response = get_feed(client, user_id, etag)
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+    # Nothing changed, nothing to revalidate
+    etag = response.headers['ETag']
+    client.put(f'/api/users/{user_id}/subscriptions', json={'tags': ['Career']})
+    assert get_feed(client, user_id, etag).status_code == 304
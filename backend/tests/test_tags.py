@@ -0,0 +1,62 @@
+"""Tag dictionary and registry lookups"""
+from datetime import timedelta
+
+from models import db, Subscription, Tag
+from utils.tags import DEFAULT_TAGS, tag_registry
+
+
+def test_prepare_database_seeds_the_default_tags(application):
+    with application.app_context():
+        assert db.session.query(Tag).count() == len(DEFAULT_TAGS)
+
+
+def test_ids_read_by_requests_are_stored(client, application):
+    client.get('/api/tags')
+    user_id = client.post('/api/users', json={'email': 'student@example.com'}).get_json()['id']
+    assert client.put(f'/api/users/{user_id}/subscriptions',
+                      json={'tags': ['Career']}).status_code == 200
+
+    with application.app_context():
+        assert db.session.get(Tag, tag_registry.id_for('Career', create=False)).name == 'Career'
+        assert db.session.query(Subscription.tag_id).scalar() == tag_registry.cached_id('Career')
+
+
+def test_filters_by_tag_and_alias(client, add_event, now):
+    career = add_event('Fair', now + timedelta(days=1), tag='Career')
+    add_event('Mixer', now + timedelta(days=1), tag='Social')
+
+    for tag in ('Career', 'career', 'jobs'):
+        events = client.get(f'/api/events?tag={tag}').get_json()['events']
+        assert [event['id'] for event in events] == [career]
+
+    assert client.get('/api/events?tag=Nonexistent').get_json()['events'] == []
+
+
+def test_uncommitted_tags_are_forgotten(application):
+    with application.app_context():
+        assert tag_registry.id_for('Brand new') is not None
+        # The app context ends without a commit
+
+    with application.app_context():
+        assert tag_registry.id_for('Brand new', create=False) is None
+
+
+def test_unknown_names_reload_once_per_generation(application, monkeypatch):
+    loads = []
+    load = tag_registry.load
+    monkeypatch.setattr(tag_registry, 'load', lambda: loads.append(1) or load())
+
+    with application.test_request_context():
+        tag_registry.all()
+        loads.clear()
+        assert tag_registry.id_for('Nope', create=False) is None
+        assert tag_registry.id_for('Nope', create=False) is None
+        assert tag_registry.ids_for(['Nope', 'Career']) == [tag_registry.cached_id('Career')]
+    assert len(loads) == 1
+
+    with application.test_request_context():
+        db.session.add(Tag(name='Nope'))
+        db.session.commit()
+
+    with application.test_request_context():
+        assert tag_registry.id_for('Nope', create=False) is not None
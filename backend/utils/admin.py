@@ -0,0 +1,26 @@
+"""
+Access control for admin endpoints.
+
+Admin endpoints are disabled (404) unless ADMIN_TOKEN is set; requests
+must then send it as `Authorization: Bearer <token>`.
+"""
+import hmac
+import os
+from functools import wraps
+
+from flask import abort, request
+
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+
+
+def admin_required(view):
+    """Reject requests without the admin token."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            abort(404)
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(token.strip(), ADMIN_TOKEN):
+            abort(401)
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,179 @@
+"""
+In-process response cache for event queries.
+
+Entries are keyed on the endpoint, its normalized filters, the events
+listings generation (see utils.generation) and a bucketed "now", so every request in the same minute with
+the same filters shares one cached body. Concurrent misses for the same
+key are collapsed into a single DB query (single-flight).
+
+Invalidation needs no messaging between gunicorn workers: ingestion bumps
+the generation in the database, each worker sees the new value on its
+next request, drops its entries and re-warms the filters that were hot
+before the bump in a background thread.
+"""
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Hashable, List, Tuple
+
+from flask import current_app, g, has_request_context
+
+NOW_BUCKET_SECONDS = 60
+
+
+def now_bucket() -> int:
+    """Index of the current time bucket, pinned for the whole request."""
+    if has_request_context():
+        if 'now_bucket' not in g:
+            g.now_bucket = int(time.time() // NOW_BUCKET_SECONDS)
+        return g.now_bucket
+    return int(time.time() // NOW_BUCKET_SECONDS)
+
+
+def bucketed_now() -> datetime:
+    """The current UTC time rounded down to the bucket boundary."""
+    return datetime.utcfromtimestamp(now_bucket() * NOW_BUCKET_SECONDS)
+
+
+class _Flight:
+    """A load in progress that other requests for the same key wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache with single-flight loading.
+
+    Loaders are registered by name so hot keys can be recomputed outside
+    of a request when the generation changes.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 120, warm_limit: int = 16):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.warm_limit = warm_limit
+        self.generation = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._popularity = Counter()  # (name, params) -> requests this generation
+        self._loaders: Dict[str, Callable] = {}
+        self._defaults: List[Tuple[str, Tuple]] = []
+        self._lock = threading.Lock()
+
+    def loader(self, name: str):
+        """Register the function that computes values for `name`."""
+        def decorator(fn):
+            self._loaders[name] = fn
+            return fn
+        return decorator
+
+    def warm_by_default(self, name: str, params: Tuple):
+        """Always re-warm (name, params) after a generation change."""
+        self._defaults.append((name, params))
+
+    def get(self, name: str, params: Tuple, generation: int):
+        """
+        Return the cached value for (name, params), loading it on a miss.
+
+        Args:
+            name: Registered loader name
+            params: Normalized, hashable filter tuple passed to the loader
+            generation: Current listings generation
+        """
+        self._observe_generation(generation)
+        key = (name, params, generation, now_bucket())
+
+        with self._lock:
+            self._popularity[(name, params)] += 1
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = self._loaders[name](*params)
+            self._store(key, flight.value)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def clear(self):
+        """Drop every cached entry."""
+        with self._lock:
+            self._entries.clear()
+            self._popularity.clear()
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _observe_generation(self, generation: int):
+        """
+        Invalidate and re-warm when ingestion has bumped the generation.
+
+        Only a newer generation invalidates: a request that read the
+        counter just before a bump must not clear what newer ones cached.
+        """
+        with self._lock:
+            if self.generation is not None and generation <= self.generation:
+                return
+            first_seen = self.generation is None
+            self.generation = generation
+            hot = list(self._defaults)
+            for key, _ in self._popularity.most_common(self.warm_limit):
+                if key not in hot:
+                    hot.append(key)
+            self._entries.clear()
+            self._popularity.clear()
+
+        if not first_seen and has_request_context():
+            app = current_app._get_current_object()
+            threading.Thread(
+                target=self._warm, args=(app, hot, generation), daemon=True
+            ).start()
+
+    def _warm(self, app, keys, generation: int):
+        """Recompute previously hot keys for a new generation."""
+        with app.app_context():
+            for name, params in keys:
+                if self.generation != generation:
+                    return
+                try:
+                    self.get(name, params, generation)
+                except Exception as e:
+                    print(f"Cache warm failed for {name}{params}: {e}")
+
+
+response_cache = ResponseCache(
+    maxsize=int(os.getenv('RESPONSE_CACHE_SIZE', 256)),
+    ttl=float(os.getenv('RESPONSE_CACHE_TTL', 120))
+)
@@ -0,0 +1,289 @@
+"""
+Per-day event counts for calendar views.
+
+GET /api/events/calendar returns, for each day of a range in the
+client's timezone, how many events start on it per tag and optionally
+the first few titles, so a month view never downloads the month's
+events. The payload grows with the days and tags in the range, not with
+the events in it.
+
+Stored times are read as UTC, as the listing windows read them. A local
+day is a fixed offset away from UTC except across DST changes, so the
+range is split into spans of constant offset and each span is counted
+with one query grouped by date(start_time + offset), a range seek on the
+covering (start_time, tag_id) index. Titles come from one statement of
+per-day LIMIT subqueries, each a seek on the day's UTC bounds.
+
+Recurring series (see utils.recurrence) count once per occurrence: their
+rows are taken out of the SQL counts and their occurrences added.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pytz
+from sqlalchemy import false, func, literal, select, union_all
+
+from models import db, Event
+from utils.generation import current_generation
+from utils.recurrence import occurrence_id, series_cache
+from utils.tags import tag_registry
+
+# Longest range one request may ask for (a month view with leading and
+# trailing weeks is 42 days)
+MAX_CALENDAR_DAYS = 92
+
+# Most titles returned per day
+MAX_CALENDAR_TITLES = 10
+
+DAY = timedelta(days=1)
+MINUTE = timedelta(minutes=1)
+
+
+class InvalidCalendarRange(ValueError):
+    """Raised when the from / to / tz parameters are malformed"""
+
+
+def parse_calendar_range(
+    start: Optional[str],
+    end: Optional[str],
+    tz_name: Optional[str],
+    now: datetime
+) -> Tuple[date, date, str]:
+    """
+    Resolve the `from` / `to` / `tz` request parameters.
+
+    Args:
+        start: First day, YYYY-MM-DD (default: first day of the current month)
+        end: Last day, inclusive (default: last day of the month `start` is in)
+        tz_name: IANA timezone the days are in (default: UTC)
+        now: Current UTC time, naive
+
+    Returns:
+        (first day, last day, canonical timezone name)
+
+    Raises:
+        InvalidCalendarRange: If a date or the timezone is unknown, or the
+            range is empty or longer than MAX_CALENDAR_DAYS
+    """
+    try:
+        tz = pytz.timezone(tz_name or 'UTC')
+    except pytz.UnknownTimeZoneError:
+        raise InvalidCalendarRange(f'Unknown timezone: {tz_name}')
+
+    try:
+        if start:
+            first = date.fromisoformat(start)
+        else:
+            first = pytz.utc.localize(now).astimezone(tz).date().replace(day=1)
+        if end:
+            last = date.fromisoformat(end)
+        else:
+            next_month = (first.replace(day=1) + timedelta(days=32)).replace(day=1)
+            last = next_month - DAY
+    except ValueError:
+        raise InvalidCalendarRange('from and to must be dates (YYYY-MM-DD)')
+
+    if last < first:
+        raise InvalidCalendarRange('to must not be before from')
+    if (last - first).days + 1 > MAX_CALENDAR_DAYS:
+        raise InvalidCalendarRange(f'At most {MAX_CALENDAR_DAYS} days per request')
+    return first, last, tz.zone
+
+
+def day_start_utc(tz, day: date) -> datetime:
+    """Naive UTC time of local midnight starting `day`"""
+    return tz.localize(datetime.combine(day, time())).astimezone(pytz.utc).replace(tzinfo=None)
+
+
+def utc_offset(tz, moment: datetime) -> int:
+    """Minutes `tz` is ahead of UTC at naive UTC `moment`"""
+    return pytz.utc.localize(moment).astimezone(tz).utcoffset() // MINUTE
+
+
+def local_date(tz, moment: datetime) -> str:
+    return pytz.utc.localize(moment).astimezone(tz).date().isoformat()
+
+
+def offset_spans(tz, start: datetime, end: datetime) -> List[Tuple[datetime, datetime, int]]:
+    """
+    Split [start, end) (naive UTC) into spans of constant UTC offset.
+
+    Offsets are probed a day apart and each change is then located by
+    bisection to the minute (zone transitions fall on whole minutes).
+
+    Returns:
+        (span start, span end, offset in minutes) tuples covering the range
+    """
+    spans = []
+    while start < end:
+        offset = utc_offset(tz, start)
+        probe = start
+        while True:
+            ahead = min(probe + DAY, end - MINUTE)
+            if ahead <= probe or utc_offset(tz, ahead) != offset:
+                break
+            probe = ahead
+        if ahead <= probe:
+            spans.append((start, end, offset))
+            break
+
+        # The offset is unchanged at probe and changed at ahead
+        lo, hi = probe, ahead
+        while hi - lo > MINUTE:
+            middle = lo + (hi - lo) // MINUTE // 2 * MINUTE
+            if utc_offset(tz, middle) == offset:
+                lo = middle
+            else:
+                hi = middle
+        spans.append((start, hi, offset))
+        start = hi
+    return spans
+
+
+def _local_day(offset: int):
+    """SQL expression for the date of start_time shifted by `offset` minutes"""
+    if db.engine.dialect.name == 'sqlite':
+        return func.date(Event.start_time, f'{offset:+d} minutes')
+    return func.date(Event.start_time + timedelta(minutes=offset))
+
+
+def _filtered(query, tag_id: Optional[int], source_id: Optional[int]):
+    if tag_id is not None:
+        query = query.where(Event.tag_id == tag_id if tag_id else false())
+    if source_id:
+        query = query.where(Event.source_id == source_id)
+    return query
+
+
+def count_query(start: datetime, end: datetime, offset: int,
+                tag_id: Optional[int] = None, source_id: Optional[int] = None):
+    """(local date, tag_id, count) of the events starting in [start, end)"""
+    day = _local_day(offset).label('day')
+    query = select(day, Event.tag_id, func.count().label('count')).where(
+        Event.start_time >= start, Event.start_time < end
+    )
+    return _filtered(query, tag_id, source_id).group_by(day, Event.tag_id)
+
+
+def titles_query(bounds: List[Tuple[datetime, datetime]], limit: int,
+                 tag_id: Optional[int] = None, source_id: Optional[int] = None):
+    """(day number, id, title, start_time, tag_id) of the first `limit` events of each day"""
+    days = []
+    for number, (start, end) in enumerate(bounds):
+        query = select(
+            literal(number).label('day'),
+            Event.id, Event.title, Event.start_time, Event.tag_id
+        ).where(
+            Event.start_time >= start, Event.start_time < end, Event.recurrence.is_(None)
+        )
+        query = _filtered(query, tag_id, source_id)
+        query = query.order_by(Event.start_time, Event.id).limit(limit)
+        # Wrapped, since SQLite rejects LIMIT on the arms of a compound select
+        days.append(select(query.subquery()))
+    return union_all(*days)
+
+
+def calendar_payload(
+    first: date,
+    last: date,
+    tz_name: str,
+    titles: int = 0,
+    tag: Optional[str] = None,
+    source_id: Optional[int] = None
+) -> Dict:
+    """
+    Per-day counts of the events starting between `first` and `last`.
+
+    Args:
+        first: First local day
+        last: Last local day, inclusive
+        tz_name: Timezone the days are in
+        titles: Titles to include per day (0: none)
+        tag: Count only this tag
+        source_id: Count only this source
+
+    Returns:
+        Calendar dictionary for API responses; days without events are left out
+    """
+    tz = pytz.timezone(tz_name)
+    tag_id = (tag_registry.id_for(tag, create=False) or 0) if tag else None
+    days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+    bounds = [(day_start_utc(tz, day), day_start_utc(tz, day + DAY)) for day in days]
+    start, end = bounds[0][0], bounds[-1][1]
+
+    connection = db.session.connection()
+    counts = defaultdict(lambda: defaultdict(int))  # date -> tag_id -> count
+    for span_start, span_end, offset in offset_spans(tz, start, end):
+        query = count_query(span_start, span_end, offset, tag_id, source_id)
+        for day, event_tag_id, count in connection.execute(query):
+            day = day if isinstance(day, str) else day.isoformat()
+            counts[day][event_tag_id] += count
+
+    # date -> ((start_time, id) position, id, title, tag_id)
+    firsts = defaultdict(list)
+    if titles:
+        for number, event_id, title, start_time, event_tag_id in connection.execute(
+            titles_query(bounds, titles, tag_id, source_id)
+        ):
+            firsts[days[number].isoformat()].append(
+                ((start_time, event_id), event_id, title, event_tag_id)
+            )
+
+    # Series rows were counted at their first occurrence; count occurrences instead
+    series_list = series_cache.current(current_generation())
+    if series_list:
+        for series in series_list:
+            series_start = series.values['start_time']
+            if start <= series_start < end and series.matches(tag_id, None, source_id):
+                counts[local_date(tz, series_start)][series.tag_id] -= 1
+        for occurrence, series_id, series in series_cache.occurrences(start, end):
+            if occurrence >= end:
+                break
+            if occurrence < start or not series.matches(tag_id, None, source_id):
+                continue
+            day = local_date(tz, occurrence)
+            counts[day][series.tag_id] += 1
+            if titles:
+                firsts[day].append((
+                    (occurrence, series_id), occurrence_id(series_id, occurrence),
+                    series.values['title'], series.tag_id
+                ))
+
+    calendar = []
+    for day in days:
+        day = day.isoformat()
+        by_tag = {event_tag_id: count for event_tag_id, count in counts[day].items() if count}
+        if not by_tag:
+            continue
+        entry = {
+            'date': day,
+            'count': sum(by_tag.values()),
+            'tags': {
+                tag_registry.name_for(event_tag_id): count
+                for event_tag_id, count in sorted(by_tag.items(), key=lambda item: item[0] or 0)
+                if event_tag_id is not None
+            },
+        }
+        if titles:
+            first_titles = sorted(firsts[day], key=lambda item: item[0])[:titles]
+            entry['titles'] = [{
+                'id': event_id,
+                'title': title,
+                'start_time': position[0].isoformat(),
+                'tag': tag_registry.name_for(event_tag_id),
+            } for position, event_id, title, event_tag_id in first_titles]
+        calendar.append(entry)
+
+    return {
+        'from': first.isoformat(),
+        'to': last.isoformat(),
+        'tz': tz_name,
+        'count': sum(entry['count'] for entry in calendar),
+        'days': calendar,
+        'filters': {
+            'tag': tag,
+            'source_id': source_id,
+            'titles': titles
+        }
+    }
@@ -0,0 +1,98 @@
+"""
+Negotiated gzip / brotli compression for JSON responses.
+
+Bodies served from the response cache are wrapped in ResponseBody, which
+keeps each encoding it has produced, so a cached listing is compressed
+once per cache entry and every later hit sends the stored bytes. Other
+JSON responses are compressed on the fly by compress_response(), an
+after_request hook. Bodies below COMPRESS_MIN_SIZE are sent as is.
+
+Brotli is optional; without the package only gzip is offered.
+"""
+import gzip
+import os
+import threading
+from typing import Callable, Dict, Optional
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _encoders() -> Dict[str, Callable]:
+    encoders = {}
+    if brotli is not None:
+        encoders['br'] = lambda data: brotli.compress(data, quality=BROTLI_QUALITY)
+    encoders['gzip'] = lambda data: gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    return encoders
+
+
+# In order of preference
+ENCODERS = _encoders()
+
+
+def negotiate_encoding(size: int) -> Optional[str]:
+    """Pick the encoding for a body of `size` bytes from Accept-Encoding."""
+    if size < COMPRESS_MIN_SIZE:
+        return None
+    return request.accept_encodings.best_match(list(ENCODERS))
+
+
+class ResponseBody:
+    """A serialized response body plus its compressed variants"""
+
+    def __init__(self, text: str, mimetype: str = 'application/json'):
+        self.data = text.encode('utf-8')
+        self.mimetype = mimetype
+        self._encoded: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: str) -> bytes:
+        """Return the body in `encoding`, compressing it on first use."""
+        data = self._encoded.get(encoding)
+        if data is None:
+            with self._lock:
+                data = self._encoded.get(encoding)
+                if data is None:
+                    data = self._encoded[encoding] = ENCODERS[encoding](self.data)
+        return data
+
+    def to_response(self):
+        """Build a response, using a stored compressed variant if accepted."""
+        encoding = negotiate_encoding(len(self.data))
+        data = self.encoded(encoding) if encoding else self.data
+
+        response = current_app.response_class(data, mimetype=self.mimetype)
+        if len(self.data) >= COMPRESS_MIN_SIZE:
+            response.vary.add('Accept-Encoding')
+        if encoding:
+            response.content_encoding = encoding
+        return response
+
+
+def compress_response(response):
+    """after_request hook compressing JSON responses built per request."""
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or response.content_encoding
+            or not response.is_json):
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(len(data))
+    if encoding:
+        response.set_data(ENCODERS[encoding](data))
+        response.content_encoding = encoding
+    return response
@@ -5,6 +5,8 @@ import hashlib
 from datetime import datetime
 from typing import Dict, Optional
 
+from utils.tags import tag_registry
+
 
 def generate_fingerprint(
     title: str,
@@ -49,7 +51,9 @@ def normalize_event_data(raw_data: Dict) -> Dict:
         'tag': normalize_tag(raw_data.get('tag')),
         'rsvp_link': (raw_data.get('rsvp_link') or '').strip() or None,
         'why_matters': (raw_data.get('why_matters') or '').strip() or None,
-        'source_event_id': raw_data.get('source_event_id')
+        'source_event_id': raw_data.get('source_event_id'),
+        'recurrence': raw_data.get('recurrence'),
+        'recurrence_id': raw_data.get('recurrence_id')
     }
     
     # Generate fingerprint
@@ -67,28 +71,10 @@ def normalize_tag(tag: Optional[str]) -> Optional[str]:
     """
     Normalize tag to one of the standard values.
     
-    Standard tags: Required, Career, Capstone, Social, Deadline
+    Standard tags: Required, Career, Capstone, Social, Deadline. Aliases
+    come from the tags table (see utils.tags); unknown tags are title-cased.
     """
-    if not tag:
-        return None
-    
-    tag_lower = tag.lower().strip()
-    
-    tag_map = {
-        'required': 'Required',
-        'mandatory': 'Required',
-        'career': 'Career',
-        'jobs': 'Career',
-        'recruiting': 'Career',
-        'capstone': 'Capstone',
-        'thesis': 'Capstone',
-        'social': 'Social',
-        'community': 'Social',
-        'deadline': 'Deadline',
-        'due': 'Deadline',
-    }
-    
-    return tag_map.get(tag_lower, tag.title())
+    return tag_registry.canonical_name(tag)
 
 
 def is_duplicate(event1: Dict, event2: Dict) -> bool:
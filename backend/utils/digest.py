@@ -7,6 +7,8 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
 
+from utils.tags import tag_registry
+
 
 def send_digest_to_user(user, events, digest_type='08:00'):
     """
@@ -14,7 +16,7 @@ def send_digest_to_user(user, events, digest_type='08:00'):
     
     Args:
         user: User object
-        events: List of Event objects
+        events: List of event rows (see utils.event_queries)
         digest_type: '08:00' or '15:00'
         
     Returns:
@@ -75,7 +77,7 @@ def generate_digest_html(events, digest_type, user):
                     {event.tag}
                 </span>
                 <span style="color: #888; margin-left: 10px; font-size: 12px;">
-                    via {event.source.name}
+                    via {event.source_name}
                 </span>
             </p>
             {f'<p style="margin: 10px 0; font-style: italic;">{event.why_matters}</p>' if event.why_matters else ''}
@@ -121,7 +123,7 @@ def generate_digest_text(events, digest_type, user):
         if event.meeting_link:
             text += f"Meeting: {event.meeting_link}\n"
         
-        text += f"Tag: {event.tag} | Source: {event.source.name}\n"
+        text += f"Tag: {event.tag} | Source: {event.source_name}\n"
         
         if event.why_matters:
             text += f"\n{event.why_matters}\n"
@@ -135,14 +137,7 @@ def generate_digest_text(events, digest_type, user):
 
 def get_tag_color(tag):
     """Get color for event tag"""
-    colors = {
-        'Required': '#dc3545',
-        'Career': '#28a745',
-        'Capstone': '#007bff',
-        'Social': '#ffc107',
-        'Deadline': '#fd7e14'
-    }
-    return colors.get(tag, '#6c757d')
+    return tag_registry.color_for(tag)
 
 
 def send_email(to_email, subject, html_content, text_content):
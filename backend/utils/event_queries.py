@@ -0,0 +1,396 @@
+"""
+Read path for event listings.
+
+Events are fetched joined to their source in a single statement and
+serialized straight from result rows, so listing endpoints and digests
+never hydrate ORM instances or lazy-load ``Event.source`` per row.
+Callers can restrict a query to a subset of fields (see parse_fields), in
+which case the columns of the other fields are not read at all.
+"""
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import false, func, select, tuple_
+
+from models import db, Event, Source, Tag
+from utils.tags import tag_registry
+
+
+# API field name -> columns selected for it, in Event.to_dict() order.
+# Columns are labelled so rows can be read by attribute (row.title,
+# row.source_name, ...) like an Event would be.
+FIELD_COLUMNS = {
+    'id': (Event.id,),
+    'title': (Event.title,),
+    'description': (Event.description,),
+    'start_time': (Event.start_time,),
+    'end_time': (Event.end_time,),
+    'timezone': (Event.timezone,),
+    'location': (Event.location,),
+    'is_virtual': (Event.is_virtual,),
+    'meeting_link': (Event.meeting_link,),
+    'tag': (Tag.name.label('tag'),),
+    'rsvp_link': (Event.rsvp_link,),
+    'why_matters': (Event.why_matters,),
+    'source': (
+        Source.id.label('source_id'),
+        Source.name.label('source_name'),
+        Source.type.label('source_type'),
+    ),
+    'created_at': (Event.created_at,),
+    'updated_at': (Event.updated_at,),
+}
+
+EVENT_FIELDS = tuple(FIELD_COLUMNS)
+
+# Columns selected for full event rows
+EVENT_COLUMNS = tuple(column for columns in FIELD_COLUMNS.values() for column in columns)
+
+# Needed for ordering and cursors, so always selected
+REQUIRED_FIELDS = ('id', 'start_time')
+
+DATETIME_FIELDS = {'start_time', 'end_time', 'created_at', 'updated_at'}
+
+# Named presets for the `view` parameter. Compact leaves out the large
+# text columns (Telegram events store the whole message as description)
+VIEWS = {
+    'full': EVENT_FIELDS,
+    'compact': (
+        'id', 'title', 'start_time', 'end_time', 'timezone', 'location',
+        'is_virtual', 'meeting_link', 'tag', 'rsvp_link', 'source',
+    ),
+}
+
+
+# Rows fetched per round trip when streaming (see iter_event_rows)
+EXPORT_BATCH_SIZE = 500
+
+# Most ids resolved by one batch lookup (see fetch_events_by_id)
+MAX_BATCH_IDS = 500
+
+# Id of one occurrence of a recurring series (see utils.recurrence.occurrence_id)
+OCCURRENCE_ID = re.compile(r'\d+@\d{8}T\d{6}')
+
+
+class InvalidFields(ValueError):
+    """Raised when a fields or view parameter names something unknown"""
+
+
+class InvalidIds(ValueError):
+    """Raised when a batch lookup gets malformed or too many ids"""
+
+
+def parse_fields(fields: Optional[str] = None, view: Optional[str] = None) -> Tuple[str, ...]:
+    """
+    Resolve the `fields` / `view` request parameters to a field tuple.
+
+    Args:
+        fields: Comma-separated field names; takes precedence over view
+        view: Name of a preset in VIEWS (default: full)
+
+    Returns:
+        Field names in EVENT_FIELDS order, always including REQUIRED_FIELDS
+
+    Raises:
+        InvalidFields: If a field or the view is unknown
+    """
+    if fields:
+        names = {name.strip() for name in fields.split(',') if name.strip()}
+        unknown = names - set(EVENT_FIELDS)
+        if unknown:
+            raise InvalidFields(f"Unknown fields: {', '.join(sorted(unknown))}")
+    elif view:
+        if view not in VIEWS:
+            raise InvalidFields(f"Unknown view: {view}")
+        names = set(VIEWS[view])
+    else:
+        return EVENT_FIELDS
+
+    names.update(REQUIRED_FIELDS)
+    return tuple(name for name in EVENT_FIELDS if name in names)
+
+
+def parse_ids(ids) -> Tuple:
+    """
+    Resolve the ids of a batch lookup.
+
+    Args:
+        ids: Comma-separated string (query parameter) or list (JSON body)
+
+    Returns:
+        Distinct ids in request order: integers, and occurrence ids of
+        recurring events as strings
+
+    Raises:
+        InvalidIds: If an id is neither an integer nor an occurrence id,
+            none are given or there are more than MAX_BATCH_IDS
+    """
+    if isinstance(ids, str):
+        ids = [value.strip() for value in ids.split(',') if value.strip()]
+    if not isinstance(ids, list) or not ids:
+        raise InvalidIds('ids must be a non-empty list of event ids')
+
+    try:
+        # bool is an int subclass, but true is not an event id
+        parsed = [
+            value if isinstance(value, str) and OCCURRENCE_ID.fullmatch(value) else int(value)
+            for value in ids if not isinstance(value, (bool, float))
+        ]
+    except (TypeError, ValueError):
+        parsed = []
+    if len(parsed) != len(ids):
+        raise InvalidIds('ids must be event or occurrence ids')
+
+    parsed = tuple(dict.fromkeys(parsed))
+    if len(parsed) > MAX_BATCH_IDS:
+        raise InvalidIds(f'At most {MAX_BATCH_IDS} ids per request')
+    return parsed
+
+
+def select_events(fields: Tuple[str, ...] = EVENT_FIELDS):
+    """
+    Base SELECT of event columns, joined to their source and tag if needed.
+
+    Args:
+        fields: Fields to select (see FIELD_COLUMNS); columns of other
+            fields are never read
+    """
+    columns = [column for name in fields for column in FIELD_COLUMNS[name]]
+    query = select(*columns).select_from(Event)
+    if 'source' in fields:
+        query = query.outerjoin(Source, Event.source_id == Source.id)
+    if 'tag' in fields:
+        query = query.outerjoin(Tag, Event.tag_id == Tag.id)
+    return query
+
+
+def events_window_query(
+    start: datetime,
+    end: datetime,
+    tag: Optional[str] = None,
+    tag_ids: Optional[Iterable[int]] = None,
+    source_id: Optional[int] = None,
+    end_inclusive: bool = True,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: Optional[int] = None,
+    fields: Tuple[str, ...] = EVENT_FIELDS,
+    tag_id: Optional[int] = None,
+    overlapping: bool = False,
+    series: bool = True
+):
+    """
+    Build the query for events starting inside [start, end].
+
+    Args:
+        start: Window start (inclusive)
+        end: Window end
+        tag: Single tag filter, by name
+        tag_ids: Any-of tag filter, by id (used for subscriptions)
+        tag_id: Single tag filter, by an id the caller already resolved
+            (0, for an unknown tag, matches nothing)
+        source_id: Source filter
+        end_inclusive: Whether events starting exactly at `end` are included
+        after: Keyset position (start_time, id); only rows after it are returned
+        limit: Maximum number of rows
+        fields: Fields to select (see parse_fields)
+        overlapping: Also include events that started before `start` and
+            end at or after it (only the start_time bound can use an
+            index; see utils.interval_index for the fast path)
+        series: Include the rows of recurring series, at their first
+            occurrence (see utils.recurrence for their expansion)
+
+    Returns:
+        SQLAlchemy Select ordered by (start_time, id)
+    """
+    if overlapping:
+        query = select_events(fields).where(
+            func.coalesce(Event.end_time, Event.start_time) >= start
+        )
+    else:
+        query = select_events(fields).where(Event.start_time >= start)
+
+    if end_inclusive:
+        query = query.where(Event.start_time <= end)
+    else:
+        query = query.where(Event.start_time < end)
+
+    if tag:
+        tag_id = tag_registry.id_for(tag, create=False) or 0
+    if tag_id is not None:
+        query = query.where(Event.tag_id == tag_id if tag_id else false())
+
+    if not series:
+        query = query.where(Event.recurrence.is_(None))
+
+    if tag_ids:
+        # Compare `tag_id + 0` so the planner drives an any-of-tags filter
+        # from the start_time range: walking (tag_id, start_time) once per
+        # tag would need a temp B-tree to merge the runs back into order
+        query = query.where((Event.tag_id + 0).in_(list(tag_ids)))
+
+    if source_id:
+        query = query.where(Event.source_id == source_id)
+
+    if after:
+        query = query.where(tuple_(Event.start_time, Event.id) > tuple_(*after))
+
+    query = query.order_by(Event.start_time.asc(), Event.id.asc())
+
+    if limit:
+        query = query.limit(limit)
+
+    return query
+
+
+def fetch_event_rows(query) -> List:
+    """
+    Execute an event query and return its rows.
+
+    Runs on the session's connection rather than through the ORM so rows
+    come back as plain Core rows with no entity loading.
+    """
+    return db.session.connection().execute(query).all()
+
+
+def serialize_event_row(row) -> Dict:
+    """
+    Convert an event row to the same dictionary shape as Event.to_dict().
+
+    Args:
+        row: Row selected with EVENT_COLUMNS
+
+    Returns:
+        Event dictionary for API responses
+    """
+    (event_id, title, description, start_time, end_time, timezone,
+     location, is_virtual, meeting_link, tag, rsvp_link, why_matters,
+     source_id, source_name, source_type, created_at, updated_at) = row
+
+    return {
+        'id': event_id,
+        'title': title,
+        'description': description,
+        'start_time': start_time.isoformat() if start_time else None,
+        'end_time': end_time.isoformat() if end_time else None,
+        'timezone': timezone,
+        'location': location,
+        'is_virtual': is_virtual,
+        'meeting_link': meeting_link,
+        'tag': tag,
+        'rsvp_link': rsvp_link,
+        'why_matters': why_matters,
+        'source': {
+            'id': source_id,
+            'name': source_name,
+            'type': source_type
+        } if source_id is not None else None,
+        'created_at': created_at.isoformat() if created_at else None,
+        'updated_at': updated_at.isoformat() if updated_at else None
+    }
+
+
+@lru_cache(maxsize=64)
+def serializer_for(fields: Tuple[str, ...]) -> Callable:
+    """
+    Return a function converting rows selected for `fields` to dictionaries.
+
+    Full rows use serialize_event_row(); sparse ones get the same keys and
+    formatting, limited to the selected fields.
+    """
+    if fields == EVENT_FIELDS:
+        return serialize_event_row
+
+    def serialize(row) -> Dict:
+        values = iter(row)
+        event = {}
+        for name in fields:
+            if name == 'source':
+                source_id, source_name, source_type = next(values), next(values), next(values)
+                event['source'] = {
+                    'id': source_id,
+                    'name': source_name,
+                    'type': source_type
+                } if source_id is not None else None
+            elif name in DATETIME_FIELDS:
+                value = next(values)
+                event[name] = value.isoformat() if value else None
+            else:
+                event[name] = next(values)
+        return event
+
+    return serialize
+
+
+def iter_event_rows(query, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List]:
+    """
+    Stream an event query, yielding its rows in batches.
+
+    Rows are pulled from the cursor `batch_size` at a time, so memory use
+    stays flat however many rows the query returns.
+    """
+    result = db.session.connection().execute(
+        query.execution_options(yield_per=batch_size)
+    )
+    yield from result.partitions()
+
+
+def iter_event_batches(
+    query,
+    fields: Tuple[str, ...] = EVENT_FIELDS,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[List[Dict]]:
+    """Stream an event query, yielding serialized events in batches."""
+    serialize = serializer_for(fields)
+    for rows in iter_event_rows(query, batch_size):
+        yield [serialize(row) for row in rows]
+
+
+def fetch_events_by_id(
+    ids: Tuple,
+    fields: Tuple[str, ...] = EVENT_FIELDS
+) -> Tuple[List[Dict], List]:
+    """
+    Look up many events in one primary key query.
+
+    Args:
+        ids: Event and occurrence ids (see parse_ids)
+        fields: Fields to return (see parse_fields)
+
+    Returns:
+        (events in the order of `ids`, ids with no event)
+    """
+    event_ids = [value for value in ids if isinstance(value, int)]
+    rows = fetch_event_rows_by_id(event_ids, fields) if event_ids else []
+    if len(event_ids) < len(ids):
+        # utils.recurrence builds on this module
+        from utils.recurrence import fetch_occurrence_rows_by_id
+        rows += fetch_occurrence_rows_by_id(
+            [value for value in ids if isinstance(value, str)], fields
+        )
+
+    serialize = serializer_for(fields)
+    found = {row.id: row for row in rows}
+    events = [serialize(found[value]) for value in ids if value in found]
+    missing = [value for value in ids if value not in found]
+    return events, missing
+
+
+def fetch_event_rows_by_id(
+    ids: Sequence[int],
+    fields: Tuple[str, ...] = EVENT_FIELDS
+) -> List:
+    """Rows of the events with `ids`, in the order of `ids` (unknown ids skipped)."""
+    found = {}
+    for offset in range(0, len(ids), MAX_BATCH_IDS):
+        chunk = list(ids[offset:offset + MAX_BATCH_IDS])
+        for row in fetch_event_rows(select_events(fields).where(Event.id.in_(chunk))):
+            found[row.id] = row
+    return [found[event_id] for event_id in ids if event_id in found]
+
+
+def fetch_event_dicts(query, fields: Tuple[str, ...] = EVENT_FIELDS) -> List[Dict]:
+    """Execute an event query selecting `fields` and serialize every row."""
+    serialize = serializer_for(fields)
+    return [serialize(row) for row in fetch_event_rows(query)]
@@ -0,0 +1,108 @@
+"""
+Data generation counter.
+
+Every write to events, sources, tags, users or subscriptions bumps a
+monotonically increasing "events generation" in the same transaction as
+the write. Read endpoints derive ETags from it, so clients can revalidate
+with a single primary key lookup instead of re-running the event queries.
+
+Narrower counters follow a subset of those tables, for state that only
+depends on them: the "event_rows" generation only moves when event rows
+do, so the in-memory indexes over events (see utils.interval_index and
+utils.recurrence) are not re-checked after every user signup, and the
+"listings" generation keys the response cache (see utils.cache), whose
+bodies only hold events with their sources and tags.
+"""
+from datetime import datetime
+from typing import Optional, Tuple
+
+from flask import g, has_request_context
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+
+from models import db, DataGeneration, Event, Source, Subscription, Tag, User
+
+EVENTS_GENERATION = 'events'
+EVENT_ROWS_GENERATION = 'event_rows'
+LISTINGS_GENERATION = 'listings'
+
+# Generation -> models whose writes bump it. The events generation covers
+# everything the read endpoints return
+TRACKED_MODELS = {
+    EVENTS_GENERATION: (Event, Source, Subscription, Tag, User),
+    EVENT_ROWS_GENERATION: (Event,),
+    LISTINGS_GENERATION: (Event, Source, Tag),
+}
+
+
+def get_generation_state(name: str = EVENTS_GENERATION) -> Tuple[int, Optional[datetime]]:
+    """Return the value of a generation counter and when it last changed."""
+    row = db.session.execute(
+        select(DataGeneration.value, DataGeneration.updated_at)
+        .where(DataGeneration.name == name)
+    ).first()
+    return (row.value or 0, row.updated_at) if row else (0, None)
+
+
+def get_generation(name: str = EVENTS_GENERATION) -> int:
+    """Return the current value of a generation counter."""
+    return get_generation_state(name)[0]
+
+
+def current_generation(name: str = EVENTS_GENERATION) -> int:
+    """Return a generation counter, read at most once per request."""
+    return current_generation_state(name)[0]
+
+
+def current_generation_state(name: str = EVENTS_GENERATION) -> Tuple[int, Optional[datetime]]:
+    """Return a generation counter and its last change, read once per request."""
+    if not has_request_context():
+        return get_generation_state(name)
+    if 'generation_states' not in g:
+        g.generation_states = {}
+    if name not in g.generation_states:
+        g.generation_states[name] = get_generation_state(name)
+    return g.generation_states[name]
+
+
+def bump_generation(connection, name: str = EVENTS_GENERATION):
+    """
+    Increment a generation counter on the given connection.
+
+    Runs inside the caller's transaction, so the bump commits or rolls back
+    together with the write that caused it.
+    """
+    now = datetime.utcnow()
+    result = connection.execute(
+        update(DataGeneration)
+        .where(DataGeneration.name == name)
+        .values(value=DataGeneration.value + 1, updated_at=now)
+    )
+    if result.rowcount == 0:
+        connection.execute(
+            insert(DataGeneration).values(name=name, value=1, updated_at=now)
+        )
+
+
+def _changed_models(session) -> set:
+    """Classes of the objects a flush inserted, updated or deleted."""
+    changed = {type(obj) for obj in session.new}
+    changed.update(type(obj) for obj in session.deleted)
+    changed.update(type(obj) for obj in session.dirty if session.is_modified(obj))
+    return changed
+
+
+def _after_flush(session, flush_context):
+    # new/dirty/deleted still reflect the pre-flush state at this point
+    changed = _changed_models(session)
+    if not changed:
+        return
+    for name, models in TRACKED_MODELS.items():
+        if any(issubclass(model, models) for model in changed):
+            bump_generation(session.connection(), name)
+
+
+def track_generation_writes():
+    """Register the session hook that bumps the generation on writes."""
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
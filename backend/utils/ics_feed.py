@@ -0,0 +1,170 @@
+"""
+Subscribable iCalendar feeds.
+
+Feeds are streamed: the VCALENDAR header goes out first, then VEVENTs
+batch by batch from a server-side cursor. Each VEVENT is serialized once
+(with ingestion.ics_parser.build_vevent) and cached under its event id and
+updated_at, so an edited event gets a fresh entry while unchanged ones are
+reused across requests and users.
+
+Recurring series go out once, with their RRULE / RDATE / EXDATE lines, for
+calendar clients to expand; occurrences replaced by overrides are
+excluded, since the overrides are events of their own. A series is in the
+feed while it has an occurrence in the window, however long ago it
+started.
+"""
+import os
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from icalendar import Calendar, vDuration
+
+from ingestion.ics_parser import build_vevent, RECURRENCE_TIME_FORMAT
+from utils.cache import bucketed_now
+from utils.event_queries import events_window_query, iter_event_rows
+from utils.generation import current_generation
+from utils.recurrence import series_cache, Series
+from utils.tags import tag_registry
+
+# Window served relative to the current UTC day
+FEED_PAST_DAYS = 30
+FEED_FUTURE_DAYS = 180
+
+# Polling interval suggested to calendar clients
+REFRESH_INTERVAL = timedelta(hours=1)
+
+ICS_FIELDS = (
+    'id', 'title', 'description', 'start_time', 'end_time', 'timezone',
+    'location', 'meeting_link', 'tag', 'rsvp_link', 'updated_at',
+)
+
+_END = b'END:VCALENDAR\r\n'
+
+
+class VEventCache:
+    """LRU cache of serialized VEVENTs"""
+
+    def __init__(self, maxsize: int = 20000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def put(self, key: Hashable, data: bytes):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+vevent_cache = VEventCache(maxsize=int(os.getenv('ICS_CACHE_SIZE', 20000)))
+
+
+def feed_window() -> Tuple:
+    """(start, end) of the feed window, anchored on the current UTC day"""
+    today = bucketed_now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=FEED_PAST_DAYS), today + timedelta(days=FEED_FUTURE_DAYS)
+
+
+def feed_query(
+    tag: Optional[str] = None,
+    tag_ids: Optional[Iterable[int]] = None,
+    source_id: Optional[int] = None
+):
+    """Query for the one-off events in a feed (see feed_series for the rest)."""
+    start, end = feed_window()
+    return events_window_query(
+        start, end, tag=tag, tag_ids=tag_ids, source_id=source_id,
+        fields=ICS_FIELDS, series=False
+    )
+
+
+def feed_series(
+    tag: Optional[str] = None,
+    tag_ids: Optional[Iterable[int]] = None,
+    source_id: Optional[int] = None
+) -> List[Series]:
+    """Recurring series with an occurrence in the feed window, filtered like feed_query."""
+    start, end = feed_window()
+    tag_id = (tag_registry.id_for(tag, create=False) or 0) if tag else None
+    wanted_tags = set(tag_ids) if tag_ids else None
+    found = []
+    for series in series_cache.current(current_generation()):
+        if not series.matches(tag_id, wanted_tags, source_id):
+            continue
+        occurrence = series.rules.after(start - series.duration, inc=True)
+        if occurrence is not None and occurrence <= end:
+            found.append(series)
+    return found
+
+
+def vevent_bytes(row) -> bytes:
+    """Serialized VEVENT for a row selected with ICS_FIELDS."""
+    key = (row.id, row.updated_at)
+    data = vevent_cache.get(key)
+    if data is None:
+        vevent = build_vevent(
+            row._asdict(), uid=f'event-{row.id}@concierge', stamp=row.updated_at
+        )
+        data = vevent.to_ical()
+        vevent_cache.put(key, data)
+    return data
+
+
+def series_vevent_bytes(series: Series) -> bytes:
+    """Serialized VEVENT for a recurring series, minus its overridden occurrences."""
+    key = (series.id, series.values['updated_at'], tuple(series.overridden))
+    data = vevent_cache.get(key)
+    if data is None:
+        recurrence = series.recurrence
+        if series.overridden:
+            recurrence += '\nEXDATE:' + ','.join(
+                occurrence.strftime(RECURRENCE_TIME_FORMAT) for occurrence in series.overridden
+            )
+        vevent = build_vevent(
+            dict(series.values, recurrence=recurrence),
+            uid=f'event-{series.id}@concierge', stamp=series.values['updated_at']
+        )
+        data = vevent.to_ical()
+        vevent_cache.put(key, data)
+    return data
+
+
+def calendar_header(name: str) -> bytes:
+    """VCALENDAR properties, everything up to the first VEVENT."""
+    calendar = Calendar()
+    calendar.add('PRODID', '-//Concierge//Events//EN')
+    calendar.add('VERSION', '2.0')
+    calendar.add('CALSCALE', 'GREGORIAN')
+    calendar.add('METHOD', 'PUBLISH')
+    calendar.add('X-WR-CALNAME', name)
+    calendar.add('REFRESH-INTERVAL', vDuration(REFRESH_INTERVAL), parameters={'VALUE': 'DURATION'})
+    calendar.add('X-PUBLISHED-TTL', vDuration(REFRESH_INTERVAL))
+    return calendar.to_ical()[:-len(_END)]
+
+
+def generate_feed(
+    query,
+    name: str = 'Concierge',
+    series: Sequence[Series] = ()
+) -> Iterator[bytes]:
+    """Stream a VCALENDAR containing every event returned by `query`, then `series`."""
+    yield calendar_header(name)
+    for rows in iter_event_rows(query):
+        yield b''.join(vevent_bytes(row) for row in rows)
+    if series:
+        yield b''.join(series_vevent_bytes(item) for item in series)
+    yield _END
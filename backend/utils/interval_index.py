@@ -0,0 +1,430 @@
+"""
+In-memory interval index for time-window event queries.
+
+Listings, today's events and the digests all ask which events overlap a
+window [a, b], i.e. start <= b and end >= a, so multi-day events that
+began before the window are included. On SQL only the start_time bound
+can use an index; the end bound is checked row by row over every earlier
+event. This module keeps (start, end, tag_id, source_id, event_id) of
+all events in flat arrays and answers the question in O(log n + k):
+
+- events starting inside [a, b] are a contiguous run of the start-sorted
+  arrays, found by bisection
+- events that started before a and are still running at a are found with
+  a stabbing query on a centered interval tree, flattened into arrays:
+  each node keeps the intervals containing its center sorted by start and
+  by end, so a query walks O(log n) nodes and stops scanning each list at
+  the first interval that misses
+
+Only ids come out of the index; rows are then read by primary key (see
+fetch_window_rows). k counts the overlapping events before the tag /
+source filters are applied, so very selective filters scan the window.
+
+Memory per event: 8 bytes each for start, end and id, 4 each for tag and
+source id, 4 + 4 for its position in a node's start and end lists, plus
+at most one 24-byte tree node per event (in practice far fewer): 40 to
+64 bytes; bench_interval_index measures ~41 bytes, 2 MiB for 50k events. Times are stored as integer
+microseconds since the epoch, so comparisons are exact. Once patched, a
+sorted copy of the ids (8 bytes per event) answers membership tests.
+
+The index is built per process on first use and kept per event_rows
+generation (see utils.generation), which writes to users, subscriptions
+and the like leave alone. When it moves, rows whose updated_at is past
+the last load are read (a seek on the updated_at index) into a small
+second index, which queries merge with the full one while skipping its
+stale entries; past MAX_OVERLAY_ROWS the two are rebuilt as one. If the
+event count then disagrees (deletes, or rows written without updated_at)
+the index is reloaded.
+INTERVAL_INDEX=off sends window queries to SQL instead.
+
+Recurring series (rows with a `recurrence`) are not indexed; their
+occurrences in the window come from utils.recurrence and are merged in.
+"""
+import heapq
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+
+from models import db, Event
+from utils.event_queries import (
+    events_window_query, fetch_event_rows, fetch_event_rows_by_id, EVENT_FIELDS
+)
+from utils.generation import current_generation, EVENT_ROWS_GENERATION
+from utils.recurrence import fetch_occurrence_rows, row_position
+from utils.tags import tag_registry
+
+INTERVAL_INDEX = os.getenv('INTERVAL_INDEX', 'on').lower() not in ('0', 'off', 'false', 'no')
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+NO_TAG = -1
+
+# Rows changed since the last load above which patching is not worth it
+MAX_PATCH_ROWS = 5000
+
+# Patched rows kept beside the full index before it is rebuilt with them
+MAX_OVERLAY_ROWS = 1000
+
+# (id, start_time, end_time, tag_id, source_id)
+INDEX_COLUMNS = (Event.id, Event.start_time, Event.end_time, Event.tag_id, Event.source_id)
+
+# Recurring series are expanded per window instead (see utils.recurrence)
+INDEXED = Event.recurrence.is_(None)
+
+
+def to_micros(value: datetime) -> int:
+    return (value - EPOCH) // MICROSECOND
+
+
+class IntervalIndex:
+    """Immutable overlap index over event rows"""
+
+    def __init__(self, rows: Iterable[Tuple]):
+        """
+        Args:
+            rows: (id, start_time, end_time, tag_id, source_id) tuples;
+                a missing end_time means the event ends when it starts
+        """
+        entries = []
+        for event_id, start, end, tag_id, source_id in rows:
+            start_us = to_micros(start)
+            end_us = to_micros(end) if end else start_us
+            entries.append((start_us, event_id, max(end_us, start_us),
+                            NO_TAG if tag_id is None else tag_id, source_id or 0))
+        entries.sort()
+
+        # Position p describes one event; positions are in (start, id) order
+        self.starts = array('q', [entry[0] for entry in entries])
+        self.ids = array('q', [entry[1] for entry in entries])
+        self.ends = array('q', [entry[2] for entry in entries])
+        self.tag_ids = array('i', [entry[3] for entry in entries])
+        self.source_ids = array('i', [entry[4] for entry in entries])
+        self._sorted_ids = None  # For membership tests, sorted on first use
+
+        self.centers = array('q')
+        self.lefts = array('i')
+        self.rights = array('i')
+        self.slices = array('i')  # lo, hi per node into by_start / by_end
+        self.by_start = array('i')
+        self.by_end = array('i')
+        self.root = self._build(list(range(len(entries))))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _build(self, positions: List[int]) -> int:
+        """Add the subtree for `positions` (in start order); returns its node or -1."""
+        if not positions:
+            return -1
+        starts, ends = self.starts, self.ends
+        # The median start splits the rest in halves, and the interval it
+        # belongs to contains it, so every node holds at least one interval
+        center = starts[positions[len(positions) // 2]]
+        here, left, right = [], [], []
+        for position in positions:
+            if ends[position] < center:
+                left.append(position)
+            elif starts[position] > center:
+                right.append(position)
+            else:
+                here.append(position)
+
+        node = len(self.centers)
+        self.centers.append(center)
+        self.lefts.append(-1)
+        self.rights.append(-1)
+        self.slices.extend((len(self.by_start), len(self.by_start) + len(here)))
+        self.by_start.extend(here)
+        self.by_end.extend(sorted(here, key=lambda position: -ends[position]))
+
+        self.lefts[node] = self._build(left)
+        self.rights[node] = self._build(right)
+        return node
+
+    def _stab(self, point: int) -> List[int]:
+        """Positions of the intervals with start <= point <= end."""
+        found = []
+        starts, ends, by_start, by_end = self.starts, self.ends, self.by_start, self.by_end
+        node = self.root
+        while node != -1:
+            center = self.centers[node]
+            lo, hi = self.slices[2 * node], self.slices[2 * node + 1]
+            if point < center:
+                for i in range(lo, hi):
+                    if starts[by_start[i]] > point:
+                        break
+                    found.append(by_start[i])
+                node = self.lefts[node]
+            elif point > center:
+                for i in range(lo, hi):
+                    if ends[by_end[i]] < point:
+                        break
+                    found.append(by_end[i])
+                node = self.rights[node]
+            else:
+                found.extend(by_start[lo:hi])
+                break
+        return found
+
+    def overlapping(
+        self,
+        start: datetime,
+        end: datetime,
+        end_inclusive: bool = True,
+        tag_id: Optional[int] = None,
+        tag_ids: Optional[Sequence[int]] = None,
+        source_id: Optional[int] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        limit: Optional[int] = None
+    ) -> List[int]:
+        """
+        Ids of the events overlapping [start, end], in (start_time, id) order.
+
+        Filters mean the same as in events_window_query (tag_id 0 matches
+        nothing; empty tag_ids means any tag).
+        """
+        ids = self.ids
+        return [ids[position] for position in self.overlapping_positions(
+            start, end, end_inclusive, tag_id, tag_ids, source_id, after, limit
+        )]
+
+    def overlapping_positions(
+        self,
+        start: datetime,
+        end: datetime,
+        end_inclusive: bool = True,
+        tag_id: Optional[int] = None,
+        tag_ids: Optional[Sequence[int]] = None,
+        source_id: Optional[int] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        limit: Optional[int] = None
+    ) -> List[int]:
+        """Positions of the events overlapping() returns, in the same order."""
+        a = to_micros(start)
+        b = to_micros(end)
+        wanted_tags = set(tag_ids) if tag_ids else None
+        after_key = (to_micros(after[0]), after[1]) if after else None
+        starts, ids = self.starts, self.ids
+
+        def matches(position: int) -> bool:
+            if tag_id is not None and self.tag_ids[position] != tag_id:
+                return False
+            if wanted_tags is not None and self.tag_ids[position] not in wanted_tags:
+                return False
+            if source_id and self.source_ids[position] != source_id:
+                return False
+            return after_key is None or (starts[position], ids[position]) > after_key
+
+        # Started before the window and still running at its start; every
+        # one of these precedes the run below in (start, id) order
+        running = sorted(position for position in self._stab(a) if starts[position] < a)
+        result = [position for position in running if matches(position)]
+        if limit and len(result) >= limit:
+            return result[:limit]
+
+        # Started inside the window
+        lo = bisect_left(starts, a)
+        if after_key and after_key[0] > a:
+            lo = bisect_left(starts, after_key[0], lo)
+        hi = bisect_right(starts, b) if end_inclusive else bisect_left(starts, b)
+        for position in range(lo, hi):
+            if matches(position):
+                result.append(position)
+                if limit and len(result) >= limit:
+                    break
+        return result
+
+    def __contains__(self, event_id: int) -> bool:
+        if self._sorted_ids is None:
+            self._sorted_ids = array('q', sorted(self.ids))
+        i = bisect_left(self._sorted_ids, event_id)
+        return i < len(self._sorted_ids) and self._sorted_ids[i] == event_id
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the index arrays"""
+        arrays = (self.starts, self.ids, self.ends, self.tag_ids, self.source_ids,
+                  self.centers, self.lefts, self.rights, self.slices, self.by_start, self.by_end)
+        return sum(len(values) * values.itemsize for values in arrays)
+
+    def rows(self):
+        """(id, start_time, end_time, tag_id, source_id) of every event"""
+        for position in range(len(self.ids)):
+            tag_id = self.tag_ids[position]
+            yield (self.ids[position], EPOCH + self.starts[position] * MICROSECOND,
+                   EPOCH + self.ends[position] * MICROSECOND,
+                   None if tag_id == NO_TAG else tag_id, self.source_ids[position])
+
+
+class PatchedIndex:
+    """
+    An IntervalIndex plus a small one of the rows written since it was built.
+
+    Entries of `base` for the changed ids are stale and skipped; queries
+    merge the two indexes in (start_time, id) order.
+    """
+
+    def __init__(self, base: IntervalIndex, changed: Iterable[Tuple]):
+        self.base = base
+        self.changed = IntervalIndex(changed)
+        self.stale = set(self.changed.ids)
+        self._length = len(base) - sum(event_id in base for event_id in self.stale) + len(self.changed)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def overlapping(
+        self,
+        start: datetime,
+        end: datetime,
+        end_inclusive: bool = True,
+        tag_id: Optional[int] = None,
+        tag_ids: Optional[Sequence[int]] = None,
+        source_id: Optional[int] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        limit: Optional[int] = None
+    ) -> List[int]:
+        """As IntervalIndex.overlapping."""
+        filters = (start, end, end_inclusive, tag_id, tag_ids, source_id, after)
+        base, changed, stale = self.base, self.changed, self.stale
+        # Room for the stale entries among the first `limit`
+        old = [
+            (base.starts[position], base.ids[position])
+            for position in base.overlapping_positions(*filters, limit and limit + len(stale))
+            if base.ids[position] not in stale
+        ]
+        new = [
+            (changed.starts[position], changed.ids[position])
+            for position in changed.overlapping_positions(*filters, limit)
+        ]
+        ids = [event_id for _, event_id in heapq.merge(old, new)]
+        return ids[:limit] if limit else ids
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the index arrays (the stale id set excluded)"""
+        return self.base.memory_bytes() + self.changed.memory_bytes()
+
+    def rows(self):
+        """(id, start_time, end_time, tag_id, source_id) of every event"""
+        stale = self.stale
+        yield from (row for row in self.base.rows() if row[0] not in stale)
+        yield from self.changed.rows()
+
+
+class EventIndex:
+    """The process's IntervalIndex, kept in step with the events generation"""
+
+    def __init__(self):
+        self._index: Optional[IntervalIndex] = None
+        self._generation = None
+        self._loaded_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def current(self, generation: int):
+        """
+        Index as of event_rows `generation`, loading or patching it if needed.
+
+        Returns an IntervalIndex, or a PatchedIndex while rows written
+        since the last full build are kept aside.
+        """
+        index = self._index
+        if index is not None and self._generation == generation:
+            return index
+        with self._lock:
+            if self._index is None or self._generation != generation:
+                self._index = self._patched() if self._index is not None else self._load()
+                self._generation = generation
+            return self._index
+
+    def _load(self) -> IntervalIndex:
+        self._loaded_at = datetime.utcnow()
+        return IntervalIndex(fetch_event_rows(select(*INDEX_COLUMNS).where(INDEXED)))
+
+    def _patched(self):
+        since = self._loaded_at - timedelta(seconds=1)  # Writes racing the last load
+        loaded_at = datetime.utcnow()
+        changed = fetch_event_rows(
+            select(*INDEX_COLUMNS).where(INDEXED, Event.updated_at >= since).limit(MAX_PATCH_ROWS + 1)
+        )
+        if len(changed) > MAX_PATCH_ROWS:
+            return self._load()
+
+        # count(*) without a WHERE clause counts b-tree cells without
+        # decoding rows; the few series come off their partial index
+        connection = db.session.connection()
+        total = (connection.execute(select(func.count()).select_from(Event)).scalar()
+                 - connection.execute(select(func.count()).where(Event.recurrence.isnot(None))).scalar())
+        if not changed and total == len(self._index):
+            # e.g. only a series was written
+            return self._index
+
+        # Rebuilding the whole index takes ~0.6 s at 100k events: changed
+        # rows go to a small index of their own, folded into the base one
+        # only once it holds MAX_OVERLAY_ROWS
+        base, overlay = self._index, []
+        if isinstance(base, PatchedIndex):
+            base, overlay = base.base, list(base.changed.rows())
+        changed_ids = {row[0] for row in changed}
+        overlay = [row for row in overlay if row[0] not in changed_ids] + changed
+
+        index = PatchedIndex(base, overlay)
+        if len(index) != total:
+            return self._load()
+        if len(overlay) > MAX_OVERLAY_ROWS:
+            index = IntervalIndex(index.rows())
+        self._loaded_at = loaded_at
+        return index
+
+    def invalidate(self):
+        with self._lock:
+            self._index = self._generation = self._loaded_at = None
+
+
+event_index = EventIndex()
+
+
+def fetch_window_rows(
+    start: datetime,
+    end: datetime,
+    end_inclusive: bool = True,
+    tag: Optional[str] = None,
+    tag_ids: Optional[Sequence[int]] = None,
+    source_id: Optional[int] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: Optional[int] = None,
+    fields: Tuple[str, ...] = EVENT_FIELDS
+) -> List:
+    """
+    Rows of the events overlapping [start, end], in (start_time, id) order.
+
+    Takes the same filters as events_window_query. Answered from the
+    interval index plus one primary key lookup, or from SQL when
+    INTERVAL_INDEX is off, merged with the occurrences of recurring
+    series in the window.
+    """
+    tag_id = (tag_registry.id_for(tag, create=False) or 0) if tag else None
+    if not INTERVAL_INDEX:
+        rows = fetch_event_rows(events_window_query(
+            start, end, tag_id=tag_id, tag_ids=tag_ids, source_id=source_id,
+            end_inclusive=end_inclusive, after=after, limit=limit,
+            fields=fields, overlapping=True, series=False
+        ))
+    else:
+        ids = event_index.current(current_generation(EVENT_ROWS_GENERATION)).overlapping(
+            start, end, end_inclusive=end_inclusive, tag_id=tag_id, tag_ids=tag_ids,
+            source_id=source_id, after=after, limit=limit
+        )
+        rows = fetch_event_rows_by_id(ids, fields) if ids else []
+
+    occurrences = fetch_occurrence_rows(
+        start, end, end_inclusive=end_inclusive, tag_id=tag_id, tag_ids=tag_ids,
+        source_id=source_id, after=after, limit=limit, fields=fields
+    )
+    if not occurrences:
+        return rows
+    merged = heapq.merge(rows, occurrences, key=row_position)
+    return list(merged)[:limit] if limit else list(merged)
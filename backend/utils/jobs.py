@@ -0,0 +1,102 @@
+"""
+Timing and connection reporting for scheduled jobs.
+
+Every run logs its duration and how many database connections it opened,
+next to the process totals, so a week of scheduler output shows whether
+jobs keep reusing the shared engine (see app.get_app) or churn through
+new ones.
+
+Run counts, durations and SQL statement counts are also kept in
+JOB_STATS_FILE (default instance/job_stats.json), so the API process can
+report jobs that ran in the scheduler at /api/metrics.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from utils.metrics import query_scope
+from utils.pool import pool_stats
+
+JOB_STATS_FILE = os.getenv(
+    'JOB_STATS_FILE',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'job_stats.json')
+)
+JOB_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900)
+
+
+class JobStats:
+    """Per-job run counts and durations, shared through `path` if given"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                self.jobs = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump(self.jobs, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Job stats write failed: {e}")
+
+    def record(self, name: str, seconds: float, ok: bool, statements: int = 0):
+        with self._lock:
+            if self.path:
+                # Other processes may have recorded runs since
+                self._load()
+            job = self.jobs.setdefault(name, {
+                'runs': 0, 'failures': 0, 'total_seconds': 0.0, 'last_seconds': None,
+                'statements': 0, 'buckets': [0] * (len(JOB_BUCKETS) + 1)
+            })
+            job['runs'] += 1
+            job['failures'] += 0 if ok else 1
+            job['total_seconds'] += seconds
+            job['last_seconds'] = seconds
+            job['statements'] = job.get('statements', 0) + statements
+            job['buckets'][bisect_left(JOB_BUCKETS, seconds)] += 1
+            if self.path:
+                self._save()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            if self.path:
+                self._load()
+            return {name: dict(job) for name, job in self.jobs.items()}
+
+
+job_stats = JobStats(JOB_STATS_FILE)
+
+
+@contextmanager
+def job_timer(name: str):
+    """Time a job run and report it with its connection and SQL usage."""
+    before = pool_stats.snapshot()
+    started = time.perf_counter()
+    ok = False
+    with query_scope(name) as scope:
+        try:
+            yield
+            ok = True
+        finally:
+            seconds = time.perf_counter() - started
+            job_stats.record(name, seconds, ok, scope.statements)
+            after = pool_stats.snapshot()
+            print(f"{'✓' if ok else '✗'} Job {name} took {seconds:.2f} s | "
+                  f"{scope.statements} statements ({scope.seconds:.2f} s) | "
+                  f"connections opened {after['opened'] - before['opened']} "
+                  f"(process: {after['opened']} opened, {after['open']} open, "
+                  f"{after['engines']} engine(s))")
@@ -0,0 +1,331 @@
+"""
+Request, database and job metrics in the Prometheus text format.
+
+Served at /api/metrics:
+
+- per route: request count by status, latency and response size histograms
+- per route: SQL statements and database time per request, captured with
+  SQLAlchemy cursor events (a query scope is opened for every request and
+  every job; see query_scope())
+- per job (scheduler jobs and per-source ingestion runs): run count,
+  failures and a duration histogram, read from utils.jobs, which shares
+  them between processes through a small file
+- connection pool counters from utils.pool
+
+Request metrics live in process memory, so under gunicorn each worker
+reports its own (see concierge_process_info for its pid). METRICS_ENABLED=off
+skips the request and cursor hooks entirely.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from flask import g, request
+from sqlalchemy import event
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'on').lower() not in ('0', 'off', 'false', 'no')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+# ============================================================================
+# Query scopes
+# ============================================================================
+
+class QueryScope:
+    """SQL statements and database time of one request or job run"""
+
+    __slots__ = ('name', 'statements', 'seconds', 'parent')
+
+    def __init__(self, name: str, parent: Optional['QueryScope'] = None):
+        self.name = name
+        self.statements = 0
+        self.seconds = 0.0
+        self.parent = parent
+
+
+_scope: ContextVar[Optional[QueryScope]] = ContextVar('query_scope', default=None)
+
+
+def current_scope() -> Optional[QueryScope]:
+    """The scope queries on this thread are attributed to, if any."""
+    return _scope.get()
+
+
+@contextmanager
+def query_scope(name: str):
+    """
+    Attribute the queries run inside the block to `name`.
+
+    Scopes nest: a job's per-source scopes also add to the job's totals.
+    """
+    parent = _scope.get()
+    scope = QueryScope(name, parent)
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+        if parent is not None:
+            parent.statements += scope.statements
+            parent.seconds += scope.seconds
+
+
+def track_queries(engine):
+    """Count statements and their time against the current query scope."""
+    if not METRICS_ENABLED:
+        return
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    scope = _scope.get()
+    started = getattr(context, '_metrics_started', None)
+    if scope is None or started is None:
+        return
+    scope.statements += 1
+    scope.seconds += time.perf_counter() - started
+
+
+# ============================================================================
+# Collectors
+# ============================================================================
+
+def _labels(names: Sequence[str], values: Sequence) -> str:
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}' if pairs else ''
+
+
+def histogram_lines(name: str, labels: str, buckets: Sequence[float],
+                    counts: Sequence[int], total: float) -> List[str]:
+    """Sample lines of one histogram series from per-bucket (non-cumulative) counts."""
+    prefix = labels[1:-1] + ',' if labels else ''
+    lines, cumulative = [], 0
+    for bound, count in zip(buckets, counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+    cumulative += counts[len(buckets)]
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+    lines.append(f'{name}_sum{labels} {total:.6f}')
+    lines.append(f'{name}_count{labels} {cumulative}')
+    return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self.values: Dict[Tuple, int] = {}
+
+    def inc(self, labels: Tuple, amount: int = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self.values.items()):
+            lines.append(f'{self.name}{_labels(self.label_names, labels)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...],
+                 buckets: Sequence[float]):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self.series: Dict[Tuple, list] = {}  # labels -> [bucket counts, sum]
+
+    def observe(self, labels: Tuple, value: float):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total) in sorted(self.series.items()):
+            lines.extend(histogram_lines(
+                self.name, _labels(self.label_names, labels), self.buckets, counts, total
+            ))
+        return lines
+
+
+class RequestMetrics:
+    """Per-route request counters and histograms for this process"""
+
+    def __init__(self):
+        self.requests = Counter(
+            'concierge_http_requests_total', 'HTTP requests by route, method and status.',
+            ('route', 'method', 'status')
+        )
+        self.latency = Histogram(
+            'concierge_http_request_duration_seconds', 'Time to build the response.',
+            ('route',), LATENCY_BUCKETS
+        )
+        self.size = Histogram(
+            'concierge_http_response_size_bytes', 'Response body size as sent (streams excluded).',
+            ('route',), SIZE_BUCKETS
+        )
+        self.statements = Histogram(
+            'concierge_db_statements_per_request', 'SQL statements executed per request.',
+            ('route',), STATEMENT_BUCKETS
+        )
+        self.db_time = Histogram(
+            'concierge_db_seconds_per_request', 'Time spent in SQL statements per request.',
+            ('route',), DB_TIME_BUCKETS
+        )
+        self._lock = threading.Lock()
+
+    def record(self, route: str, method: str, status: int, seconds: float,
+               size: Optional[int], scope: QueryScope):
+        with self._lock:
+            self.requests.inc((route, method, status))
+            self.latency.observe((route,), seconds)
+            if size is not None:
+                self.size.observe((route,), size)
+            self.statements.observe((route,), scope.statements)
+            self.db_time.observe((route,), scope.seconds)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            lines = []
+            for metric in (self.requests, self.latency, self.size, self.statements, self.db_time):
+                lines.extend(metric.render())
+            return lines
+
+
+request_metrics = RequestMetrics()
+
+
+def install_request_metrics(app):
+    """
+    Record every request of `app` in request_metrics.
+
+    Register before other after_request hooks (e.g. compression): Flask
+    runs them in reverse, so the size recorded is the size sent.
+    """
+    if not METRICS_ENABLED:
+        return
+
+    @app.before_request
+    def start_request_metrics():
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        g.metrics_started = time.perf_counter()
+        g.metrics_scope = QueryScope(route)
+        g.metrics_token = _scope.set(g.metrics_scope)
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        size = None if response.is_streamed else response.calculate_content_length()
+        scope = g.metrics_scope
+        request_metrics.record(
+            scope.name, request.method, response.status_code,
+            time.perf_counter() - started, size, scope
+        )
+        return response
+
+    @app.teardown_request
+    def end_request_scope(exc):
+        token = g.pop('metrics_token', None)
+        if token is not None:
+            _scope.reset(token)
+
+
+# ============================================================================
+# Exposition
+# ============================================================================
+
+def job_lines(jobs: Dict[str, Dict], buckets: Sequence[float]) -> List[str]:
+    """Metrics for the job snapshot from utils.jobs.job_stats"""
+    lines = [
+        '# HELP concierge_job_runs_total Job runs (scheduler jobs and ingestion per source type).',
+        '# TYPE concierge_job_runs_total counter',
+    ]
+    for name, job in sorted(jobs.items()):
+        lines.append(f'concierge_job_runs_total{_labels(("job",), (name,))} {job["runs"]}')
+    lines += [
+        '# HELP concierge_job_failures_total Job runs that raised.',
+        '# TYPE concierge_job_failures_total counter',
+    ]
+    for name, job in sorted(jobs.items()):
+        lines.append(f'concierge_job_failures_total{_labels(("job",), (name,))} {job["failures"]}')
+    lines += [
+        '# HELP concierge_job_last_duration_seconds Duration of the latest run.',
+        '# TYPE concierge_job_last_duration_seconds gauge',
+    ]
+    for name, job in sorted(jobs.items()):
+        lines.append(
+            f'concierge_job_last_duration_seconds{_labels(("job",), (name,))} {job["last_seconds"]:.6f}'
+        )
+    lines += [
+        '# HELP concierge_job_db_statements_total SQL statements executed by job runs.',
+        '# TYPE concierge_job_db_statements_total counter',
+    ]
+    for name, job in sorted(jobs.items()):
+        lines.append(
+            f'concierge_job_db_statements_total{_labels(("job",), (name,))} {job.get("statements", 0)}'
+        )
+    lines += [
+        '# HELP concierge_job_duration_seconds Job run durations.',
+        '# TYPE concierge_job_duration_seconds histogram',
+    ]
+    for name, job in sorted(jobs.items()):
+        counts = job.get('buckets') or [0] * len(buckets) + [job['runs']]
+        lines.extend(histogram_lines(
+            'concierge_job_duration_seconds', _labels(('job',), (name,)),
+            buckets, counts, job['total_seconds']
+        ))
+    return lines
+
+
+def pool_lines(pool: Dict[str, int]) -> List[str]:
+    """Metrics for the utils.pool.pool_stats snapshot"""
+    return [
+        '# HELP concierge_db_connections_opened_total DBAPI connections opened by this process.',
+        '# TYPE concierge_db_connections_opened_total counter',
+        f'concierge_db_connections_opened_total {pool["opened"]}',
+        '# HELP concierge_db_connections_open Connections currently open.',
+        '# TYPE concierge_db_connections_open gauge',
+        f'concierge_db_connections_open {pool["open"]}',
+        '# HELP concierge_db_connections_checked_out Connections currently in use.',
+        '# TYPE concierge_db_connections_checked_out gauge',
+        f'concierge_db_connections_checked_out {pool["checked_out"]}',
+    ]
+
+
+def render_metrics(jobs: Dict[str, Dict], job_buckets: Sequence[float],
+                   pool: Dict[str, int]) -> str:
+    """The full /api/metrics document"""
+    lines = [
+        '# HELP concierge_process_info Process serving this scrape.',
+        '# TYPE concierge_process_info gauge',
+        f'concierge_process_info{_labels(("pid",), (os.getpid(),))} 1',
+    ]
+    lines += request_metrics.render()
+    lines += job_lines(jobs, job_buckets)
+    lines += pool_lines(pool)
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,66 @@
+"""
+Keyset (cursor) pagination for event listings.
+
+A cursor is an opaque token encoding the (start_time, id) of the last row
+on a page. The next page seeks past it on the start_time index instead of
+scanning and discarding rows with OFFSET.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence, Tuple
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor we did not issue"""
+
+
+def encode_cursor(start_time: datetime, event_id: int) -> str:
+    """Encode the position after a row as an opaque cursor."""
+    payload = json.dumps([start_time.isoformat(), event_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        InvalidCursor: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        start_time, event_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(start_time), int(event_id)
+    except Exception:
+        raise InvalidCursor(f'Invalid cursor: {cursor!r}')
+
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    """Apply the default and the server-enforced maximum page size."""
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def paginate_rows(
+    rows: Sequence,
+    limit: int,
+    position: Optional[Callable] = None
+) -> Tuple[List, Optional[str]]:
+    """
+    Split rows fetched with `limit + 1` into the page and its next cursor.
+
+    The extra row only tells whether another page exists; rows need
+    start_time and id attributes, or `position` maps a row to its
+    (start_time, id).
+    """
+    if len(rows) <= limit:
+        return list(rows), None
+    rows = list(rows[:limit])
+    if position is None:
+        return rows, encode_cursor(rows[-1].start_time, rows[-1].id)
+    return rows, encode_cursor(*position(rows[-1]))
@@ -0,0 +1,107 @@
+"""
+Database engine settings and connection accounting.
+
+Pool settings come from the environment:
+
+- DB_POOL_SIZE: connections kept open per engine (default 5)
+- DB_MAX_OVERFLOW: extra connections allowed under load (default 10)
+- DB_POOL_RECYCLE: seconds before a connection is replaced (default 1800)
+- DB_POOL_PRE_PING: test connections before use (default true)
+
+Every engine the process creates is counted along with the DBAPI
+connections its pool opens and closes, so long-running processes such as
+the scheduler can show that they keep reusing one engine.
+
+Pre-forking servers must not share pooled connections between processes;
+see dispose_engines() and gunicorn.conf.py.
+"""
+import os
+import threading
+from typing import Dict
+
+from sqlalchemy import event
+
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+
+
+def engine_options(database_uri: str) -> Dict:
+    """SQLALCHEMY_ENGINE_OPTIONS for `database_uri`."""
+    options = {
+        'pool_pre_ping': POOL_PRE_PING,
+        'pool_recycle': POOL_RECYCLE,
+    }
+    # In-memory SQLite uses a single static connection, not a sized pool
+    if database_uri in ('sqlite://', 'sqlite:///:memory:'):
+        return options
+    options['pool_size'] = POOL_SIZE
+    options['max_overflow'] = MAX_OVERFLOW
+    return options
+
+
+class PoolStats:
+    """Process-wide engine and connection counters"""
+
+    def __init__(self):
+        self.engines = 0
+        self.opened = 0
+        self.closed = 0
+        self.checked_out = 0
+        self._tracked = set()
+        self._lock = threading.Lock()
+
+    def track(self, engine):
+        """Count `engine` and the connections its pool opens and closes."""
+        with self._lock:
+            if id(engine) in self._tracked:
+                return
+            self._tracked.add(id(engine))
+            self.engines += 1
+
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'close', self._on_close)
+        event.listen(engine, 'close_detached', self._on_close)
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'checkin', self._on_checkin)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.opened += 1
+
+    def _on_close(self, dbapi_connection, *args):
+        with self._lock:
+            self.closed += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checked_out += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checked_out -= 1
+
+    def snapshot(self) -> Dict[str, int]:
+        """Current counters, e.g. to diff around a job run."""
+        with self._lock:
+            return {
+                'engines': self.engines,
+                'opened': self.opened,
+                'open': self.opened - self.closed,
+                'checked_out': self.checked_out,
+            }
+
+
+pool_stats = PoolStats()
+
+
+def dispose_engines(engines, close: bool = True):
+    """
+    Drop the pooled connections of `engines`.
+
+    After fork, call with close=False: the inherited connections belong to
+    the parent, so the child forgets them without closing and opens its own.
+    """
+    for engine in engines:
+        engine.dispose(close=close)
@@ -0,0 +1,386 @@
+"""
+Lazy expansion of recurring events.
+
+A recurring ICS event is stored once: its row is the first occurrence
+(start_time is DTSTART) and `recurrence` holds its RRULE / RDATE / EXDATE
+lines (see ingestion.ics_parser). An open-ended weekly series is then one
+row rather than an ever-growing set of instances. Window queries (see
+utils.interval_index.fetch_window_rows) leave these series rows out and
+ask this module for their occurrences instead:
+
+- every series is loaded once per events generation: its row, its rules
+  parsed with dateutil, minus the occurrences replaced by overrides
+  (events of the same source and UID with a recurrence_id, which are
+  ordinary rows of their own)
+- series are only expanded over the queried window, widened to whole
+  days so that windows starting "now" share entries; the occurrences of
+  all series in such a window are kept sorted by (start_time, id) in an
+  LRU of RECURRENCE_CACHE_SIZE windows, dropped when the generation moves,
+  so a page walks one list and stops at its limit
+
+Occurrences come back as rows shaped like those of the window query, with
+the series' fields and the occurrence's start and end time. Each has an
+id of its own, the series' id and its start ('12@20240506T100000'), so
+clients can tell occurrences apart and look them up again in a batch;
+in (start_time, id) order an occurrence takes its series' id. Times are
+naive wall times in the event's timezone, as stored.
+
+Reads that cannot leave series out (search) move each series row to its
+next occurrence with next_occurrences(); the NDJSON export merges the
+occurrences into its stream with iter_window_batches(). The iCalendar
+feeds pass series on with their rules (see utils.ics_feed).
+"""
+import heapq
+import os
+import threading
+from collections import defaultdict, namedtuple, OrderedDict
+from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import chain, islice
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from dateutil.rrule import rruleset, rrulestr
+from sqlalchemy import select
+
+from models import Event
+from utils.event_queries import (
+    fetch_event_rows, iter_event_batches, iter_event_rows, select_events, serializer_for,
+    EVENT_FIELDS, EXPORT_BATCH_SIZE, FIELD_COLUMNS
+)
+from utils.generation import current_generation
+
+RECURRENCE_CACHE_SIZE = int(os.getenv('RECURRENCE_CACHE_SIZE', 256))
+
+DAY = timedelta(days=1)
+
+OCCURRENCE_TIME_FORMAT = '%Y%m%dT%H%M%S'
+
+# Read with the full event row of every series
+SERIES_COLUMNS = (
+    Event.tag_id.label('series_tag_id'),
+    Event.source_id.label('series_source_id'),
+    Event.source_event_id.label('series_uid'),
+    Event.recurrence.label('series_recurrence'),
+)
+
+# Rows of every series, and the occurrences their overrides replace
+SERIES_QUERY = (
+    select_events(EVENT_FIELDS).add_columns(*SERIES_COLUMNS)
+    .where(Event.recurrence.isnot(None))
+)
+OVERRIDES_QUERY = (
+    select(Event.source_id, Event.source_event_id, Event.recurrence_id)
+    .where(Event.recurrence_id.isnot(None))
+)
+
+
+def parse_rules(recurrence: str, start: datetime) -> rruleset:
+    """
+    Parse the `recurrence` lines of a series starting at `start`.
+
+    DTSTART always counts as the first occurrence (RFC 5545), even where
+    the rule itself would not produce it; an EXDATE can still remove it.
+    """
+    rules = rrulestr(recurrence, dtstart=start, forceset=True, ignoretz=True)
+    rules.rdate(start)
+    return rules
+
+
+def occurrence_id(series_id: int, start: datetime) -> str:
+    """Id of the occurrence of a series starting at `start`"""
+    return f'{series_id}@{start.strftime(OCCURRENCE_TIME_FORMAT)}'
+
+
+def parse_occurrence_id(value: str) -> Optional[Tuple[int, datetime]]:
+    """(series id, start) of an occurrence id, or None if `value` is not one"""
+    series_id, _, start = value.partition('@')
+    try:
+        return int(series_id), datetime.strptime(start, OCCURRENCE_TIME_FORMAT)
+    except ValueError:
+        return None
+
+
+def row_position(row) -> Tuple[datetime, int]:
+    """Keyset position (start_time, id) of a window row; occurrences take their series' id"""
+    event_id = row.id
+    if isinstance(event_id, str):
+        event_id = int(event_id.partition('@')[0])
+    return row.start_time, event_id
+
+
+class Series:
+    """One recurring event: its row and its rules"""
+
+    __slots__ = ('id', 'values', 'tag_id', 'source_id', 'recurrence', 'overridden',
+                 'rules', 'duration')
+
+    def __init__(self, row, overridden: Sequence[datetime] = ()):
+        values = row._asdict()
+        self.id = row.id
+        self.values = values
+        self.tag_id = values.pop('series_tag_id')
+        self.source_id = values.pop('series_source_id')
+        values.pop('series_uid')
+        self.recurrence = recurrence = values.pop('series_recurrence')
+        self.overridden = sorted(overridden)
+
+        start, end = row.start_time, row.end_time
+        self.duration = max(end - start, timedelta(0)) if end else timedelta(0)
+        try:
+            self.rules = parse_rules(recurrence, start)
+        except (ValueError, TypeError) as e:
+            print(f"Invalid recurrence of event {row.id}: {e}")
+            self.rules = rruleset()
+            self.rules.rdate(start)
+        for occurrence in overridden:
+            self.rules.exdate(occurrence)
+
+    def matches(
+        self,
+        tag_id: Optional[int] = None,
+        tag_ids: Optional[Sequence[int]] = None,
+        source_id: Optional[int] = None
+    ) -> bool:
+        """Filters as in events_window_query"""
+        if tag_id is not None and self.tag_id != tag_id:
+            return False
+        if tag_ids and self.tag_id not in tag_ids:
+            return False
+        return not source_id or self.source_id == source_id
+
+    def starts(self, start: datetime, end: datetime) -> List[datetime]:
+        """Start times of the occurrences overlapping [start, end]"""
+        return self.rules.between(start - self.duration, end, inc=True)
+
+    def occurs_at(self, start: datetime) -> bool:
+        """Whether an occurrence starts exactly at `start`"""
+        return self.rules.after(start, inc=True) == start
+
+    def occurrence(self, row_type, start: datetime):
+        """Row of `row_type` for the occurrence starting at `start`"""
+        values = dict(self.values, id=occurrence_id(self.id, start), start_time=start)
+        if values['end_time'] is not None:
+            values['end_time'] = start + self.duration
+        return row_type(*(values[key] for key in row_type._fields))
+
+
+@lru_cache(maxsize=64)
+def occurrence_type(fields: Tuple[str, ...]):
+    """Row type with the same attributes, in the same order, as a window query row"""
+    return namedtuple('Occurrence', [column.key for name in fields for column in FIELD_COLUMNS[name]])
+
+
+def build_series(override_rows: Sequence, series_rows: Sequence) -> List[Series]:
+    """Series of the rows of SERIES_QUERY, minus the occurrences of OVERRIDES_QUERY"""
+    overridden = defaultdict(list)
+    for source_id, uid, recurrence_id in override_rows:
+        overridden[(source_id, uid)].append(recurrence_id)
+    return [
+        Series(row, overridden.get((row.series_source_id, row.series_uid), ()))
+        for row in series_rows
+    ]
+
+
+def load_series() -> List[Series]:
+    """Every recurring event, minus the occurrences its overrides replace"""
+    return build_series(fetch_event_rows(OVERRIDES_QUERY), fetch_event_rows(SERIES_QUERY))
+
+
+class SeriesCache:
+    """The process's series and their expanded windows, kept per events generation"""
+
+    def __init__(self, size: int = 4096):
+        self.size = size
+        self._series: Optional[List[Series]] = None
+        self._generation = None
+        self._windows: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def current(self, generation: int) -> List[Series]:
+        """Series as of `generation`, loading them if needed."""
+        series = self._series
+        if series is not None and self._generation == generation:
+            return series
+        with self._lock:
+            if not self.holds(generation):
+                self._store(generation, load_series())
+            return self._series
+
+    def holds(self, generation: int) -> bool:
+        """Whether the series of `generation` are loaded"""
+        return self._series is not None and self._generation == generation
+
+    def store(self, generation: int, series: List[Series]):
+        """Use series loaded elsewhere (see asgi.py) as those of `generation`."""
+        with self._lock:
+            self._store(generation, series)
+
+    def _store(self, generation: int, series: List[Series]):
+        self._series = series
+        self._windows.clear()
+        self._generation = generation
+
+    def occurrences(self, start: datetime, end: datetime) -> List[Tuple[datetime, int, Series]]:
+        """
+        (start_time, id, series) of every occurrence overlapping the days
+        from `start` to `end`, in (start_time, id) order.
+
+        Must follow current() in the same request, so the series are those
+        of the generation being served.
+        """
+        first_day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        last_day = end.replace(hour=0, minute=0, second=0, microsecond=0) + DAY
+        with self._lock:
+            key = (self._generation, first_day, last_day)
+            found = self._windows.get(key)
+            if found is not None:
+                self._windows.move_to_end(key)
+                self.hits += 1
+                return found
+            series_list = self._series or ()
+
+        found = sorted(
+            (occurrence, series.id, series)
+            for series in series_list
+            for occurrence in series.starts(first_day, last_day)
+        )
+        with self._lock:
+            self._windows[key] = found
+            self.misses += 1
+            while len(self._windows) > self.size:
+                self._windows.popitem(last=False)
+        return found
+
+    def invalidate(self):
+        with self._lock:
+            self._series = self._generation = None
+            self._windows.clear()
+
+    def stats(self) -> Dict:
+        return {
+            'series': len(self._series or ()),
+            'windows': len(self._windows),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+series_cache = SeriesCache(RECURRENCE_CACHE_SIZE)
+
+
+def fetch_occurrence_rows(
+    start: datetime,
+    end: datetime,
+    end_inclusive: bool = True,
+    tag_id: Optional[int] = None,
+    tag_ids: Optional[Sequence[int]] = None,
+    source_id: Optional[int] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: Optional[int] = None,
+    fields: Tuple[str, ...] = EVENT_FIELDS,
+    generation: Optional[int] = None
+) -> List:
+    """
+    Occurrences of recurring events overlapping [start, end], in (start_time, id) order.
+
+    Takes the filters of IntervalIndex.overlapping (tag_id 0 matches
+    nothing); `after` is a keyset position (start_time, id). Rows are
+    only built for the occurrences within `limit`. `generation` is the
+    events generation being served, looked up if not given.
+    """
+    if generation is None:
+        generation = current_generation()
+    series_list = series_cache.current(generation)
+    if not series_list:
+        return []
+
+    wanted_tags = set(tag_ids) if tag_ids else None
+    found = []
+    for occurrence, series_id, series in series_cache.occurrences(start, end):
+        if occurrence > end or (occurrence == end and not end_inclusive):
+            break
+        if occurrence + series.duration < start:
+            continue
+        if not series.matches(tag_id, wanted_tags, source_id):
+            continue
+        if after and (occurrence, series_id) <= after:
+            continue
+        found.append((occurrence, series))
+        if limit and len(found) >= limit:
+            break
+
+    row_type = occurrence_type(fields)
+    return [series.occurrence(row_type, occurrence) for occurrence, series in found]
+
+
+def next_occurrences(
+    rows: Sequence,
+    start: datetime,
+    end: Optional[datetime] = None,
+    fields: Tuple[str, ...] = EVENT_FIELDS
+) -> List:
+    """
+    Replace the series among event rows by their first occurrence in [start, end].
+
+    For queries that cannot leave series out, e.g. search: series whose
+    rules have no occurrence in the window are dropped, other rows are
+    kept as they are.
+    """
+    series_list = series_cache.current(current_generation())
+    if not series_list:
+        return list(rows)
+
+    series_by_id = {series.id: series for series in series_list}
+    row_type = occurrence_type(fields)
+    result = []
+    for row in rows:
+        series = series_by_id.get(row.id)
+        if series is None:
+            result.append(row)
+            continue
+        occurrence = series.rules.after(start, inc=True)
+        if occurrence is not None and (end is None or occurrence <= end):
+            result.append(series.occurrence(row_type, occurrence))
+    return result
+
+
+def iter_window_batches(
+    query,
+    occurrences: Sequence,
+    fields: Tuple[str, ...] = EVENT_FIELDS,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[List[Dict]]:
+    """
+    iter_event_batches() for a window query that leaves series out
+    (series=False), with the occurrence rows of the window merged in order.
+    """
+    if not occurrences:
+        yield from iter_event_batches(query, fields, batch_size)
+        return
+
+    serialize = serializer_for(fields)
+    rows = heapq.merge(chain.from_iterable(iter_event_rows(query, batch_size)),
+                       occurrences, key=row_position)
+    while True:
+        batch = [serialize(row) for row in islice(rows, batch_size)]
+        if not batch:
+            return
+        yield batch
+
+
+def fetch_occurrence_rows_by_id(
+    ids: Sequence[str],
+    fields: Tuple[str, ...] = EVENT_FIELDS
+) -> List:
+    """Rows of the occurrences with `ids` (see occurrence_id), in order; unknown ones skipped."""
+    series_by_id = {series.id: series for series in series_cache.current(current_generation())}
+    row_type = occurrence_type(fields)
+    rows = []
+    for value in ids:
+        parsed = parse_occurrence_id(value)
+        series = series_by_id.get(parsed[0]) if parsed else None
+        if series is not None and series.occurs_at(parsed[1]):
+            rows.append(series.occurrence(row_type, parsed[1]))
+    return rows
@@ -0,0 +1,135 @@
+"""
+In-place schema upgrades for existing databases.
+
+db.create_all() only creates missing tables, so columns and indexes added
+to models later never reach a database created before them.
+upgrade_schema() fills that gap, migrating existing data where needed.
+"""
+from sqlalchemy import inspect, text
+
+from models import db, Subscription
+
+# Indexes superseded by composite ones (see Event.__table_args__)
+OBSOLETE_INDEXES = {
+    'events': ['ix_events_tag'],
+}
+
+
+def _columns(inspector, table: str) -> set:
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def _migrate_tag_columns(inspector):
+    """Replace free-form events.tag / subscriptions.tag with tag_id references."""
+    from utils.tags import tag_registry
+
+    migrated = False
+
+    if 'tag' in _columns(inspector, 'events') and 'tag_id' not in _columns(inspector, 'events'):
+        print("  Migrating events.tag to tag ids...")
+        db.session.execute(text(
+            'ALTER TABLE events ADD COLUMN tag_id INTEGER REFERENCES tags (id)'
+        ))
+        values = db.session.execute(text(
+            'SELECT DISTINCT tag FROM events WHERE tag IS NOT NULL'
+        )).scalars().all()
+        for value in values:
+            db.session.execute(
+                text('UPDATE events SET tag_id = :tag_id WHERE tag = :tag'),
+                {'tag_id': tag_registry.id_for(value), 'tag': value}
+            )
+
+        for index in inspector.get_indexes('events'):
+            if 'tag' in index['column_names']:
+                db.session.execute(text(f"DROP INDEX {index['name']}"))
+        db.session.execute(text('ALTER TABLE events DROP COLUMN tag'))
+        migrated = True
+
+    if 'tag' in _columns(inspector, 'subscriptions'):
+        # The unique (user_id, tag) constraint cannot be altered in place,
+        # so the (small) table is rebuilt
+        print("  Migrating subscriptions.tag to tag ids...")
+        rows = db.session.execute(text(
+            'SELECT id, user_id, tag, created_at FROM subscriptions'
+        )).all()
+        db.session.execute(text('DROP TABLE subscriptions'))
+        Subscription.__table__.create(db.session.connection())
+        seen = set()
+        for row in rows:
+            tag_id = tag_registry.id_for(row.tag)
+            if (row.user_id, tag_id) in seen:
+                continue  # Aliases of the same tag collapse into one row
+            seen.add((row.user_id, tag_id))
+            db.session.execute(Subscription.__table__.insert().values(
+                id=row.id, user_id=row.user_id, tag_id=tag_id, created_at=row.created_at
+            ))
+        migrated = True
+
+    if migrated:
+        # Tag counters were keyed by name; ensure_stats() recomputes them
+        db.session.execute(text('DELETE FROM stat_counters'))
+
+
+def _add_missing_columns(inspector) -> bool:
+    """Add nullable columns that models gained after the table was created."""
+    added = False
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = _columns(inspector, table.name)
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            db.session.execute(text(
+                f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+            ))
+            print(f"  Added column {table.name}.{column.name}")
+            added = True
+    return added
+
+
+def upgrade_schema():
+    """
+    Migrate changed columns, add new ones, create missing indexes and drop
+    superseded ones. Also seeds the default tags into an empty tags table.
+    """
+    # Inspect on the session's connection: the SQLite writer pool holds a
+    # single connection (see utils.sqlite_profile), which the session keeps
+    # once it has written
+    from utils.tags import seed_default_tags
+
+    inspector = inspect(db.session.connection())
+
+    # The tag migration maps aliases through the default tags
+    if inspector.has_table('tags') and seed_default_tags():
+        db.session.commit()
+        print("✓ Created default tags")
+        inspector = inspect(db.session.connection())
+
+    if inspector.has_table('events'):
+        _migrate_tag_columns(inspector)
+        db.session.commit()
+        inspector = inspect(db.session.connection())
+
+    if _add_missing_columns(inspector):
+        db.session.commit()
+        inspector = inspect(db.session.connection())
+
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+
+        for name in OBSOLETE_INDEXES.get(table.name, []):
+            if name in existing:
+                db.session.execute(text(f'DROP INDEX {name}'))
+                print(f"  Dropped obsolete index {name}")
+
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.session.connection())
+                print(f"  Created index {index.name}")
+
+    db.session.commit()
@@ -0,0 +1,284 @@
+"""
+Full-text search over events.
+
+Titles, descriptions and locations are indexed in ``events_fts``, an FTS5
+table using the events table as external content. Triggers on events keep
+it in sync on every insert, update and delete, including bulk Core
+statements that bypass the ORM session hooks.
+"""
+import re
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, column, false, func, literal_column, or_, select, table, text
+
+from models import db, Event
+from utils.event_queries import fetch_event_rows, select_events, EVENT_FIELDS
+from utils.generation import current_generation
+from utils.recurrence import next_occurrences, series_cache
+from utils.tags import tag_registry
+
+FTS_TABLE = 'events_fts'
+
+# Relative weight of title, description and location matches in the ranking
+RANK_WEIGHTS = (10.0, 1.0, 4.0)
+
+# Matches ranked by search_events(): queries matching more events (very
+# common words, short prefixes) rank the most recently added ones only,
+# at least doubled while the filters leave less than a page of them
+SEARCH_CANDIDATES = 1000
+SEARCH_WIDENING = 2
+
+# Words too common to narrow a search; dropped unless the query is only these
+STOP_WORDS = frozenset(
+    'a an and are as at be by for from in is it of on or the this to with'.split()
+)
+
+_events_fts = table(FTS_TABLE, column('rowid'))
+
+_SCHEMA = {
+    FTS_TABLE: f"""
+        CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+            title, description, location,
+            content='events', content_rowid='id',
+            tokenize='porter unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """,
+    'events_fts_insert': f"""
+        CREATE TRIGGER events_fts_insert AFTER INSERT ON events BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, description, location)
+            VALUES (new.id, new.title, new.description, new.location);
+        END
+    """,
+    'events_fts_delete': f"""
+        CREATE TRIGGER events_fts_delete AFTER DELETE ON events BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, location)
+            VALUES ('delete', old.id, old.title, old.description, old.location);
+        END
+    """,
+    'events_fts_update': f"""
+        CREATE TRIGGER events_fts_update
+        AFTER UPDATE OF title, description, location ON events BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, location)
+            VALUES ('delete', old.id, old.title, old.description, old.location);
+            INSERT INTO {FTS_TABLE}(rowid, title, description, location)
+            VALUES (new.id, new.title, new.description, new.location);
+        END
+    """,
+}
+
+
+class InvalidSearch(ValueError):
+    """Raised when a search query has nothing to match on"""
+
+
+def search_available() -> bool:
+    """FTS5 is SQLite-only; other databases have no search index."""
+    return db.engine.dialect.name == 'sqlite'
+
+
+def ensure_search_index():
+    """
+    Create the FTS table and its triggers if missing.
+
+    When anything had to be (re)created the index is rebuilt from the
+    events table, which also covers databases that predate search.
+    """
+    if not search_available():
+        return
+
+    existing = set(db.session.execute(
+        text("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+    ).scalars())
+
+    missing = [name for name in _SCHEMA if name not in existing]
+    if not missing:
+        return
+
+    for name in missing:
+        db.session.execute(text(_SCHEMA[name]))
+
+    db.session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    db.session.commit()
+    print("✓ Search index built")
+
+
+def build_match_query(q: Optional[str]) -> str:
+    """
+    Turn free text into an FTS5 MATCH expression.
+
+    Every word must match; the last one also matches as a prefix so
+    results show up while the user is still typing. Words are quoted, so
+    FTS5 operators in user input are searched for literally. Stop words
+    are dropped: they match nearly every event and make ranking slow.
+
+    Raises:
+        InvalidSearch: If the text contains no words
+    """
+    terms = re.findall(r'\w+', (q or '').lower())
+    if not terms:
+        raise InvalidSearch('Search query must contain at least one word')
+
+    terms = [term for term in terms if term not in STOP_WORDS] or terms
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def search_query(
+    match: str,
+    start: datetime,
+    end: Optional[datetime] = None,
+    tag: Optional[str] = None,
+    source_id: Optional[int] = None,
+    limit: int = 50,
+    newer_than: Optional[int] = None,
+    fields: Tuple[str, ...] = EVENT_FIELDS
+):
+    """
+    Build the ranked search query for events starting inside [start, end].
+
+    Args:
+        match: FTS5 expression from build_match_query()
+        start: Window start (inclusive)
+        end: Window end (inclusive), or None for no upper bound
+        tag: Tag filter, by name
+        source_id: Source filter
+        limit: Maximum number of rows
+        newer_than: Only consider matches with a greater event id
+        fields: Fields to select (see utils.event_queries.parse_fields)
+
+    Returns:
+        SQLAlchemy Select of the fields' columns, best match first
+    """
+    # Recurring series are kept whatever their first occurrence; callers
+    # move them to their next one (see utils.recurrence.next_occurrences)
+    in_window, filters = _filters(start, end, tag, source_id)
+    passes = select(Event.id).where(
+        Event.id == _events_fts.c.rowid, or_(in_window, Event.recurrence.isnot(None)), *filters
+    )
+
+    # Walk the matches inside the FTS table and filter each with a primary
+    # key probe: left to itself the planner drives filtered searches from
+    # the events indexes and probes the FTS index once per row, which is
+    # orders of magnitude slower. Only matches that pass are scored
+    score = func.bm25(literal_column(FTS_TABLE), *RANK_WEIGHTS).label('score')
+    matches = select(_events_fts.c.rowid, score).where(
+        literal_column(FTS_TABLE).op('MATCH')(match), passes.exists()
+    )
+    if newer_than is not None:
+        matches = matches.where(_events_fts.c.rowid > newer_than)
+    # bm25() scores better matches lower; only the best `limit` are joined
+    matches = matches.order_by(score).limit(limit).cte('matches').prefix_with('MATERIALIZED')
+
+    return (
+        select_events(fields)
+        .join(matches, matches.c.rowid == Event.id)
+        .order_by(matches.c.score, Event.start_time)
+    )
+
+
+def search_events(
+    match: str,
+    start: datetime,
+    end: Optional[datetime] = None,
+    tag: Optional[str] = None,
+    source_id: Optional[int] = None,
+    limit: int = 50,
+    fields: Tuple[str, ...] = EVENT_FIELDS
+) -> Tuple[List, bool]:
+    """
+    Run a search, bounding the ranking work for very broad queries.
+
+    Scoring is linear in the number of matches scored. A query matching
+    at most SEARCH_CANDIDATES events has all of them considered. Broader
+    ones (very common words, short prefixes) only consider the most
+    recently added matches, which is where upcoming events are: at least
+    SEARCH_CANDIDATES, more when narrow filters (window, tag, source)
+    keep a small share of events. While the filters leave less than a
+    page of those, at least SEARCH_WIDENING times as many are
+    considered, until the page fills or every match was.
+
+    Recurring series are returned at their next occurrence in the window.
+
+    Returns:
+        (event rows with the columns of `fields`, best match first;
+        whether every match was considered)
+    """
+    # Room for the series the window turns out not to contain
+    spare = len(series_cache.current(current_generation()))
+    options = dict(end=end, tag=tag, source_id=source_id, limit=limit + spare, fields=fields)
+
+    candidates = _first_candidates(start, end, tag, source_id, limit)
+    while True:
+        newer_than = _older_match(match, candidates)
+        rows = next_occurrences(fetch_event_rows(
+            search_query(match, start, newer_than=newer_than, **options)
+        ), start, end, fields)
+        if newer_than is None or len(rows) >= limit:
+            return rows[:limit], newer_than is None
+        # Enough to fill the page at the share of matches that passed
+        candidates = max(candidates * SEARCH_WIDENING, _to_fill(limit, len(rows), candidates))
+
+
+def _filters(start: datetime, end: Optional[datetime], tag: Optional[str], source_id: Optional[int]):
+    """(condition for starting in the window, conditions of the other filters)"""
+    in_window = Event.start_time >= start
+    if end:
+        in_window = and_(in_window, Event.start_time <= end)
+    filters = []
+    if tag:
+        tag_id = tag_registry.id_for(tag, create=False)
+        filters.append(Event.tag_id == tag_id if tag_id else false())
+    if source_id:
+        filters.append(Event.source_id == source_id)
+    return in_window, filters
+
+
+def _to_fill(limit: int, passing: int, considered: int) -> int:
+    """Matches to consider for `limit` to pass, with some room, at the observed share."""
+    return limit * 3 // 2 * considered // max(passing, 1)
+
+
+def _first_candidates(
+    start: datetime,
+    end: Optional[datetime],
+    tag: Optional[str],
+    source_id: Optional[int],
+    limit: int
+) -> int:
+    """
+    Matches to consider first, sized for the share of events the filters keep.
+
+    Narrow filters (a tag, a week) keep few of the most recent matches;
+    reading enough of them at once saves widening rounds. Assumes matches
+    are spread across the filters like events are. Counts at most the
+    events that would size past SEARCH_CANDIDATES on an index range.
+    """
+    if not (end or tag or source_id):
+        return SEARCH_CANDIDATES
+    total = db.session.execute(select(func.max(Event.id))).scalar() or 0
+    enough = _to_fill(limit, SEARCH_CANDIDATES, total) + 1
+    in_window, filters = _filters(start, end, tag, source_id)
+    passing = db.session.execute(
+        select(func.count()).select_from(
+            select(Event.id).where(in_window, *filters).limit(enough).subquery()
+        )
+    ).scalar()
+    return max(SEARCH_CANDIDATES, _to_fill(limit, passing, total))
+
+
+def _older_match(match: str, count: int) -> Optional[int]:
+    """
+    Event id of the newest match beyond the `count` most recent ones.
+
+    None when at most `count` events match. Reads `count` rowids from
+    the FTS index and scores none.
+    """
+    return db.session.execute(
+        select(_events_fts.c.rowid)
+        .where(literal_column(FTS_TABLE).op('MATCH')(match))
+        .order_by(_events_fts.c.rowid.desc())
+        .limit(1).offset(count)
+    ).scalar()
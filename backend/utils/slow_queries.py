@@ -0,0 +1,158 @@
+"""
+Opt-in slow query log.
+
+With SLOW_QUERY_MS set, every SQL statement slower than that is recorded
+with its bound parameters, where it came from (the route or job, see
+utils.metrics.query_scope, and the full request URL), its duration and
+its query plan (EXPLAIN QUERY PLAN on SQLite, EXPLAIN on PostgreSQL), run
+on the same connection right after the statement.
+
+Entries are kept in a ring buffer of the last SLOW_QUERY_BUFFER entries,
+read by GET /api/admin/slow-queries, and appended as JSON lines to
+SLOW_QUERY_LOG, rotated at SLOW_QUERY_LOG_BYTES with
+SLOW_QUERY_LOG_BACKUPS old files kept.
+
+The hooks are installed on every engine create_app() builds, so the API,
+ingestion and the scheduler's jobs are all covered.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+from utils.metrics import current_scope
+
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 0))  # 0: off
+SLOW_QUERY_BUFFER = int(os.getenv('SLOW_QUERY_BUFFER', 200))
+SLOW_QUERY_LOG = os.getenv(
+    'SLOW_QUERY_LOG',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'slow_queries.log')
+)
+SLOW_QUERY_LOG_BYTES = int(os.getenv('SLOW_QUERY_LOG_BYTES', 1024 * 1024))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv('SLOW_QUERY_LOG_BACKUPS', 3))
+
+MAX_PARAMETERS_LENGTH = 1000
+EXPLAIN_PREFIXES = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+}
+
+
+class SlowQueryLog:
+    """Ring buffer of slow statements, mirrored to a rotating file"""
+
+    def __init__(self, size: int = 200, path: Optional[str] = None):
+        self.path = path
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._logger = None
+
+    def _file_logger(self) -> Optional[logging.Logger]:
+        # Opened on first use so that importing the app creates no files
+        if self._logger is None and self.path:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                handler = RotatingFileHandler(
+                    self.path, maxBytes=SLOW_QUERY_LOG_BYTES,
+                    backupCount=SLOW_QUERY_LOG_BACKUPS, encoding='utf-8'
+                )
+            except OSError as e:
+                print(f"Slow query log unavailable: {e}")
+                self.path = None
+                return None
+            logger = logging.getLogger('concierge.slow_queries')
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    def record(self, entry: Dict):
+        with self._lock:
+            self._entries.append(entry)
+            logger = self._file_logger()
+        if logger:
+            logger.info(json.dumps(entry, default=str))
+
+    def entries(self, limit: Optional[int] = None) -> List[Dict]:
+        """Most recent first"""
+        with self._lock:
+            entries = list(self._entries)
+        entries.reverse()
+        return entries[:limit] if limit else entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+slow_query_log = SlowQueryLog(SLOW_QUERY_BUFFER, SLOW_QUERY_LOG)
+
+
+def install_slow_query_log(engine):
+    """Record the slow statements of `engine`; does nothing unless SLOW_QUERY_MS is set."""
+    if SLOW_QUERY_MS <= 0:
+        return
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def query_origin() -> str:
+    """Route or job the current statement runs for"""
+    scope = current_scope()
+    if scope is not None:
+        return scope.name
+    if has_request_context():
+        return f'{request.method} {request.path}'
+    return 'unknown'
+
+
+def explain(conn, statement: str, parameters) -> List[str]:
+    """Plan of `statement`, one line per plan row ([] when unsupported)."""
+    prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return []
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        rows = cursor.fetchall()
+        if conn.dialect.name == 'sqlite':
+            # (id, parent, notused, detail): the detail is the readable part
+            return [row[-1] for row in rows]
+        return [' '.join(str(column) for column in row) for row in rows]
+    except Exception as e:
+        return [f'EXPLAIN failed: {e}']
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._slow_query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_slow_query_started', None)
+    if started is None:
+        return
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms < SLOW_QUERY_MS:
+        return
+
+    slow_query_log.record({
+        'timestamp': datetime.utcnow().isoformat(),
+        'duration_ms': round(duration_ms, 3),
+        'origin': query_origin(),
+        'request': f'{request.method} {request.full_path}' if has_request_context() else None,
+        'statement': statement,
+        'parameters': repr(parameters)[:MAX_PARAMETERS_LENGTH],
+        'plan': [] if executemany else explain(conn, statement, parameters),
+    })
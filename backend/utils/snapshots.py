@@ -0,0 +1,179 @@
+"""
+Last-known-good responses for when the database is unavailable.
+
+Every body the response cache produces is also kept as the snapshot for
+its endpoint and filters, in memory and on local disk so it survives a
+restart. When a query fails (e.g. SQLite stays locked through a long
+ingest), the snapshot is served instead, marked stale.
+
+After FAILURE_THRESHOLD consecutive failures the circuit breaker opens:
+requests stop touching the database and get snapshots straight away,
+while a background thread probes it every RETRY_INTERVAL seconds and
+closes the breaker once a read succeeds.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple
+
+from flask import current_app, has_app_context
+
+from utils.compression import ResponseBody
+from utils.generation import get_generation_state
+
+SNAPSHOT_DIR = os.getenv(
+    'SNAPSHOT_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'snapshots')
+)
+SNAPSHOT_LIMIT = int(os.getenv('SNAPSHOT_LIMIT', 256))
+FAILURE_THRESHOLD = 3
+RETRY_INTERVAL = float(os.getenv('DB_RETRY_INTERVAL', 15))
+
+
+class SnapshotStore:
+    """
+    Most recent body per (endpoint, filters), mirrored to one file each.
+
+    Files are replaced atomically, so several workers can share the
+    directory; the file's mtime records when the snapshot was taken.
+    """
+
+    def __init__(self, directory: str, limit: int = 256):
+        self.directory = directory
+        self.limit = limit
+        self._entries = OrderedDict()  # key -> (saved_at, ResponseBody)
+        self._lock = threading.Lock()
+
+    def _path(self, key: Hashable) -> str:
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f'{digest}.json')
+
+    def save(self, key: Hashable, body: ResponseBody):
+        """Record `body` as the latest good response for `key`."""
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous and previous[1] is body:
+                return
+            self._entries[key] = (time.time(), body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.limit:
+                self._entries.popitem(last=False)
+
+        path = self._path(key)
+        try:
+            if previous and previous[1].data == body.data:
+                # Same content for a new time bucket: only refresh the date
+                os.utime(path)
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(body.data)
+            os.replace(temp_path, path)
+            if previous is None:
+                self._prune()
+        except OSError as e:
+            print(f"Snapshot write failed: {e}")
+
+    def load(self, key: Hashable) -> Optional[Tuple[float, ResponseBody]]:
+        """Return (saved_at, body) of the snapshot for `key`, if any."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry:
+            return entry
+
+        path = self._path(key)
+        try:
+            saved_at = os.path.getmtime(path)
+            with open(path, 'rb') as f:
+                body = ResponseBody(f.read().decode('utf-8'))
+        except OSError:
+            return None
+
+        with self._lock:
+            self._entries.setdefault(key, (saved_at, body))
+        return saved_at, body
+
+    def _prune(self):
+        """Delete the oldest snapshot files beyond the limit."""
+        paths = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory) if name.endswith('.json')
+        ]
+        if len(paths) <= self.limit:
+            return
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:len(paths) - self.limit]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class CircuitBreaker:
+    """
+    Stops sending queries to the database after repeated failures.
+
+    While open, `probe` is retried in a background thread every
+    `retry_interval` seconds; its first success closes the breaker.
+    """
+
+    def __init__(self, probe: Callable, failure_threshold: int = 3, retry_interval: float = 15):
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.retry_interval = retry_interval
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def record_success(self):
+        """Reset the failure count after a successful query."""
+        if self.failures:
+            with self._lock:
+                if not self.is_open:
+                    self.failures = 0
+
+    def record_failure(self, error: Exception):
+        """Count a failed query, opening the breaker at the threshold."""
+        with self._lock:
+            if self.is_open:
+                return
+            self.failures += 1
+            # Only open when there is an app to probe with
+            if self.failures < self.failure_threshold or not has_app_context():
+                return
+            self.opened_at = time.monotonic()
+
+        print(f"✗ Database unavailable, serving snapshots: {error}")
+        app = current_app._get_current_object()
+        threading.Thread(target=self._probe_until_healthy, args=(app,), daemon=True).start()
+
+    def _probe_until_healthy(self, app):
+        while True:
+            time.sleep(self.retry_interval)
+            try:
+                with app.app_context():
+                    self.probe()
+            except Exception as e:
+                print(f"Database probe failed: {e}")
+                continue
+
+            with self._lock:
+                self.failures = 0
+                self.opened_at = None
+            print("✓ Database recovered")
+            return
+
+
+snapshot_store = SnapshotStore(SNAPSHOT_DIR, limit=SNAPSHOT_LIMIT)
+
+# Probe with a real table read: `SELECT 1` succeeds while SQLite is locked
+db_breaker = CircuitBreaker(
+    get_generation_state, failure_threshold=FAILURE_THRESHOLD, retry_interval=RETRY_INTERVAL
+)
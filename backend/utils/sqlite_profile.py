@@ -0,0 +1,125 @@
+"""
+SQLite performance profile and reader / writer connection split.
+
+For a SQLite file database every new connection is tuned with PRAGMAs:
+WAL journaling so readers never wait for a committing writer, NORMAL
+synchronous (safe with WAL, no fsync per commit), a larger page cache,
+memory-mapped reads and a busy timeout. Settings can be overridden with
+the SQLITE_* environment variables; SQLITE_PROFILE=off keeps SQLite's
+defaults (rollback journal).
+
+Reads made while serving GET requests, or views marked with read_only()
+(e.g. a POST carrying a long id list), go through the `reader` bind, a
+pool of query_only connections. Everything else, including ingestion,
+the scheduler and any statement after a write in the same transaction,
+goes through the default engine, which keeps a single writer connection
+(SQLite allows one writer at a time anyway).
+"""
+import os
+from functools import partial
+
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+
+SQLITE_PROFILE = os.getenv('SQLITE_PROFILE', 'on').lower() not in ('0', 'off', 'false', 'no')
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', -20000))  # Negative: KiB
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 2 ** 20))
+SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000))  # ms
+READ_POOL_SIZE = int(os.getenv('DB_READ_POOL_SIZE', 5))
+
+READER_BIND = 'reader'
+
+# Requests whose reads may go to the reader bind
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def is_sqlite_file(database_uri: str) -> bool:
+    return database_uri.startswith('sqlite') and database_uri not in ('sqlite://', 'sqlite:///:memory:')
+
+
+def configure_sqlite(app):
+    """
+    Add the reader bind and make the default engine a single writer.
+
+    Call before db.init_app(); does nothing unless the database is a
+    SQLite file and the profile is enabled.
+    """
+    database_uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if not SQLITE_PROFILE or not is_sqlite_file(database_uri):
+        return
+
+    options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**options, 'pool_size': 1, 'max_overflow': 0}
+    app.config['SQLALCHEMY_BINDS'] = {
+        READER_BIND: {**options, 'url': database_uri, 'pool_size': READ_POOL_SIZE},
+    }
+
+
+def install_sqlite_profile(engines):
+    """Apply the PRAGMAs to every new connection of the SQLite engines."""
+    if not SQLITE_PROFILE:
+        return
+    for key, engine in engines.items():
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', partial(_apply_pragmas, read_only=key == READER_BIND))
+
+
+def _apply_pragmas(dbapi_connection, connection_record, read_only: bool = False):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f'PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT}')
+        cursor.execute('PRAGMA journal_mode = WAL')
+        cursor.execute(f'PRAGMA synchronous = {SQLITE_SYNCHRONOUS}')
+        cursor.execute(f'PRAGMA cache_size = {SQLITE_CACHE_SIZE}')
+        cursor.execute(f'PRAGMA mmap_size = {SQLITE_MMAP_SIZE}')
+        cursor.execute('PRAGMA temp_store = MEMORY')
+        if read_only:
+            cursor.execute('PRAGMA query_only = ON')
+    finally:
+        cursor.close()
+
+
+def read_only(view):
+    """Mark a view that never writes, so its reads use the reader bind whatever the method."""
+    view.read_only = True
+    return view
+
+
+def _read_only_request() -> bool:
+    if request.method in READ_METHODS:
+        return True
+    return getattr(current_app.view_functions.get(request.endpoint), 'read_only', False)
+
+
+class RoutingSession(Session):
+    """
+    Session sending the reads of GET (and read_only) requests to the reader bind.
+
+    Once a transaction has written (flushed, or executed DML), it stays on
+    the writer until commit or rollback so it reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._use_reader(clause):
+            return self._db.engines[READER_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _use_reader(self, clause) -> bool:
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info['wrote'] = True
+            return False
+        return (
+            not self.info.get('wrote')
+            and has_request_context()
+            and READER_BIND in self._db.engines
+            and _read_only_request()
+        )
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+@event.listens_for(RoutingSession, 'after_rollback')
+def _end_write(session):
+    session.info.pop('wrote', None)
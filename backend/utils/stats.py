@@ -0,0 +1,312 @@
+"""
+Incrementally maintained statistics for /api/stats.
+
+Counters live in the stat_counters table and are adjusted from a session
+after_flush hook, in the same transaction as the write that changed them.
+"Upcoming" means starting at or after a stored boundary that a scheduler
+job rolls forward (roll_upcoming_boundary), so /api/stats is a read of
+one small table instead of several COUNT(*) queries over events.
+
+Bulk Core statements bypass the hook; reconcile() recomputes everything
+from scratch and reports the drift (see reconcile_stats.py).
+"""
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import delete, event, func, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from models import db, Event, Source, StatCounter, User
+
+TOTAL_EVENTS = 'events'
+UPCOMING_EVENTS = 'events.upcoming'
+TAG_PREFIX = 'events.tag:'  # Followed by the tag id
+SOURCE_PREFIX = 'events.source:'
+ACTIVE_SOURCES = 'sources.active'
+TOTAL_USERS = 'users'
+UPCOMING_BOUNDARY = 'upcoming_boundary'
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Attributes whose old values the counters need on update and delete
+EVENT_ATTRS = ('tag_id', 'source_id', 'start_time')
+SOURCE_ATTRS = ('active',)
+
+
+def _to_epoch(value: datetime) -> int:
+    return int((value - _EPOCH).total_seconds())
+
+
+def _event_keys(tag_id, source_id, start_time, boundary: datetime) -> list:
+    """Counters an event with these values contributes to."""
+    keys = [TOTAL_EVENTS]
+    if tag_id is not None:
+        keys.append(f'{TAG_PREFIX}{tag_id}')
+    if source_id is not None:
+        keys.append(f'{SOURCE_PREFIX}{source_id}')
+    if start_time is not None:
+        # ICS times arrive timezone-aware; the column keeps their wall time
+        if start_time.replace(tzinfo=None) >= boundary:
+            keys.append(UPCOMING_EVENTS)
+    return keys
+
+
+def _values(obj, attrs, old: bool) -> list:
+    """Pre-flush (old=True) or post-flush values of attributes."""
+    state = inspect(obj)
+    values = []
+    for attr in attrs:
+        history = state.attrs[attr].history
+        if old:
+            pool = history.deleted or history.unchanged
+        else:
+            pool = history.added or history.unchanged
+        values.append(pool[0] if pool else None)
+    return values
+
+
+def _is_active(value) -> bool:
+    # Source.active defaults to True when left unset
+    return value is None or bool(value)
+
+
+def _collect_deltas(session, boundary: datetime) -> Counter:
+    """Counter deltas implied by the objects in a flush."""
+    deltas = Counter()
+
+    for obj in session.new:
+        if isinstance(obj, Event):
+            for key in _event_keys(obj.tag_id, obj.source_id, obj.start_time, boundary):
+                deltas[key] += 1
+        elif isinstance(obj, User):
+            deltas[TOTAL_USERS] += 1
+        elif isinstance(obj, Source) and _is_active(obj.active):
+            deltas[ACTIVE_SOURCES] += 1
+
+    for obj in session.deleted:
+        if isinstance(obj, Event):
+            old = _values(obj, EVENT_ATTRS, old=True)
+            for key in _event_keys(*old, boundary):
+                deltas[key] -= 1
+        elif isinstance(obj, User):
+            deltas[TOTAL_USERS] -= 1
+        elif isinstance(obj, Source) and _is_active(_values(obj, SOURCE_ATTRS, old=True)[0]):
+            deltas[ACTIVE_SOURCES] -= 1
+
+    for obj in session.dirty:
+        if isinstance(obj, Event):
+            old = _values(obj, EVENT_ATTRS, old=True)
+            new = _values(obj, EVENT_ATTRS, old=False)
+            if old != new:
+                for key in _event_keys(*old, boundary):
+                    deltas[key] -= 1
+                for key in _event_keys(*new, boundary):
+                    deltas[key] += 1
+        elif isinstance(obj, Source):
+            old_active, = _values(obj, SOURCE_ATTRS, old=True)
+            new_active, = _values(obj, SOURCE_ATTRS, old=False)
+            deltas[ACTIVE_SOURCES] += _is_active(new_active) - _is_active(old_active)
+
+    return deltas
+
+
+def _get_boundary(connection) -> Optional[datetime]:
+    value = connection.execute(
+        select(StatCounter.value).where(StatCounter.name == UPCOMING_BOUNDARY)
+    ).scalar()
+    return datetime.utcfromtimestamp(value) if value is not None else None
+
+
+def _apply_deltas(connection, deltas: Counter):
+    for name, delta in deltas.items():
+        if not delta:
+            continue
+        result = connection.execute(
+            update(StatCounter)
+            .where(StatCounter.name == name)
+            .values(value=StatCounter.value + delta)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(StatCounter).values(name=name, value=delta))
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    """
+    No-op 'set' listener, registered with active_history.
+
+    Values expired at the last commit have no history, so without it an
+    update of an event loaded earlier would not know what to decrement.
+    """
+
+
+def _after_flush(session, flush_context):
+    tracked = (Event, Source, User)
+    if not any(isinstance(obj, tracked)
+               for group in (session.new, session.deleted, session.dirty)
+               for obj in group):
+        return
+
+    connection = session.connection()
+    boundary = _get_boundary(connection)
+    if boundary is None:
+        # Counters not initialized yet; ensure_stats() will compute them
+        return
+
+    _apply_deltas(connection, _collect_deltas(session, boundary))
+
+
+def track_stat_writes():
+    """Register the hooks that maintain the counters."""
+    attrs = [getattr(Event, name) for name in EVENT_ATTRS]
+    attrs += [getattr(Source, name) for name in SOURCE_ATTRS]
+    for attr in attrs:
+        if not event.contains(attr, 'set', _keep_old_value):
+            event.listen(attr, 'set', _keep_old_value, active_history=True)
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+
+
+def read_stats() -> Dict[str, int]:
+    """Read every counter in a single statement."""
+    rows = db.session.execute(select(StatCounter.name, StatCounter.value))
+    return {name: value for name, value in rows}
+
+
+def stats_payload(counters: Dict[str, int], tag_name: Callable[[int], Optional[str]]) -> Dict:
+    """
+    Shape counters read by read_stats() into the /api/stats response.
+
+    Args:
+        counters: Counter name -> value
+        tag_name: Maps a tag id to its name
+    """
+    boundary = counters.get(UPCOMING_BOUNDARY)
+    return {
+        'total_events': counters.get(TOTAL_EVENTS, 0),
+        'upcoming_events': counters.get(UPCOMING_EVENTS, 0),
+        'active_sources': counters.get(ACTIVE_SOURCES, 0),
+        'total_users': counters.get(TOTAL_USERS, 0),
+        'events_by_tag': {
+            tag_name(int(name[len(TAG_PREFIX):])): value
+            for name, value in counters.items()
+            if name.startswith(TAG_PREFIX) and value
+        },
+        'events_by_source': {
+            name[len(SOURCE_PREFIX):]: value for name, value in counters.items()
+            if name.startswith(SOURCE_PREFIX) and value
+        },
+        'upcoming_as_of': datetime.utcfromtimestamp(boundary).isoformat()
+            if boundary is not None else None
+    }
+
+
+def roll_upcoming_boundary(now: datetime = None) -> int:
+    """
+    Move the upcoming boundary to `now`.
+
+    Events that started between the old boundary and now stop counting as
+    upcoming. Returns how many events were rolled out.
+    """
+    now = (now or datetime.utcnow()).replace(microsecond=0)
+    connection = db.session.connection()
+    boundary = _get_boundary(connection)
+
+    if boundary is None:
+        reconcile(fix=True, now=now)
+        return 0
+
+    passed = 0
+    if now > boundary:
+        passed = db.session.execute(
+            select(func.count()).select_from(Event).where(
+                Event.start_time >= boundary,
+                Event.start_time < now
+            )
+        ).scalar()
+
+        _apply_deltas(connection, Counter({UPCOMING_EVENTS: -passed}))
+        connection.execute(
+            update(StatCounter)
+            .where(StatCounter.name == UPCOMING_BOUNDARY)
+            .values(value=_to_epoch(now))
+        )
+
+    db.session.commit()
+    return passed
+
+
+def compute_stats(boundary: datetime) -> Dict[str, int]:
+    """Recompute every counter from scratch."""
+    counters = {
+        TOTAL_EVENTS: db.session.execute(
+            select(func.count()).select_from(Event)
+        ).scalar(),
+        UPCOMING_EVENTS: db.session.execute(
+            select(func.count()).select_from(Event).where(Event.start_time >= boundary)
+        ).scalar(),
+        ACTIVE_SOURCES: db.session.execute(
+            select(func.count()).select_from(Source).where(Source.active.isnot(False))
+        ).scalar(),
+        TOTAL_USERS: db.session.execute(
+            select(func.count()).select_from(User)
+        ).scalar(),
+        UPCOMING_BOUNDARY: _to_epoch(boundary),
+    }
+
+    for tag_id, count in db.session.execute(
+        select(Event.tag_id, func.count()).where(Event.tag_id.isnot(None))
+        .group_by(Event.tag_id)
+    ):
+        counters[f'{TAG_PREFIX}{tag_id}'] = count
+
+    for source_id, count in db.session.execute(
+        select(Event.source_id, func.count()).group_by(Event.source_id)
+    ):
+        counters[f'{SOURCE_PREFIX}{source_id}'] = count
+
+    return counters
+
+
+def reconcile(fix: bool = True, now: datetime = None) -> Dict[str, tuple]:
+    """
+    Compare stored counters with a full recomputation.
+
+    Upcoming events are recomputed against the stored boundary so only
+    real drift is reported, not time that has passed since the last roll.
+
+    Args:
+        fix: Replace the stored counters with the recomputed values
+        now: Boundary to use when none is stored yet
+
+    Returns:
+        Dict of counter name -> (stored, expected) for every mismatch
+    """
+    stored = read_stats()
+    boundary = _get_boundary(db.session.connection())
+    if boundary is None:
+        boundary = (now or datetime.utcnow()).replace(microsecond=0)
+
+    expected = compute_stats(boundary)
+
+    drift = {}
+    for name in set(stored) | set(expected):
+        if stored.get(name, 0) != expected.get(name, 0):
+            drift[name] = (stored.get(name), expected.get(name, 0))
+
+    if fix and drift:
+        db.session.execute(delete(StatCounter))
+        db.session.execute(
+            insert(StatCounter),
+            [{'name': name, 'value': value} for name, value in expected.items()]
+        )
+    db.session.commit()
+
+    return drift
+
+
+def ensure_stats():
+    """Compute the counters from scratch if they were never initialized."""
+    if _get_boundary(db.session.connection()) is None:
+        reconcile(fix=True)
+        print("✓ Statistics counters initialized")
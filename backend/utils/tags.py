@@ -0,0 +1,204 @@
+"""
+Tag dictionary.
+
+Tags live in the tags table with their aliases and display colors; events
+and subscriptions reference them by integer id. The registry below keeps
+the (tiny) table in memory so normalizing a tag or mapping a name to its
+id never needs a query on the hot path. It reloads on a miss, which is how
+tags created by another process (e.g. the ingestion job) become visible;
+a name still unknown after that is not looked up again until the listings
+generation (see utils.generation) moves.
+"""
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from models import db, Tag
+from utils.generation import current_generation, LISTINGS_GENERATION
+
+DEFAULT_COLOR = '#6c757d'
+
+# (name, color, aliases) seeded into an empty tags table
+DEFAULT_TAGS = [
+    ('Required', '#dc3545', ['mandatory']),
+    ('Career', '#28a745', ['jobs', 'recruiting']),
+    ('Capstone', '#007bff', ['thesis']),
+    ('Social', '#ffc107', ['community']),
+    ('Deadline', '#fd7e14', ['due']),
+    ('General', DEFAULT_COLOR, []),
+]
+
+# Most unknown names remembered per generation (they come from query strings)
+MAX_MISSES = 1024
+
+
+def _split_aliases(aliases: Optional[str]) -> List[str]:
+    return [alias.strip() for alias in (aliases or '').split(',') if alias.strip()]
+
+
+class TagRegistry:
+    """In-memory view of the tags table"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._by_id: Dict[int, str] = {}
+        self._ids: Dict[str, int] = {}  # canonical name -> id
+        self._canonical: Dict[str, str] = {}  # lowercase name or alias -> name
+        self._colors: Dict[str, str] = {}
+        self._pending = False  # Tags inserted in a not yet committed transaction
+        self._misses = set()  # Names unknown when the table was last loaded
+        self._misses_generation = None
+        self._index(
+            (None, name, ','.join(aliases), color) for name, color, aliases in DEFAULT_TAGS
+        )
+
+    def _index(self, rows: Iterable[tuple]):
+        """Rebuild the lookup maps from (id, name, aliases, color) rows."""
+        by_id, ids, canonical, colors = {}, {}, {}, {}
+        for tag_id, name, aliases, color in rows:
+            if tag_id is not None:
+                by_id[tag_id] = name
+                ids[name] = tag_id
+            canonical[name.lower()] = name
+            for alias in _split_aliases(aliases):
+                canonical[alias.lower()] = name
+            colors[name] = color or DEFAULT_COLOR
+        self._by_id, self._ids = by_id, ids
+        self._canonical, self._colors = canonical, colors
+
+    def load(self):
+        """(Re)load the tags table (seeded by seed_default_tags())."""
+        with self._lock:
+            rows = db.session.execute(select(Tag.id, Tag.name, Tag.aliases, Tag.color)).all()
+            self._index(rows)
+            self._loaded = True
+
+    def load_rows(self, rows: Iterable[tuple]):
+        """Index (id, name, aliases, color) rows the caller read itself (see asgi.py)."""
+        with self._lock:
+            self._index(rows)
+            self._loaded = True
+
+    def cached_id(self, name: Optional[str]) -> Optional[int]:
+        """Id of a tag name or alias as last loaded, without querying."""
+        return self._ids.get(self.canonical_name(name))
+
+    def invalidate(self):
+        """Forget loaded ids; the next lookup reloads the table."""
+        self._loaded = False
+        self._misses = set()
+
+    def canonical_name(self, tag: Optional[str]) -> Optional[str]:
+        """Map a raw tag or alias to its canonical name (unknown tags are title-cased)."""
+        if not tag:
+            return None
+        return self._canonical.get(tag.lower().strip(), tag.strip().title())
+
+    def id_for(self, name: Optional[str], create: bool = True) -> Optional[int]:
+        """
+        Return the id of a tag, creating it if needed.
+
+        Args:
+            name: Tag name or alias
+            create: Insert unknown tags; when False unknown tags return None
+        """
+        name = self.canonical_name(name)
+        if not name:
+            return None
+
+        if not create and self._loaded and name not in self._ids:
+            return self._lookup_unknown(name)
+        if not self._loaded or name not in self._ids:
+            self.load()
+        if name in self._ids or not create:
+            return self._ids.get(name)
+
+        tag = Tag(name=name, color=self._colors.get(name, DEFAULT_COLOR))
+        db.session.add(tag)
+        db.session.flush()
+        self._pending = True
+        self.load()
+        return tag.id
+
+    def _lookup_unknown(self, name: str) -> Optional[int]:
+        """Reload for a name missing from the table, once per generation."""
+        generation = current_generation(LISTINGS_GENERATION)
+        if generation == self._misses_generation and name in self._misses:
+            return None
+
+        self.load()
+        if name in self._ids:
+            return self._ids[name]
+        if generation != self._misses_generation or len(self._misses) >= MAX_MISSES:
+            self._misses = set()
+            self._misses_generation = generation
+        self._misses.add(name)
+        return None
+
+    def ids_for(self, names: Iterable[str]) -> List[int]:
+        """Ids of the known tags among `names` (unknown names are skipped)."""
+        ids = [self.id_for(name, create=False) for name in names]
+        return [tag_id for tag_id in ids if tag_id is not None]
+
+    def name_for(self, tag_id: Optional[int]) -> Optional[str]:
+        """Return the canonical name of a tag id."""
+        if tag_id is None:
+            return None
+        if tag_id not in self._by_id:
+            self.load()
+        return self._by_id.get(tag_id)
+
+    def color_for(self, name: Optional[str]) -> str:
+        """Return the display color of a tag."""
+        return self._colors.get(name, DEFAULT_COLOR)
+
+    def all(self) -> List[dict]:
+        """Every tag with its display color, in id order."""
+        if not self._loaded:
+            self.load()
+        return [
+            {'id': tag_id, 'name': name, 'color': self._colors[name]}
+            for tag_id, name in sorted(self._by_id.items())
+        ]
+
+
+tag_registry = TagRegistry()
+
+
+def seed_default_tags() -> bool:
+    """
+    Insert DEFAULT_TAGS into an empty tags table (the caller commits).
+
+    Run by utils.schema.upgrade_schema(), so read requests never write.
+
+    Returns:
+        True if the defaults were inserted
+    """
+    if db.session.execute(select(Tag.id).limit(1)).first():
+        return False
+    db.session.add_all([
+        Tag(name=name, color=color, aliases=','.join(aliases))
+        for name, color, aliases in DEFAULT_TAGS
+    ])
+    db.session.flush()
+    tag_registry.invalidate()
+    return True
+
+
+def _after_commit(session):
+    tag_registry._pending = False
+
+
+def _after_transaction_end(session, transaction):
+    # Ids of tags inserted by a transaction that ended without a commit
+    # (rolled back, or closed with the session) are gone
+    if transaction.parent is None and tag_registry._pending:
+        tag_registry._pending = False
+        tag_registry.invalidate()
+
+
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_transaction_end', _after_transaction_end)
@@ -4,36 +4,51 @@ import EventCard from './components/EventCard';
 import FilterBar from './components/FilterBar';
 import './App.css';
 
+// Only what EventCard renders; skips why_matters and the timestamps
+const CARD_FIELDS = 'title,description,start_time,end_time,location,is_virtual,meeting_link,tag,rsvp_link,source';
+
 function App() {
   const [events, setEvents] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [filteredEvents, setFilteredEvents] = useState([]);
   const [selectedTags, setSelectedTags] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [timeFilter, setTimeFilter] = useState('upcoming'); // upcoming, today, week
+  const [searchQuery, setSearchQuery] = useState('');
 
   useEffect(() => {
-    fetchEvents();
-  }, [timeFilter]);
+    // Wait for a pause in typing before searching
+    const timer = setTimeout(fetchEvents, searchQuery ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [timeFilter, searchQuery]);
 
   useEffect(() => {
     applyFilters();
   }, [events, selectedTags]);
 
+  const getTimeParams = () => {
+    const params = { fields: CARD_FIELDS };
+    if (timeFilter === 'today') {
+      params.days = 1;
+    } else if (timeFilter === 'week') {
+      params.days = 7;
+    }
+    return params;
+  };
+
   const fetchEvents = async () => {
     try {
       setLoading(true);
       setError(null);
       
-      const params = {};
-      if (timeFilter === 'today') {
-        params.days = 1;
-      } else if (timeFilter === 'week') {
-        params.days = 7;
-      }
-      
-      const data = await eventService.getEvents(params);
+      const query = searchQuery.trim();
+      const data = query
+        ? await eventService.searchEvents({ ...getTimeParams(), q: query })
+        : await eventService.getEvents(getTimeParams());
       setEvents(data.events || []);
+      setNextCursor(data.next_cursor || null);
     } catch (err) {
       setError('Failed to load events. Please try again later.');
       console.error('Error fetching events:', err);
@@ -42,6 +57,22 @@ function App() {
     }
   };
 
+  const fetchMoreEvents = async () => {
+    try {
+      setLoadingMore(true);
+      const data = await eventService.getEvents({
+        ...getTimeParams(),
+        cursor: nextCursor,
+      });
+      setEvents((prev) => [...prev, ...(data.events || [])]);
+      setNextCursor(data.next_cursor || null);
+    } catch (err) {
+      console.error('Error fetching more events:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const applyFilters = () => {
     if (selectedTags.length === 0) {
       setFilteredEvents(events);
@@ -96,6 +127,14 @@ function App() {
             </button>
           </div>
 
+          <input
+            className="search-input"
+            type="search"
+            placeholder="Search events"
+            value={searchQuery}
+            onChange={(e) => setSearchQuery(e.target.value)}
+          />
+
           <FilterBar
             selectedTags={selectedTags}
             onTagToggle={handleTagToggle}
@@ -120,7 +159,7 @@ function App() {
             <div className="empty-state">
               <h3>No events found</h3>
               <p>
-                {selectedTags.length > 0
+                {selectedTags.length > 0 || searchQuery
                   ? 'Try adjusting your filters'
                   : 'No upcoming events at this time'}
               </p>
@@ -135,6 +174,15 @@ function App() {
               {filteredEvents.map((event) => (
                 <EventCard key={event.id} event={event} />
               ))}
+              {nextCursor && (
+                <button
+                  className="load-more"
+                  onClick={fetchMoreEvents}
+                  disabled={loadingMore}
+                >
+                  {loadingMore ? 'Loading...' : 'Load more'}
+                </button>
+              )}
             </div>
           )}
         </div>
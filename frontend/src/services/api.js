@@ -16,6 +16,18 @@ export const eventService = {
     return response.data;
   },
 
+  // Full-text search over upcoming events
+  searchEvents: async (params = {}) => {
+    const response = await api.get('/events/search', { params });
+    return response.data;
+  },
+
+  // Per-day counts by tag for a month view ({ from, to, tz, titles })
+  getCalendar: async (params = {}) => {
+    const response = await api.get('/events/calendar', { params });
+    return response.data;
+  },
+
   // Get a single event by ID
   getEvent: async (eventId) => {
     const response = await api.get(`/events/${eventId}`);
@@ -34,6 +46,12 @@ export const eventService = {
     return response.data;
   },
 
+  // Replace the user's subscriptions with exactly these tags (one request)
+  setSubscriptions: async (userId, tags) => {
+    const response = await api.put(`/users/${userId}/subscriptions`, { tags });
+    return response.data;
+  },
+
   // Subscribe to a tag
   subscribe: async (userId, tag) => {
     const response = await api.post(`/users/${userId}/subscribe`, { tag });